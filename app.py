@@ -3,17 +3,43 @@ import os
 import math
 import json        # ⬅⬅⬅ 요기!! 딱 여기 넣으면 됨
 import psycopg2
-from psycopg2.extras import RealDictCursor
+from psycopg2.extras import RealDictCursor, execute_values, Json
 import requests
-from flask import Flask, request, render_template, jsonify, redirect, render_template_string
-from datetime import datetime, timedelta
-from psycopg2.errors import UndefinedColumn
+import requests.adapters
+import http.cookiejar
+from urllib3.util.retry import Retry
+import click
+from flask import Flask, request, render_template, jsonify, redirect, g, has_request_context
+from datetime import datetime, timedelta, timezone
 from jinja2 import TemplateNotFound
 
 from psycopg2 import sql
 import re
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
 import random
+import uuid
+import threading
+import time
+import queue
+import bisect
+import hashlib
+import gzip
+import atexit
+import sys
+import contextvars
+import logging
+import logging.handlers
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from contextlib import contextmanager
+
+import numpy as np
+
+try:
+    import brotli            # 선택 설치: 있으면 br 압축도 사용
+except ImportError:
+    brotli = None
 
 app = Flask(__name__)
 
@@ -31,6 +57,12 @@ KAKAO_REST_API_KEY = os.getenv("KAKAO_REST_API_KEY", "f2f3a9c2b5d912ae8a0c5ff054
 GOOGLE_PLACES_API_KEY = os.getenv("GOOGLE_PLACES_API_KEY", "")
 ADMIN_PASSWORD = os.getenv("ADMIN_PASSWORD", "changeme")
 
+# 외부 API 주소 (벤치마크 / 로컬 테스트 때 bench/fake_apis.py 같은 가짜 서버로 바꿔 끼우는 용도)
+KAKAO_API_BASE = os.getenv("KAKAO_API_BASE", "https://dapi.kakao.com").rstrip("/")
+KAKAO_PLACE_BASE = os.getenv("KAKAO_PLACE_BASE", "https://place.map.kakao.com").rstrip("/")
+GOOGLE_PLACES_BASE = os.getenv("GOOGLE_PLACES_BASE", "https://places.googleapis.com").rstrip("/")
+ALIGO_API_BASE = os.getenv("ALIGO_API_BASE", "https://kakaoapi.aligo.in").rstrip("/")
+
 
 BASE_SERVER_URL = os.getenv("SERVER_BASE_URL")
 
@@ -40,22 +72,248 @@ ALIGO_USER_ID = os.getenv("ALIGO_USER_ID", "")        # 알리고 User ID
 ALIGO_SENDER_KEY = os.getenv("ALIGO_SENDER_KEY", "")  # 승인된 발신프로필 SenderKey
 ALIGO_SENDER = os.getenv("ALIGO_SENDER", "")          # 알리고에 등록된 발신번호 (카톡채널)
 ALIGO_TESTMODE = os.getenv("ALIGO_TESTMODE", "N")     # 테스트 모드면 "Y"
+ALIGO_TOKEN_TTL_MIN = int(os.getenv("ALIGO_TOKEN_TTL_MIN", "10"))              # 토큰 발급 유효시간(분)
+ALIGO_BATCH_MAX = int(os.getenv("ALIGO_BATCH_MAX", "500"))      # 알림톡 요청 1번에 담을 최대 수신자 수
+ALIGO_TOKEN_REFRESH_MARGIN_SEC = float(os.getenv("ALIGO_TOKEN_REFRESH_MARGIN_SEC", "60"))  # 만료 이만큼 전부터 미리 재발급
+ALIGO_DELIVERED_RSLT = ("0", "00")   # 전송 내역 상세의 rslt 중 "전달 성공" 코드
 
 
 # =========================
 # DB 연결
 # =========================
 
-def get_conn():
+# 워커(프로세스)당 커넥션 풀 설정
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", "5"))                     # 워커당 최대 커넥션 수
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "5"))           # 풀이 꽉 찼을 때 대기 한도(초)
+DB_POOL_PING_AFTER = float(os.getenv("DB_POOL_PING_AFTER", "30"))    # 이 시간(초) 이상 놀던 커넥션은 체크아웃 시 SELECT 1
+
+
+def _connect():
+    """실제 psycopg2 커넥션 1개 생성 (TCP + TLS + 인증 핸드셰이크 발생)"""
     return psycopg2.connect(
         host=DB_HOST,
         port=DB_PORT,
         user=DB_USER,
         password=DB_PASSWORD,
         dbname=DB_NAME,
+        connection_factory=TracedConnection,   # 쿼리마다 trace span 기록
     )
 
 
+class DBPoolTimeout(Exception):
+    """DB_POOL_TIMEOUT 안에 빈 커넥션을 못 얻었을 때"""
+
+
+class ConnectionPool:
+    """
+    워커 하나에서 공유하는 psycopg2 커넥션 풀.
+
+    - 최대 max_size 개까지만 커넥션을 연다 (꽉 차면 timeout 까지 대기)
+    - 체크아웃 시 닫힌 커넥션은 버리고, 오래 놀던 커넥션은 SELECT 1 로 확인
+    - 반납 시 열린 트랜잭션은 rollback 해서 깨끗한 상태로 돌려놓음
+    - gunicorn fork 이후에는 부모 프로세스 커넥션을 쓰지 않도록 pid 단위로 초기화
+    """
+
+    def __init__(self, connect, max_size=5, timeout=5.0, ping_after=30.0):
+        self._connect = connect
+        self.max_size = max(1, int(max_size))
+        self.timeout = timeout
+        self.ping_after = ping_after
+
+        self._cond = threading.Condition()
+        self._idle = []        # [(conn, 반납 시각)]
+        self._open = 0         # 풀이 만든 커넥션 중 아직 살아있는 개수
+        self._pid = os.getpid()
+
+        self._stats = {
+            "checkouts": 0,
+            "waits": 0,
+            "wait_time_ms": 0.0,
+            "timeouts": 0,
+            "created": 0,
+            "discarded": 0,
+        }
+
+    # ── 내부 유틸 ─────────────────────────────────────────────
+
+    def _reset_after_fork(self):
+        # fork 된 자식은 부모의 소켓을 공유하면 안 되므로 목록만 비운다 (close 호출 X)
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._idle = []
+            self._open = 0
+
+    def _is_healthy(self, conn, idle_since):
+        if conn.closed:
+            return False
+        if time.monotonic() - idle_since < self.ping_after:
+            return True
+        try:
+            cur = conn.cursor()
+            cur.execute("SELECT 1;")
+            cur.close()
+            conn.rollback()
+            return True
+        except Exception as e:
+            log_event("DB_POOL_PING_FAIL", logging.WARNING, error=e)
+            return False
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._open = max(0, self._open - 1)
+            self._stats["discarded"] += 1
+            self._cond.notify()
+
+    # ── 체크아웃 / 반납 ──────────────────────────────────────
+
+    def getconn(self):
+        started = time.monotonic()
+        waited = False
+
+        while True:
+            with self._cond:
+                self._reset_after_fork()
+
+                while not self._idle and self._open >= self.max_size:
+                    remaining = self.timeout - (time.monotonic() - started)
+                    if remaining <= 0:
+                        self._stats["timeouts"] += 1
+                        raise DBPoolTimeout(
+                            f"DB 커넥션 대기 시간 초과 (max={self.max_size}, timeout={self.timeout}s)"
+                        )
+                    waited = True
+                    self._cond.wait(remaining)
+
+                if self._idle:
+                    conn, idle_since = self._idle.pop()
+                else:
+                    # 새로 만들 자리를 먼저 예약해두고, 실제 연결은 락 밖에서
+                    conn, idle_since = None, None
+                    self._open += 1
+
+            if conn is None:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._cond:
+                        self._open -= 1
+                        self._cond.notify()
+                    raise
+                with self._cond:
+                    self._stats["created"] += 1
+            elif not self._is_healthy(conn, idle_since):
+                self._discard(conn)
+                continue
+
+            with self._cond:
+                self._stats["checkouts"] += 1
+                if waited:
+                    self._stats["waits"] += 1
+                    self._stats["wait_time_ms"] += (time.monotonic() - started) * 1000
+            return conn
+
+    def putconn(self, conn, broken=False):
+        if conn.closed or broken:
+            self._discard(conn)
+            return
+
+        try:
+            # 커밋 안 하고 돌려준 트랜잭션은 여기서 정리
+            if conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                conn.rollback()
+        except Exception:
+            self._discard(conn)
+            return
+
+        with self._cond:
+            if self._pid != os.getpid():
+                return
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    def stats(self):
+        with self._cond:
+            data = dict(self._stats)
+            data["wait_time_ms"] = round(data["wait_time_ms"], 1)
+            data["open"] = self._open
+            data["idle"] = len(self._idle)
+            data["in_use"] = self._open - len(self._idle)
+            data["max_size"] = self.max_size
+        return data
+
+
+class PooledConnection:
+    """
+    get_conn() 이 돌려주는 커넥션 래퍼.
+
+        with get_conn() as conn:
+            cur = conn.cursor()
+            ...
+            conn.commit()
+
+    - with 블록을 빠져나가거나 close() 를 부르면 실제로 끊지 않고 풀에 반납
+    - 블록 안에서 예외가 나면 rollback 후 반납
+    - 나머지 속성(cursor, commit, rollback ...)은 psycopg2 커넥션 그대로 위임
+    """
+
+    def __init__(self, pool):
+        self._pool = pool
+        self._conn = None
+        self._conn = pool.getconn()
+
+    def __getattr__(self, name):
+        conn = self.__dict__.get("_conn")
+        if conn is None:
+            raise psycopg2.InterfaceError("connection already returned to pool")
+        return getattr(conn, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None and self._conn is not None and not self._conn.closed:
+            try:
+                self._conn.rollback()
+            except Exception:
+                pass
+        broken = isinstance(exc, (psycopg2.OperationalError, psycopg2.InterfaceError))
+        self._release(broken=broken)
+        return False
+
+    def _release(self, broken=False):
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            self._pool.putconn(conn, broken=broken)
+
+    def close(self):
+        self._release()
+
+    def __del__(self):
+        # close() 를 빼먹은 경로(예외 등)에서도 풀 슬롯이 새지 않게 안전망
+        try:
+            self._release()
+        except Exception:
+            pass
+
+
+db_pool = ConnectionPool(
+    _connect,
+    max_size=DB_POOL_MAX,
+    timeout=DB_POOL_TIMEOUT,
+    ping_after=DB_POOL_PING_AFTER,
+)
+
+
+def get_conn():
+    """풀에서 커넥션을 하나 빌려온다. with 블록 또는 close() 로 반납."""
+    with trace_span("db.pool.checkout"):
+        return PooledConnection(db_pool)
+
+
 # =========================
 # 테이블 생성 쿼리
 # =========================
@@ -115,6 +373,69 @@ CREATE TABLE IF NOT EXISTS recommendation_logs (
 );
 """
 
+CREATE_KAKAO_PLACE_MATCHES_TABLE = """
+CREATE TABLE IF NOT EXISTS kakao_place_matches (
+    cache_key VARCHAR(255) PRIMARY KEY,
+    place_name VARCHAR(255),
+    kakao_place_id VARCHAR(50),
+    address VARCHAR(255),
+    expires_at TIMESTAMPTZ NOT NULL,
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+"""
+
+CREATE_GOOGLE_PLACES_TILES_TABLE = """
+CREATE TABLE IF NOT EXISTS google_places_tiles (
+    tile_key VARCHAR(64) PRIMARY KEY,
+    places JSONB NOT NULL,
+    fetched_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+"""
+
+CREATE_CRON_JOBS_TABLE = """
+CREATE TABLE IF NOT EXISTS cron_jobs (
+    id VARCHAR(32) PRIMARY KEY,
+    kind VARCHAR(20) NOT NULL,
+    time_label VARCHAR(10),
+    status VARCHAR(10) NOT NULL DEFAULT 'queued',
+    target_count INTEGER,
+    processed_count INTEGER NOT NULL DEFAULT 0,
+    sent_count INTEGER NOT NULL DEFAULT 0,
+    failed_count INTEGER NOT NULL DEFAULT 0,
+    failed_sample JSONB,
+    error TEXT,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    started_at TIMESTAMPTZ,
+    finished_at TIMESTAMPTZ,
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+"""
+
+# 유저 취향 프로필 (user_feedback 의 평균 점수를 미리 합계/개수로 누적)
+#  - time_of_day / category 가 없는 피드백은 '' 로 저장
+CREATE_USER_CATEGORY_PROFILE_TABLE = """
+CREATE TABLE IF NOT EXISTS user_category_profile (
+    phone_number VARCHAR(20) NOT NULL,
+    time_of_day VARCHAR(10) NOT NULL DEFAULT '',
+    category VARCHAR(100) NOT NULL DEFAULT '',
+    rating_sum BIGINT NOT NULL DEFAULT 0,
+    rating_count INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ DEFAULT NOW(),
+    PRIMARY KEY (phone_number, time_of_day, category)
+);
+"""
+
+CREATE_USER_RESTAURANT_PROFILE_TABLE = """
+CREATE TABLE IF NOT EXISTS user_restaurant_profile (
+    phone_number VARCHAR(20) NOT NULL,
+    restaurant_name VARCHAR(255) NOT NULL,
+    rating_sum BIGINT NOT NULL DEFAULT 0,
+    rating_count INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ DEFAULT NOW(),
+    PRIMARY KEY (phone_number, restaurant_name)
+);
+"""
+
 CREATE_CLICK_LOGS_TABLE = """
 CREATE TABLE IF NOT EXISTS click_logs (
     id SERIAL PRIMARY KEY,
@@ -127,68 +448,222 @@ CREATE TABLE IF NOT EXISTS click_logs (
 """
 
 
-def init_db():
-    conn = get_conn()
-    cur = conn.cursor()
-
-    # 0) 유저 / 피드백 / 로그 / 리뷰 테이블은 일단 생성 (없으면)
-    cur.execute(CREATE_USERS_TABLE)
-    cur.execute(CREATE_USER_FEEDBACK_TABLE)
-    cur.execute(CREATE_RECOMMENDATION_LOGS_TABLE)
-    cur.execute(CREATE_CLICK_LOGS_TABLE)
-    cur.execute(CREATE_REVIEWS_TABLE)
-
-    # 1) restaurants 테이블은 조건 따지지 말고 항상 새로 만든다
-    #    (지금은 데이터도 없고, 스키마 꼬인 상태라 강제 초기화가 제일 안전)
-    cur.execute("DROP TABLE IF EXISTS restaurants CASCADE;")
-    cur.execute(CREATE_RESTAURANTS_TABLE)
-
-    # 2) restaurants (name, address) 유니크 인덱스 – upsert용
-    cur.execute("""
-        CREATE UNIQUE INDEX IF NOT EXISTS idx_restaurants_name_address
-        ON restaurants (name, address);
-    """)
-
-    # 3) user_feedback에 추가 컬럼들 (없으면 추가)
-    # 3-1) source 컬럼
-    try:
-        cur.execute("ALTER TABLE user_feedback ADD COLUMN source VARCHAR(50);")
-    except psycopg2.errors.DuplicateColumn:
-        conn.rollback()
+# =========================
+# 스키마 마이그레이션
+# =========================
+# (버전, 이름, SQL 목록) – 한 번 배포된 항목은 고치지 말고 새 버전을 뒤에 추가할 것.
+# 각 버전은 트랜잭션 하나로 적용되고, 적용 기록은 schema_migrations 에 남는다.
+
+MIGRATIONS = [
+    (
+        1,
+        "baseline_schema",
+        [
+            CREATE_USERS_TABLE,
+            CREATE_RESTAURANTS_TABLE,
+            CREATE_USER_FEEDBACK_TABLE,
+            CREATE_RECOMMENDATION_LOGS_TABLE,
+            CREATE_CLICK_LOGS_TABLE,
+            CREATE_REVIEWS_TABLE,
+            CREATE_KAKAO_PLACE_MATCHES_TABLE,
+            CREATE_GOOGLE_PLACES_TILES_TABLE,
+            CREATE_CRON_JOBS_TABLE,
+            # restaurants (name, address) 유니크 인덱스 – upsert용
+            """
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_restaurants_name_address
+            ON restaurants (name, address);
+            """,
+            # users: 가입 위치 / 알림 시간대 / 활성 여부 / 마지막 알림 시각
+            """
+            ALTER TABLE users
+                ADD COLUMN IF NOT EXISTS latitude DOUBLE PRECISION,
+                ADD COLUMN IF NOT EXISTS longitude DOUBLE PRECISION,
+                ADD COLUMN IF NOT EXISTS alert_times VARCHAR(100),
+                ADD COLUMN IF NOT EXISTS is_active BOOLEAN DEFAULT TRUE,
+                ADD COLUMN IF NOT EXISTS last_alert_sent TIMESTAMP;
+            """,
+            # user_feedback: 출처(quick/form) / 한 줄 후기 / 시간대 / 가게 id
+            """
+            ALTER TABLE user_feedback
+                ADD COLUMN IF NOT EXISTS source VARCHAR(50),
+                ADD COLUMN IF NOT EXISTS comment TEXT,
+                ADD COLUMN IF NOT EXISTS time_of_day VARCHAR(10),
+                ADD COLUMN IF NOT EXISTS restaurant_id INTEGER REFERENCES restaurants(id);
+            """,
+            """
+            ALTER TABLE recommendation_logs
+                ADD COLUMN IF NOT EXISTS restaurant_id INTEGER REFERENCES restaurants(id);
+            """,
+        ],
+    ),
+    (
+        2,
+        "hot_path_indexes",
+        [
+            # 시간대별 카테고리 선호도 (load_user_context)
+            """
+            CREATE INDEX IF NOT EXISTS idx_user_feedback_phone_time_category
+            ON user_feedback (phone_number, time_of_day, category);
+            """,
+            # 최근 2일 추천 이력 / 피드백 알림 대상 조회
+            """
+            CREATE INDEX IF NOT EXISTS idx_recommendation_logs_phone_created
+            ON recommendation_logs (phone_number, created_at);
+            """,
+            """
+            CREATE INDEX IF NOT EXISTS idx_click_logs_phone_clicked
+            ON click_logs (phone_number, clicked_at);
+            """,
+            # 크론 발송 대상 (활성 사용자)
+            """
+            CREATE INDEX IF NOT EXISTS idx_users_is_active
+            ON users (is_active);
+            """,
+        ],
+    ),
+    (
+        3,
+        "user_preference_profiles",
+        [
+            CREATE_USER_CATEGORY_PROFILE_TABLE,
+            CREATE_USER_RESTAURANT_PROFILE_TABLE,
+            # 기존 피드백으로 초기 백필
+            "DELETE FROM user_category_profile;",
+            "DELETE FROM user_restaurant_profile;",
+            """
+            INSERT INTO user_category_profile
+                (phone_number, time_of_day, category, rating_sum, rating_count)
+            SELECT phone_number, COALESCE(time_of_day, ''), COALESCE(category, ''),
+                   SUM(rating), COUNT(rating)
+            FROM user_feedback
+            WHERE rating IS NOT NULL
+            GROUP BY phone_number, COALESCE(time_of_day, ''), COALESCE(category, '');
+            """,
+            """
+            INSERT INTO user_restaurant_profile
+                (phone_number, restaurant_name, rating_sum, rating_count)
+            SELECT phone_number, restaurant_name, SUM(rating), COUNT(rating)
+            FROM user_feedback
+            WHERE rating IS NOT NULL
+            GROUP BY phone_number, restaurant_name;
+            """,
+        ],
+    ),
+    (
+        4,
+        "restaurant_local_index",
+        [
+            # 로컬 추천 모드에서 Google/Kakao 없이 카드를 만들 수 있도록 표시 정보 저장
+            # (last_seen_at 은 기존 행이 "방금 본 것"처럼 보이지 않게 기본값을 나중에 설정)
+            """
+            ALTER TABLE restaurants
+                ADD COLUMN IF NOT EXISTS kakao_place_id VARCHAR(50),
+                ADD COLUMN IF NOT EXISTS image_url TEXT,
+                ADD COLUMN IF NOT EXISTS open_info TEXT,
+                ADD COLUMN IF NOT EXISTS menu TEXT,
+                ADD COLUMN IF NOT EXISTS summary TEXT,
+                ADD COLUMN IF NOT EXISTS last_seen_at TIMESTAMP;
+            """,
+            "ALTER TABLE restaurants ALTER COLUMN last_seen_at SET DEFAULT NOW();",
+        ],
+    ),
+    (
+        5,
+        "restaurant_opening_hours",
+        [
+            # compile_opening_hours 결과 ([[시작분, 끝분], ...], 월요일 00:00 기준)
+            """
+            ALTER TABLE restaurants
+                ADD COLUMN IF NOT EXISTS opening_hours JSONB;
+            """,
+        ],
+    ),
+    (
+        6,
+        "cron_jobs_single_active",
+        [
+            # 같은 kind/time 으로 대기·실행 중인 잡은 1개만 (create_cron_job 의 중복 방지)
+            # 이미 겹쳐 있는 잡은 가장 최근 것만 남기고 stale 처리
+            """
+            UPDATE cron_jobs c
+            SET status = 'stale', finished_at = NOW(), updated_at = NOW()
+            WHERE c.status IN ('queued', 'running')
+              AND EXISTS (
+                  SELECT 1 FROM cron_jobs n
+                  WHERE n.kind = c.kind
+                    AND n.time_label IS NOT DISTINCT FROM c.time_label
+                    AND n.status IN ('queued', 'running')
+                    AND (n.created_at, n.id) > (c.created_at, c.id)
+              );
+            """,
+            """
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_cron_jobs_active_kind_time
+            ON cron_jobs (kind, time_label)
+            WHERE status IN ('queued', 'running');
+            """,
+        ],
+    ),
+]
+
+CREATE_SCHEMA_MIGRATIONS_TABLE = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version INTEGER PRIMARY KEY,
+    name VARCHAR(100) NOT NULL,
+    applied_at TIMESTAMPTZ DEFAULT NOW()
+);
+"""
 
-    # 3-2) comment 컬럼 (피드백 폼에서 쓰는 한 줄 후기)
-    try:
-        cur.execute("ALTER TABLE user_feedback ADD COLUMN comment TEXT;")
-    except psycopg2.errors.DuplicateColumn:
-        conn.rollback()
+# 여러 워커가 동시에 돌려도 한 곳에서만 적용되도록 잡는 advisory lock 키
+MIGRATION_LOCK_KEY = 72_011_001
 
-    # 3-3) time_of_day 컬럼 (빠른 피드백 시간대 저장용)
-    try:
-        cur.execute("ALTER TABLE user_feedback ADD COLUMN time_of_day VARCHAR(10);")
-    except psycopg2.errors.DuplicateColumn:
-        conn.rollback()
 
-    # 4) recommendation_logs에 restaurant_id 컬럼 (없으면 추가)
-    try:
-        cur.execute("""
-            ALTER TABLE recommendation_logs
-            ADD COLUMN restaurant_id INTEGER REFERENCES restaurants(id);
-        """)
-    except psycopg2.errors.DuplicateColumn:
-        conn.rollback()
+def run_migrations():
+    """
+    아직 적용 안 된 마이그레이션만 버전 순서대로 적용.
+    몇 번을 다시 돌려도 결과가 같다 (이미 적용된 버전은 건너뜀).
+    반환: 이번에 새로 적용한 버전 목록
+    """
+    applied_now = []
+
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute(CREATE_SCHEMA_MIGRATIONS_TABLE)
+        conn.commit()
+
+        cur.execute("SELECT pg_advisory_lock(%s);", (MIGRATION_LOCK_KEY,))
+        try:
+            cur.execute("SELECT version FROM schema_migrations;")
+            done = {row[0] for row in cur.fetchall()}
+            conn.commit()
+
+            for version, name, statements in sorted(MIGRATIONS, key=lambda m: m[0]):
+                if version in done:
+                    continue
+                try:
+                    for stmt in statements:
+                        cur.execute(stmt)
+                    cur.execute(
+                        "INSERT INTO schema_migrations (version, name) VALUES (%s, %s);",
+                        (version, name),
+                    )
+                    conn.commit()
+                except Exception as e:
+                    conn.rollback()
+                    log_event("MIGRATION_ERROR", logging.ERROR, version=version, name=name, error=e)
+                    raise
+                log_event("MIGRATION_APPLIED", version=version, name=name)
+                applied_now.append(version)
+        finally:
+            cur.execute("SELECT pg_advisory_unlock(%s);", (MIGRATION_LOCK_KEY,))
+            conn.commit()
+            cur.close()
+
+    return applied_now
 
-    # 5) user_feedback에도 restaurant_id 컬럼 (없으면 추가)
-    try:
-        cur.execute("""
-            ALTER TABLE user_feedback
-            ADD COLUMN restaurant_id INTEGER REFERENCES restaurants(id);
-        """)
-    except psycopg2.errors.DuplicateColumn:
-        conn.rollback()
 
-    conn.commit()
-    cur.close()
-    conn.close()
+def init_db():
+    """스키마를 최신 버전으로 맞춘다 (기존 데이터는 건드리지 않음)"""
+    return run_migrations()
 
 
 # =========================
@@ -329,159 +804,1583 @@ def translate_category_to_kr(en_cat: str) -> str:
 
 
 # =========================
-# Kakao API / Google Places API
+# 메트릭 (Prometheus 텍스트 포맷)
 # =========================
+# /metrics 로 노출. 라우트별 응답 시간, api_reco 단계별 시간,
+# 외부 API(제공자별) 호출 수/오류/시간을 히스토그램·카운터로 모은다.
+# (워커 프로세스별 값 – gunicorn 워커가 여러 개면 워커마다 따로 집계됨)
 
-def kakao_keyword_search(query, x, y, radius=1500, size=3):
-    url = "https://dapi.kakao.com/v2/local/search/keyword.json"
-    headers = {
-        "Authorization": f"KakaoAK {KAKAO_REST_API_KEY}"
-    }
-    params = {
-        "query": query,
-        "x": x,
-        "y": y,
-        "radius": radius,
-        "size": size,
-    }
-    resp = requests.get(url, headers=headers, params=params, timeout=2)
-    resp.raise_for_status()
-    return resp.json()
+METRICS_KEY = os.getenv("METRICS_KEY", "")      # 설정하면 /metrics?key= 필요
+METRICS_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
 
 
-def kakao_category_search(category_group_code, x, y, radius=1500, size=15):
-    url = "https://dapi.kakao.com/v2/local/search/category.json"
-    headers = {
-        "Authorization": f"KakaoAK {KAKAO_REST_API_KEY}"
-    }
-    params = {
-        "category_group_code": category_group_code,
-        "x": x,
-        "y": y,
-        "radius": radius,
-        "size": size,
-        "sort": "distance"
-    }
-    resp = requests.get(url, headers=headers, params=params, timeout=5)
-    resp.raise_for_status()
-    return resp.json()
+def _metric_label_value(v):
+    return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
 
 
-def match_kakao_place_by_location(name, lat, lon, radius=300):
-    """
-    Google Places에서 받은 가게 이름 + 좌표를 가지고
-    카카오맵 place_id를 찾는다.
+def _metric_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_metric_label_value(v)}"' for k, v in pairs) + "}"
+
+
+class Counter:
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            self._values[key] += amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_metric_labels(self.labelnames, key)} {value:g}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, labelnames=(), buckets=METRICS_LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}        # labels → [버킷별 개수(누적 아님), 합계, 개수]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][idx] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((k, ([*v[0]], v[1], v[2])) for k, v in self._series.items())
+        for key, (counts, total, count) in items:
+            running = 0
+            for bound, n in zip(self.buckets, counts):
+                running += n
+                lines.append(
+                    f"{self.name}_bucket{_metric_labels(self.labelnames, key, ('le', f'{bound:g}'))} {running}"
+                )
+            lines.append(f"{self.name}_bucket{_metric_labels(self.labelnames, key, ('le', '+Inf'))} {count}")
+            lines.append(f"{self.name}_sum{_metric_labels(self.labelnames, key)} {total:.6f}")
+            lines.append(f"{self.name}_count{_metric_labels(self.labelnames, key)} {count}")
+        return lines
 
-    1순위: 키워드 검색(query=정제된 이름, sort=distance)  - 카테고리 제한 X
-    2순위: 주변 음식점(FD6) + 카페(CE7) 카테고리 검색
-    """
-    if not KAKAO_REST_API_KEY:
-        return None, None, None
 
-    # 1) 이름 정제: 너무 긴 이름, 파이프(|) 등 잘라주기
-    clean_name = None
-    if name:
-        # '월화고기 상암점 | Sangam korean bbq restaurant | ...' 이런 형태 방지
-        clean_name = re.split(r'[|ㆍ·\-]', str(name))[0].strip()
-        # 너무 길면 Kakao가 400 던질 수 있으니 자르기 (안전하게 40자)
-        if len(clean_name) > 40:
-            clean_name = clean_name[:40]
+class Gauge:
+    """
+    스크랩할 때 fn() 을 호출해서 값을 읽는 메트릭 ({labels tuple: value} 또는 숫자).
+    fn 이 프로세스 시작 이후 계속 늘어나기만 하는 누적값을 주면 kind="counter"
+    (이름은 _total 로 끝나게) → Prometheus rate()/increase() 가 재시작을 리셋으로 처리
+    """
 
-    headers = {
-        "Authorization": f"KakaoAK {KAKAO_REST_API_KEY}"
-    }
+    def __init__(self, name, help_text, fn, labelnames=(), kind="gauge"):
+        self.name = name
+        self.help = help_text
+        self.fn = fn
+        self.labelnames = tuple(labelnames)
+        self.kind = kind
 
-    # ✅ 1) 이름 기반 키워드 검색 (카테고리 제한 없이 먼저 시도)
-    if clean_name:
-        url = "https://dapi.kakao.com/v2/local/search/keyword.json"
-        params = {
-            "query": clean_name,
-            "x": lon,
-            "y": lat,
-            "radius": radius,
-            "sort": "distance",
-            # ❌ 기존: "category_group_code": "FD6"
-            # → 삭제해서 FD6/CE7/기타 모두 검색되게
-        }
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
         try:
-            resp = requests.get(url, headers=headers, params=params, timeout=2)
-            resp.raise_for_status()
-            data = resp.json()
-            docs = data.get("documents", [])
-            if docs:
-                doc = docs[0]
-                place_name = doc.get("place_name")
-                place_id = doc.get("id")
-                address = doc.get("road_address_name") or doc.get("address_name")
-                return place_name, place_id, address
+            value = self.fn()
         except Exception as e:
-            print("[KAKAO_MATCH_KEYWORD_ERROR]", e)
+            log_event("METRICS_GAUGE_ERR", logging.WARNING, metric=self.name, error=e)
+            return lines
+        items = value.items() if isinstance(value, dict) else [((), value)]
+        for key, v in sorted(items):
+            lines.append(f"{self.name}{_metric_labels(self.labelnames, key)} {float(v):g}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+http_request_seconds = metrics.register(Histogram(
+    "nyam_http_request_duration_seconds",
+    "HTTP 요청 처리 시간 (라우트별)",
+    ("route", "method", "status"),
+))
+reco_stage_seconds = metrics.register(Histogram(
+    "nyam_reco_stage_duration_seconds",
+    "api_reco 단계별 처리 시간",
+    ("stage",),
+))
+reco_path_total = metrics.register(Counter(
+    "nyam_reco_requests_total",
+    "api_reco 처리 경로별 요청 수 (local / live)",
+    ("path",),
+))
+outbound_request_seconds = metrics.register(Histogram(
+    "nyam_outbound_request_duration_seconds",
+    "외부 API 호출 시간 (제공자별)",
+    ("provider",),
+))
+outbound_requests_total = metrics.register(Counter(
+    "nyam_outbound_requests_total",
+    "외부 API 호출 수 (제공자 / 결과별: ok, http_error, error)",
+    ("provider", "outcome"),
+))
+
+
+@contextmanager
+def reco_stage(stage):
+    """with reco_stage("google_fetch"): ... → 단계별 히스토그램 + trace span 에 기록"""
+    started = time.perf_counter()
+    with reco_stage_seconds.time(stage=stage), trace_span(f"reco.{stage}"):
+        yield
+    log_event(
+        "RECO_STAGE", logging.DEBUG,
+        stage=stage, duration_ms=round((time.perf_counter() - started) * 1000, 2),
+    )
 
-    # ✅ 2) 이름 기반 검색 실패 시, 주변 음식점(FD6) + 카페(CE7) 카테고리로 시도
-    for cat in ("FD6", "CE7"):
-        try:
-            # 반경은 최소 300m 이상으로 넉넉하게
-            cat_data = kakao_category_search(
-                cat,
-                x=lon,
-                y=lat,
-                radius=max(radius, 300),
-                size=3,  # 여러 개 받아오되, kakao_category_search가 거리순 정렬
-            )
-            docs = cat_data.get("documents", [])
-            if not docs:
-                continue
 
-            doc = docs[0]  # 가장 가까운 1개
-            place_name = doc.get("place_name")
-            place_id = doc.get("id")
-            address = doc.get("road_address_name") or doc.get("address_name")
-            return place_name, place_id, address
-        except Exception as e:
-            print(f"[KAKAO_MATCH_CATEGORY_ERROR_{cat}]", e)
+def timed_stage(stage, fn, *args, **kwargs):
+    """백그라운드 스레드로 넘기는 함수도 단계 시간 기록 (executor.submit 용)"""
+    with reco_stage(stage):
+        return fn(*args, **kwargs)
 
-    return None, None, None
 
+@app.before_request
+def _metrics_start_timer():
+    g.metrics_started = time.perf_counter()
 
 
+@app.after_request
+def _metrics_observe_request(resp):
+    started = g.pop("metrics_started", None)
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        http_request_seconds.observe(
+            time.perf_counter() - started,
+            route=route,
+            method=request.method,
+            status=resp.status_code,
+        )
+    return resp
 
-def get_kakao_basic_info(place_id):
-    url = "https://place.map.kakao.com/main/v/{place_id}".format(place_id=place_id)
-    headers = {
-        "Referer": "https://map.kakao.com/"
-    }
-    try:
-        resp = requests.get(url, headers=headers, timeout=2)
-        resp.raise_for_status()
-        data = resp.json()
-    except Exception as e:
-        print("[KAKAO_BASIC_INFO_ERROR]", e)
-        return None
 
-    basic_info = data.get("basicInfo", {})
-    addr = basic_info.get("address", {}).get("newAddr", "")
-    open_info = basic_info.get("openInfo", {}).get("openInfo", "")
+# =========================
+# 요청 트레이싱 (span 트리)
+# =========================
+# 요청마다 trace id 를 붙이고, 그 안에서 나가는 외부 API 호출 / DB 쿼리 /
+# api_reco 단계를 자식 span 으로 기록한다.
+#  - head 샘플링: 요청 시작 시 TRACE_SAMPLE_RATE 확률로 보관 여부 결정
+#  - tail 샘플링: 샘플에 안 걸렸어도 TRACE_SLOW_MS 이상 걸렸거나 5xx/예외면 항상 보관
+#  - 내보내기: 로컬 JSONL 파일(크기 기준 로테이션) 그리고/또는 OTLP/HTTP(JSON) 수집기
+# 현재 trace / span 은 contextvars 로 들고 다니므로, 스레드풀로 넘기는 작업은
+# submit_in_context() 로 제출해야 같은 trace 에 붙는다.
+# (span 에는 쿼리 파라미터 / 전화번호 같은 값은 넣지 않는다)
+
+TRACE_ENABLED = os.getenv("TRACE_ENABLED", "1") == "1"
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0.05"))     # head 샘플링 비율
+TRACE_SLOW_MS = float(os.getenv("TRACE_SLOW_MS", "1500"))             # 이보다 느린 요청은 항상 보관
+TRACE_MAX_SPANS = int(os.getenv("TRACE_MAX_SPANS", "300"))            # trace 하나에 담을 최대 span 수
+TRACE_FILE = os.getenv(                                               # "" 이면 파일로 안 씀
+    "TRACE_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "traces.jsonl")
+)
+TRACE_FILE_MAX_BYTES = int(float(os.getenv("TRACE_FILE_MAX_MB", "20")) * 1024 * 1024)
+TRACE_FILE_BACKUPS = int(os.getenv("TRACE_FILE_BACKUPS", "3"))
+TRACE_OTLP_ENDPOINT = os.getenv("TRACE_OTLP_ENDPOINT", "")            # 예: http://otel-collector:4318/v1/traces
+TRACE_EXPORT_QUEUE_MAX = int(os.getenv("TRACE_EXPORT_QUEUE_MAX", "1000"))
+TRACE_SERVICE_NAME = os.getenv("TRACE_SERVICE_NAME", "nyam")
+
+_current_trace = contextvars.ContextVar("current_trace", default=None)
+_current_span_id = contextvars.ContextVar("current_span_id", default=None)
+
+_TRACEPARENT_RE = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+
+@dataclass
+class Span:
+    name: str
+    span_id: str
+    parent_id: str = None
+    kind: str = "internal"          # internal / server / client
+    start: float = 0.0              # epoch 초
+    duration_ms: float = 0.0
+    attrs: dict = field(default_factory=dict)
+    error: str = None
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "kind": self.kind,
+            "start": round(self.start, 6),
+            "duration_ms": round(self.duration_ms, 3),
+            "attrs": self.attrs,
+            "error": self.error,
+        }
 
-    is_open = None
-    try:
-        time_info = basic_info.get("openInfo", {})
-        is_open = time_info.get("openFlag")
-    except Exception:
-        pass
 
-    return {
+class Trace:
+    """요청 하나의 span 모음 (여러 스레드에서 span 이 붙을 수 있어서 lock 사용)"""
+
+    def __init__(self, trace_id, sampled):
+        self.trace_id = trace_id
+        self.sampled = sampled
+        self.spans = []
+        self.dropped_spans = 0
+        self.closed = False
+        self._lock = threading.Lock()
+
+    def add(self, span):
+        with self._lock:
+            if self.closed:
+                return          # 요청이 끝난 뒤 늦게 끝난 백그라운드 작업
+            if len(self.spans) >= TRACE_MAX_SPANS:
+                self.dropped_spans += 1
+                return
+            self.spans.append(span)
+
+    def close(self):
+        with self._lock:
+            self.closed = True
+            return list(self.spans)
+
+
+def _new_trace_id():
+    return os.urandom(16).hex()
+
+
+def _new_span_id():
+    return os.urandom(8).hex()
+
+
+def current_trace_id():
+    trace = _current_trace.get()
+    return trace.trace_id if trace is not None else None
+
+
+@contextmanager
+def trace_span(name, attrs=None, kind="internal"):
+    """
+    현재 trace 에 자식 span 하나 기록.
+        with trace_span("db.query", {"db.statement": ...}) as span:
+            ...
+            if span is not None:
+                span.attrs["db.rows"] = cur.rowcount
+    trace 가 없는 곳(백그라운드 스레드 등)에서는 아무것도 안 하고 None 을 넘긴다.
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        yield None
+        return
+
+    span = Span(
+        name=name,
+        span_id=_new_span_id(),
+        parent_id=_current_span_id.get(),
+        kind=kind,
+        start=time.time(),
+        attrs=dict(attrs) if attrs else {},
+    )
+    token = _current_span_id.set(span.span_id)
+    started = time.perf_counter()
+    try:
+        yield span
+    except BaseException as e:
+        span.error = f"{type(e).__name__}: {e}"[:300]
+        raise
+    finally:
+        span.duration_ms = (time.perf_counter() - started) * 1000
+        _current_span_id.reset(token)
+        trace.add(span)
+
+
+def submit_in_context(executor, fn, *args, **kwargs):
+    """executor.submit 과 같지만 현재 trace/span 을 작업 스레드로 넘겨준다."""
+    ctx = contextvars.copy_context()
+    return executor.submit(ctx.run, fn, *args, **kwargs)
+
+
+def _parse_traceparent(header):
+    """W3C traceparent → (trace_id, parent_span_id, sampled) / 형식이 틀리면 (None, None, False)"""
+    m = _TRACEPARENT_RE.match((header or "").strip().lower())
+    if not m or m.group(1) == "0" * 32:
+        return None, None, False
+    return m.group(1), m.group(2), bool(int(m.group(3), 16) & 1)
+
+
+def _otlp_value(v):
+    if isinstance(v, bool):
+        return {"boolValue": v}
+    if isinstance(v, int):
+        return {"intValue": str(v)}
+    if isinstance(v, float):
+        return {"doubleValue": v}
+    return {"stringValue": str(v)}
+
+
+_OTLP_SPAN_KIND = {"internal": 1, "server": 2, "client": 3}
+
+
+def _otlp_payload(records):
+    """보관할 trace 목록 → OTLP/HTTP JSON (ExportTraceServiceRequest)"""
+    spans = []
+    for rec in records:
+        for s in rec["spans"]:
+            start_ns = int(s["start"] * 1e9)
+            item = {
+                "traceId": rec["trace_id"],
+                "spanId": s["span_id"],
+                "name": s["name"],
+                "kind": _OTLP_SPAN_KIND.get(s["kind"], 1),
+                "startTimeUnixNano": str(start_ns),
+                "endTimeUnixNano": str(start_ns + int(s["duration_ms"] * 1e6)),
+                "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in s["attrs"].items() if v is not None],
+                "status": {"code": 2, "message": s["error"]} if s["error"] else {"code": 0},
+            }
+            if s["parent_id"]:
+                item["parentSpanId"] = s["parent_id"]
+            spans.append(item)
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": TRACE_SERVICE_NAME}}]},
+            "scopeSpans": [{"scope": {"name": "nyam.tracing"}, "spans": spans}],
+        }]
+    }
+
+
+class TraceExporter:
+    """
+    보관하기로 한 trace 를 백그라운드 스레드에서 내보낸다.
+    - submit(): 큐에 넣고 바로 리턴 (꽉 차면 버리고 dropped 증가)
+    - 파일: 한 줄에 trace 하나 (JSON), TRACE_FILE_MAX_MB 넘으면 .1 .2 ... 로 로테이션
+    - OTLP: TRACE_OTLP_ENDPOINT 가 있으면 모아서 POST
+    """
+
+    def __init__(self, path, max_bytes, backups, otlp_endpoint, queue_max=1000, batch_size=50):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.otlp_endpoint = otlp_endpoint
+        self.batch_size = batch_size
+
+        self._queue = queue.Queue(maxsize=queue_max)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._file_handler = None
+        self._stats = defaultdict(int)
+
+    def _ensure_thread(self):
+        # gunicorn fork 이후 자식 프로세스에서 처음 쓸 때 스레드 시작
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+            self._thread.start()
+
+    def submit(self, record):
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            with self._lock:
+                self._stats["dropped"] += 1
+            return False
+        with self._lock:
+            self._stats["kept"] += 1
+        return True
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._export(batch)
+
+    def _export(self, batch):
+        if self.path:
+            try:
+                self._write_file(batch)
+            except Exception as e:
+                log_event("TRACE_FILE_ERR", logging.WARNING, error=e)
+                with self._lock:
+                    self._stats["file_errors"] += 1
+        if self.otlp_endpoint:
+            try:
+                resp = otlp_http.post(self.otlp_endpoint, json=_otlp_payload(batch))
+                resp.raise_for_status()
+                with self._lock:
+                    self._stats["otlp_sent"] += len(batch)
+            except Exception as e:
+                log_event("TRACE_OTLP_ERR", logging.WARNING, error=e)
+                with self._lock:
+                    self._stats["otlp_errors"] += 1
+
+    def _write_file(self, batch):
+        if self._file_handler is None:
+            handler = logging.handlers.RotatingFileHandler(
+                self.path, maxBytes=self.max_bytes, backupCount=self.backups, encoding="utf-8", delay=True
+            )
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            self._file_handler = handler
+        for record in batch:
+            line = json.dumps(record, ensure_ascii=False, separators=(",", ":"), default=str)
+            self._file_handler.emit(logging.makeLogRecord({"msg": line}))
+        self._file_handler.flush()
+        with self._lock:
+            self._stats["written"] += len(batch)
+
+    def flush(self, timeout=2.0):
+        """종료 시 큐에 남은 trace 내보내기"""
+        batch = []
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if batch:
+            self._export(batch)
+
+    def stats(self):
+        with self._lock:
+            data = dict(self._stats)
+        data["backlog"] = self._queue.qsize()
+        data["file"] = self.path or None
+        data["otlp_endpoint"] = self.otlp_endpoint or None
+        return data
+
+
+trace_exporter = TraceExporter(
+    TRACE_FILE,
+    TRACE_FILE_MAX_BYTES,
+    TRACE_FILE_BACKUPS,
+    TRACE_OTLP_ENDPOINT,
+    queue_max=TRACE_EXPORT_QUEUE_MAX,
+)
+atexit.register(trace_exporter.flush)
+
+metrics.register(Gauge(
+    "nyam_traces_exported_total",
+    "내보낸 trace 수 (kept / written / dropped / otlp_sent ...)",
+    lambda: {(k,): v for k, v in trace_exporter.stats().items() if isinstance(v, int) and k != "backlog"},
+    ("outcome",),
+    kind="counter",
+))
+metrics.register(Gauge(
+    "nyam_trace_export_backlog",
+    "내보내기 큐에 남아 있는 trace 수",
+    lambda: trace_exporter.stats()["backlog"],
+))
+
+
+@app.before_request
+def _trace_start_request():
+    if not TRACE_ENABLED:
+        return
+    trace_id, parent_id, upstream_sampled = _parse_traceparent(request.headers.get("traceparent"))
+    trace = Trace(trace_id or _new_trace_id(), upstream_sampled or random.random() < TRACE_SAMPLE_RATE)
+    route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    root = Span(
+        name=f"{request.method} {route}",
+        span_id=_new_span_id(),
+        parent_id=parent_id,
+        kind="server",
+        start=time.time(),
+        attrs={"http.method": request.method, "http.route": route, "http.target": request.path},
+    )
+    g.trace = trace
+    g.trace_root = root
+    g.trace_started = time.perf_counter()
+    g.trace_tokens = (_current_trace.set(trace), _current_span_id.set(root.span_id))
+
+
+@app.after_request
+def _trace_tag_response(resp):
+    root = g.get("trace_root")
+    if root is not None:
+        root.attrs["http.status_code"] = resp.status_code
+        resp.headers["X-Trace-Id"] = g.trace.trace_id
+    return resp
+
+
+@app.teardown_request
+def _trace_finish_request(exc):
+    trace = g.pop("trace", None)
+    root = g.pop("trace_root", None)
+    tokens = g.pop("trace_tokens", None)
+    if trace is None or root is None:
+        return
+    root.duration_ms = (time.perf_counter() - g.pop("trace_started")) * 1000
+    if exc is not None:
+        root.error = f"{type(exc).__name__}: {exc}"[:300]
+    if tokens is not None:
+        _current_trace.reset(tokens[0])
+        _current_span_id.reset(tokens[1])
+
+    spans = trace.close()
+    slow = root.duration_ms >= TRACE_SLOW_MS
+    failed = exc is not None or root.attrs.get("http.status_code", 0) >= 500
+    if not (trace.sampled or slow or failed):
+        return
+    trace_exporter.submit({
+        "trace_id": trace.trace_id,
+        "name": root.name,
+        "duration_ms": round(root.duration_ms, 3),
+        "reason": "sampled" if trace.sampled else ("slow" if slow else "error"),
+        "dropped_spans": trace.dropped_spans,
+        "spans": [root.to_dict()] + [s.to_dict() for s in spans],
+    })
+
+
+# DB 쿼리 span: 모든 커넥션을 TracedConnection 으로 만들어서
+# 어떤 cursor_factory 를 쓰든 execute/executemany 가 span 을 남기게 한다.
+# (execute_values 도 내부적으로 cur.execute 를 부르므로 페이지마다 span 하나)
+
+_SQL_WS_RE = re.compile(r"\s+")
+_SQL_VALUES_RE = re.compile(r"\bVALUES\b", re.IGNORECASE)
+
+
+def _db_statement(cur, query):
+    """span 에 남길 SQL (공백 정리 + 길이 제한, VALUES 뒤의 값은 잘라냄)"""
+    try:
+        if isinstance(query, bytes):
+            text = query.decode("utf-8", "replace")
+        elif isinstance(query, str):
+            text = query
+        else:
+            text = query.as_string(cur.connection)   # psycopg2.sql.Composed
+    except Exception:
+        text = type(query).__name__
+    text = _SQL_WS_RE.sub(" ", text).strip()
+    m = _SQL_VALUES_RE.search(text)
+    if m:
+        text = text[:m.end()] + " …"
+    return text[:300]
+
+
+class _TracedCursorMixin:
+    def execute(self, query, vars=None):
+        if _current_trace.get() is None:
+            return super().execute(query, vars)
+        with trace_span("db.query", {"db.statement": _db_statement(self, query)}, kind="client") as span:
+            result = super().execute(query, vars)
+            span.attrs["db.rows"] = self.rowcount
+            return result
+
+    def executemany(self, query, vars_list):
+        if _current_trace.get() is None:
+            return super().executemany(query, vars_list)
+        with trace_span("db.executemany", {"db.statement": _db_statement(self, query)}, kind="client") as span:
+            result = super().executemany(query, vars_list)
+            span.attrs["db.rows"] = self.rowcount
+            return result
+
+
+_traced_cursor_classes = {}
+
+
+def _traced_cursor_class(base):
+    if issubclass(base, _TracedCursorMixin):
+        return base
+    cls = _traced_cursor_classes.get(base)
+    if cls is None:
+        cls = type(f"Traced{base.__name__}", (_TracedCursorMixin, base), {})
+        _traced_cursor_classes[base] = cls
+    return cls
+
+
+class TracedConnection(psycopg2.extensions.connection):
+    def cursor(self, *args, **kwargs):
+        base = kwargs.get("cursor_factory") or self.cursor_factory or psycopg2.extensions.cursor
+        kwargs["cursor_factory"] = _traced_cursor_class(base)
+        return super().cursor(*args, **kwargs)
+
+    def commit(self):
+        with trace_span("db.commit", kind="client"):
+            return super().commit()
+
+
+# =========================
+# 로깅 (JSON lines + 비동기 핸들러)
+# =========================
+# print 대신 log_event("EVENT_NAME", level, key=value, ...) 로 남긴다.
+#  - 한 줄에 JSON 하나: ts, level, event, request_id, phone_hash, stage, duration_ms, 기타 필드
+#  - request_id 는 trace id (트레이싱을 끈 경우엔 요청마다 새로 만든 id)
+#  - 전화번호는 bind_log_fields(phone=...) 로 요청에 묶어두면 해시(phone_hash)로만 남김
+#  - stdout 쓰기는 QueueListener 스레드가 하고 요청 스레드는 큐에 넣기만 함 (꽉 차면 버림)
+#  - 후보/선정 목록 같은 큰 덤프는 DEBUG 레벨이거나 LOG_DUMP_SAMPLE_RATE 로 뽑힌 요청에서만
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_DUMP_SAMPLE_RATE = float(os.getenv("LOG_DUMP_SAMPLE_RATE", "0"))   # 후보 덤프를 남길 요청 비율
+LOG_QUEUE_MAX = int(os.getenv("LOG_QUEUE_MAX", "10000"))               # 비동기 로그 큐 크기
+LOG_PHONE_SALT = os.getenv("LOG_PHONE_SALT", "nyam")                   # phone_hash 솔트
+
+log = logging.getLogger("nyam")
+
+_log_fields = contextvars.ContextVar("log_fields", default=None)
+
+
+def phone_hash(phone):
+    """로그용 전화번호 해시 (같은 번호면 같은 값, 원래 번호는 복원 불가)"""
+    if not phone:
+        return None
+    return hashlib.sha256(f"{LOG_PHONE_SALT}:{phone}".encode("utf-8")).hexdigest()[:12]
+
+
+def bind_log_fields(**fields):
+    """현재 요청(컨텍스트)에서 이후에 남기는 로그에 같이 붙일 필드. phone 은 해시로 바꿔서 저장"""
+    phone = fields.pop("phone", None)
+    if phone:
+        fields["phone_hash"] = phone_hash(phone)
+    merged = dict(_log_fields.get() or {})
+    merged.update(fields)
+    _log_fields.set(merged)
+
+
+def log_event(event, level=logging.INFO, exc_info=None, **fields):
+    """log_event("KAKAO_BASIC_INFO_ERROR", logging.WARNING, error=e, place_id=pid)"""
+    if log.isEnabledFor(level):
+        log.log(level, event, exc_info=exc_info, extra={"fields": fields})
+
+
+def log_dump_enabled():
+    """후보 목록 같은 큰 덤프를 남길지 (DEBUG 레벨이거나 이번 요청이 샘플로 뽑혔을 때)"""
+    if log.isEnabledFor(logging.DEBUG):
+        return True
+    if LOG_DUMP_SAMPLE_RATE <= 0 or not has_request_context():
+        return False
+    sampled = g.get("log_dump_sampled")
+    if sampled is None:
+        sampled = g.log_dump_sampled = random.random() < LOG_DUMP_SAMPLE_RATE
+    return sampled
+
+
+class _LogContextFilter(logging.Filter):
+    """로그를 부른 스레드에서 실행됨 → contextvars / g 에서 request_id, 바인딩 필드를 채움"""
+
+    def filter(self, record):
+        rid = current_trace_id()
+        if rid is None and has_request_context():
+            rid = g.get("request_id")
+            if rid is None:
+                rid = g.request_id = uuid.uuid4().hex
+        record.request_id = rid
+        record.bound_fields = _log_fields.get()
+        return True
+
+
+class JsonLogFormatter(logging.Formatter):
+    def format(self, record):
+        data = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "event": record.getMessage(),
+        }
+        if record.name != log.name:
+            data["logger"] = record.name
+        request_id = getattr(record, "request_id", None)
+        if request_id:
+            data["request_id"] = request_id
+        bound = getattr(record, "bound_fields", None)
+        if bound:
+            data.update(bound)
+        fields = getattr(record, "fields", None)
+        if fields:
+            data.update(fields)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data["exc"] = record.exc_text
+        return json.dumps(data, ensure_ascii=False, default=str, separators=(",", ":"))
+
+
+class AsyncLogHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler + QueueListener.
+    요청 스레드: request_id 등 컨텍스트 채우고 큐에 넣기만 함
+    리스너 스레드: JSON 포맷 + stdout 쓰기
+    (gunicorn fork 이후 자식 프로세스에서 처음 쓸 때 리스너 시작)
+    """
+
+    def __init__(self, target, max_size=10000):
+        super().__init__(queue.Queue(maxsize=max_size))
+        self.target = target
+        self.dropped = 0
+        self._listener = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self.addFilter(_LogContextFilter())
+
+    def _ensure_listener(self):
+        if self._listener is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._listener is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._listener = logging.handlers.QueueListener(self.queue, self.target, respect_handler_level=True)
+            self._listener.start()
+
+    def prepare(self, record):
+        # 포맷(JSON)은 리스너 스레드에서. 여기서는 메시지 인자와 traceback 만 문자열로 고정
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def emit(self, record):
+        self._ensure_listener()
+        super().emit(record)
+
+    def stop(self):
+        """종료 시 큐에 남은 로그까지 쓰고 리스너 정리"""
+        if self._listener is not None and self._pid == os.getpid():
+            self._listener.stop()
+            self._listener = None
+
+
+def _setup_logging():
+    for h in log.handlers:
+        if isinstance(h, AsyncLogHandler):
+            return h
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(JsonLogFormatter())
+    handler = AsyncLogHandler(stream, max_size=LOG_QUEUE_MAX)
+    log.addHandler(handler)
+    log.setLevel(LOG_LEVEL)
+    log.propagate = False      # 루트/gunicorn 핸들러로 중복 출력 안 되게
+    return handler
+
+
+log_handler = _setup_logging()
+atexit.register(log_handler.stop)
+
+
+@app.before_request
+def _log_reset_fields():
+    # sync 워커는 스레드를 재사용하므로 이전 요청의 바인딩이 남지 않게 비움
+    _log_fields.set(None)
+
+
+@app.teardown_request
+def _log_clear_fields(exc):
+    _log_fields.set(None)
+
+
+# =========================
+# 외부 HTTP 클라이언트 (keep-alive 세션)
+# =========================
+# 카카오/Google/알리고 호출이 매번 새 TCP+TLS 연결을 맺지 않도록
+# 제공자별로 requests.Session 하나를 워커 안에서 공유한다.
+#  - 호스트별 커넥션 풀 (pool_maxsize = 동시에 나갈 수 있는 최대 연결 수)
+#  - 제공자별 기본 timeout (connect, read) / 재시도 정책
+#  - 새 연결 수 / 재사용 수 카운터
+
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "16"))   # 호스트당 유지할 keep-alive 연결 수
+
+
+class HttpClient:
+    """
+    제공자 하나용 공유 HTTP 세션.
+    requests.Session 을 여러 스레드에서 같이 쓰되 쿠키는 저장하지 않아서
+    요청끼리 상태를 공유하지 않는다. (커넥션 풀 자체는 urllib3 가 스레드 안전)
+    """
+
+    def __init__(self, name, timeout, retries, pool_maxsize=16, headers=None):
+        self.name = name
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.cookies.set_policy(http.cookiejar.DefaultCookiePolicy(allowed_domains=[]))
+        if headers:
+            self.session.headers.update(headers)
+
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=4,          # 호스트(풀) 개수
+            pool_maxsize=pool_maxsize,   # 호스트당 연결 수
+            max_retries=retries,
+        )
+        self._adapter = adapter
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self._lock = threading.Lock()
+        self._stats = defaultdict(int)
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        parts = urlsplit(url)
+        span_attrs = {
+            "provider": self.name,
+            "http.method": method,
+            "http.host": parts.netloc,
+            "http.path": parts.path,    # 쿼리스트링(검색어/키)은 남기지 않음
+        }
+        with trace_span(f"{self.name} {method}", span_attrs, kind="client") as span:
+            started = time.perf_counter()
+            try:
+                resp = self.session.request(method, url, **kwargs)
+            except requests.RequestException:
+                with self._lock:
+                    self._stats["requests"] += 1
+                    self._stats["errors"] += 1
+                outbound_requests_total.inc(provider=self.name, outcome="error")
+                raise
+            finally:
+                outbound_request_seconds.observe(time.perf_counter() - started, provider=self.name)
+            if span is not None:
+                span.attrs["http.status_code"] = resp.status_code
+            with self._lock:
+                self._stats["requests"] += 1
+                if resp.status_code >= 400:
+                    self._stats["http_errors"] += 1
+            outbound_requests_total.inc(
+                provider=self.name,
+                outcome="http_error" if resp.status_code >= 400 else "ok",
+            )
+            return resp
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def stats(self):
+        # urllib3 풀별 "새로 맺은 연결 수 / 보낸 요청 수" 로 재사용 여부 계산
+        pools = self._adapter.poolmanager.pools
+        new_conns = 0
+        pool_requests = 0
+        hosts = []
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            new_conns += pool.num_connections
+            pool_requests += pool.num_requests
+            hosts.append(pool.host)
+
+        with self._lock:
+            data = dict(self._stats)
+        data["hosts"] = sorted(set(hosts))
+        data["new_connections"] = new_conns
+        data["reused_connections"] = max(pool_requests - new_conns, 0)
+        data["reuse_ratio"] = round(data["reused_connections"] / pool_requests, 3) if pool_requests else 0.0
+        return data
+
+
+# 조회(GET)는 연결 실패 / 5xx / 429 에 짧게 재시도
+_read_retry = Retry(
+    total=2,
+    connect=2,
+    read=1,
+    status=2,
+    backoff_factor=0.1,
+    status_forcelist=(429, 500, 502, 503, 504),
+    allowed_methods=frozenset({"GET"}),
+    raise_on_status=False,
+)
+
+kakao_http = HttpClient(
+    "kakao",
+    timeout=(1.0, 2.0),
+    retries=_read_retry,
+    pool_maxsize=HTTP_POOL_MAXSIZE,     # KAKAO_ENRICH_WORKERS 보다 커야 대기 없이 재사용
+)
+
+# searchNearby 는 POST 지만 조회용이라 5xx 재시도 허용
+google_http = HttpClient(
+    "google",
+    timeout=(2.0, 5.0),
+    retries=Retry(
+        total=2,
+        connect=2,
+        read=0,
+        status=1,
+        backoff_factor=0.2,
+        status_forcelist=(500, 502, 503, 504),
+        allowed_methods=frozenset({"POST"}),
+        raise_on_status=False,
+    ),
+    pool_maxsize=HTTP_POOL_MAXSIZE,
+)
+
+# 알림톡 발송은 중복 발송 위험이 있어서 "연결 자체가 안 된 경우"만 재시도
+aligo_http = HttpClient(
+    "aligo",
+    timeout=(2.0, 5.0),
+    retries=Retry(total=2, connect=2, read=0, status=0, other=0, backoff_factor=0.2),
+    pool_maxsize=HTTP_POOL_MAXSIZE,
+)
+
+otlp_http = HttpClient(
+    "otlp",
+    timeout=(2.0, 5.0),
+    retries=Retry(total=1, connect=1, read=0, status=0, other=0),
+    pool_maxsize=2,
+)
+
+http_clients = {c.name: c for c in (kakao_http, google_http, aligo_http, otlp_http)}
+
+
+# =========================
+# Kakao API / Google Places API
+# =========================
+
+def kakao_keyword_search(query, x, y, radius=1500, size=3):
+    url = f"{KAKAO_API_BASE}/v2/local/search/keyword.json"
+    headers = {
+        "Authorization": f"KakaoAK {KAKAO_REST_API_KEY}"
+    }
+    params = {
+        "query": query,
+        "x": x,
+        "y": y,
+        "radius": radius,
+        "size": size,
+    }
+    resp = kakao_http.get(url, headers=headers, params=params)
+    resp.raise_for_status()
+    return resp.json()
+
+
+def kakao_category_search(category_group_code, x, y, radius=1500, size=15):
+    url = f"{KAKAO_API_BASE}/v2/local/search/category.json"
+    headers = {
+        "Authorization": f"KakaoAK {KAKAO_REST_API_KEY}"
+    }
+    params = {
+        "category_group_code": category_group_code,
+        "x": x,
+        "y": y,
+        "radius": radius,
+        "size": size,
+        "sort": "distance"
+    }
+    resp = kakao_http.get(url, headers=headers, params=params, timeout=(1.0, 5.0))
+    resp.raise_for_status()
+    return resp.json()
+
+
+def match_kakao_place_by_location(name, lat, lon, radius=300):
+    """
+    Google Places에서 받은 가게 이름 + 좌표를 가지고
+    카카오맵 place_id를 찾는다.
+
+    1순위: 키워드 검색(query=정제된 이름, sort=distance)  - 카테고리 제한 X
+    2순위: 주변 음식점(FD6) + 카페(CE7) 카테고리 검색
+    """
+    place_name, place_id, address, _ = _match_kakao_place(name, lat, lon, radius)
+    return place_name, place_id, address
+
+
+def _match_kakao_place(name, lat, lon, radius=300):
+    """
+    match_kakao_place_by_location 본체.
+    반환: (place_name, place_id, address, ok)
+      ok=False → 중간에 API 오류가 있었음 (못 찾은 결과를 캐시하면 안 됨)
+    """
+    if not KAKAO_REST_API_KEY:
+        return None, None, None, False
+
+    ok = True
+
+    # 1) 이름 정제: 너무 긴 이름, 파이프(|) 등 잘라주기
+    clean_name = None
+    if name:
+        # '월화고기 상암점 | Sangam korean bbq restaurant | ...' 이런 형태 방지
+        clean_name = re.split(r'[|ㆍ·\-]', str(name))[0].strip()
+        # 너무 길면 Kakao가 400 던질 수 있으니 자르기 (안전하게 40자)
+        if len(clean_name) > 40:
+            clean_name = clean_name[:40]
+
+    headers = {
+        "Authorization": f"KakaoAK {KAKAO_REST_API_KEY}"
+    }
+
+    # ✅ 1) 이름 기반 키워드 검색 (카테고리 제한 없이 먼저 시도)
+    if clean_name:
+        url = f"{KAKAO_API_BASE}/v2/local/search/keyword.json"
+        params = {
+            "query": clean_name,
+            "x": lon,
+            "y": lat,
+            "radius": radius,
+            "sort": "distance",
+            # ❌ 기존: "category_group_code": "FD6"
+            # → 삭제해서 FD6/CE7/기타 모두 검색되게
+        }
+        try:
+            resp = kakao_http.get(url, headers=headers, params=params)
+            resp.raise_for_status()
+            data = resp.json()
+            docs = data.get("documents", [])
+            if docs:
+                doc = docs[0]
+                place_name = doc.get("place_name")
+                place_id = doc.get("id")
+                address = doc.get("road_address_name") or doc.get("address_name")
+                return place_name, place_id, address, True
+        except Exception as e:
+            ok = False
+            log_event("KAKAO_MATCH_KEYWORD_ERROR", logging.WARNING, error=e)
+
+    # ✅ 2) 이름 기반 검색 실패 시, 주변 음식점(FD6) + 카페(CE7) 카테고리로 시도
+    for cat in ("FD6", "CE7"):
+        try:
+            # 반경은 최소 300m 이상으로 넉넉하게
+            cat_data = kakao_category_search(
+                cat,
+                x=lon,
+                y=lat,
+                radius=max(radius, 300),
+                size=3,  # 여러 개 받아오되, kakao_category_search가 거리순 정렬
+            )
+            docs = cat_data.get("documents", [])
+            if not docs:
+                continue
+
+            doc = docs[0]  # 가장 가까운 1개
+            place_name = doc.get("place_name")
+            place_id = doc.get("id")
+            address = doc.get("road_address_name") or doc.get("address_name")
+            return place_name, place_id, address, True
+        except Exception as e:
+            ok = False
+            log_event("KAKAO_MATCH_CATEGORY_ERROR", logging.WARNING, category=cat, error=e)
+
+    return None, None, None, ok
+
+
+
+
+def get_kakao_basic_info(place_id):
+    url = f"{KAKAO_PLACE_BASE}/main/v/{place_id}"
+    headers = {
+        "Referer": "https://map.kakao.com/"
+    }
+    try:
+        resp = kakao_http.get(url, headers=headers)
+        resp.raise_for_status()
+        data = resp.json()
+    except Exception as e:
+        log_event("KAKAO_BASIC_INFO_ERROR", logging.WARNING, place_id=place_id, error=e)
+        return None
+
+    basic_info = data.get("basicInfo", {})
+    addr = basic_info.get("address", {}).get("newAddr", "")
+    open_info = basic_info.get("openInfo", {}).get("openInfo", "")
+
+    is_open = None
+    try:
+        time_info = basic_info.get("openInfo", {})
+        is_open = time_info.get("openFlag")
+    except Exception:
+        pass
+
+    return {
         "address": addr,
         "open_info": open_info,
         "is_open": is_open,
     }
 
 
+# =========================
+# Google → Kakao 매칭 캐시
+# =========================
+
+KAKAO_MATCH_TTL_DAYS = float(os.getenv("KAKAO_MATCH_TTL_DAYS", "14"))          # 매칭 성공 결과 보관 기간
+KAKAO_MATCH_NEGATIVE_TTL_HOURS = float(os.getenv("KAKAO_MATCH_NEGATIVE_TTL_HOURS", "24"))  # 카카오에 없는 곳 보관 기간
+KAKAO_MATCH_MEMORY_MAX = int(os.getenv("KAKAO_MATCH_MEMORY_MAX", "5000"))      # 프로세스 메모리 캐시 최대 항목 수
+
+
+class KakaoMatchCache:
+    """
+    Google 장소 → 카카오 place 매칭 결과 캐시 (2단).
+
+    1단: 프로세스 메모리 (LRU + TTL)
+    2단: Postgres kakao_place_matches 테이블 (배포/재시작 후에도 유지)
+
+    - 키: Google place id 우선, 없으면 정제된 이름 + 좌표(소수 4자리, 약 10m) 조합
+    - 카카오에 없는 곳(miss)도 짧은 TTL로 저장해서 매번 API 3번씩 쓰지 않게 함
+    - 값: (place_name, kakao_place_id, address) / miss 는 (None, None, None)
+    - DB 쓰기는 put() 으로 모아뒀다가 flush() 에서 한 번에 upsert
+    """
+
+    MISS = (None, None, None)
+
+    def __init__(self, ttl_sec, negative_ttl_sec, max_items=5000):
+        self.ttl_sec = ttl_sec
+        self.negative_ttl_sec = negative_ttl_sec
+        self.max_items = max_items
+
+        self._lock = threading.Lock()
+        self._mem = OrderedDict()   # key -> (value, expires_at(epoch))
+        self._pending = {}          # key -> (value, expires_at(epoch))
+        self._stats = defaultdict(int)
+
+    @staticmethod
+    def keys_for(place):
+        keys = []
+        gid = place.get("google_place_id")
+        if gid:
+            keys.append(f"g:{gid}")
+
+        name = place.get("name")
+        plat = place.get("lat")
+        plon = place.get("lon")
+        if name and plat is not None and plon is not None:
+            clean = re.sub(r"\s+", " ", str(name)).strip().lower()
+            keys.append(f"n:{clean[:120]}:{round(float(plat), 4)}:{round(float(plon), 4)}")
+        return keys
+
+    def _mem_get(self, key, now):
+        item = self._mem.get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at <= now:
+            del self._mem[key]
+            return None
+        self._mem.move_to_end(key)
+        return value
+
+    def _mem_set(self, key, value, expires_at):
+        self._mem[key] = (value, expires_at)
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.max_items:
+            self._mem.popitem(last=False)
+
+    def get_many(self, places):
+        """
+        places 순서대로 캐시 값 리스트 반환 (없으면 None).
+        메모리에 없는 키들만 모아서 DB 는 한 번만 조회한다.
+        """
+        now = time.time()
+        results = [None] * len(places)
+        place_keys = [self.keys_for(p) for p in places]
+        missing_keys = set()
+
+        with self._lock:
+            for i, keys in enumerate(place_keys):
+                for k in keys:
+                    value = self._mem_get(k, now)
+                    if value is not None:
+                        results[i] = value
+                        self._stats["memory_hits"] += 1
+                        break
+                else:
+                    missing_keys.update(keys)
+
+        if missing_keys:
+            db_values = self._db_get(list(missing_keys))
+            with self._lock:
+                for k, (value, expires_at) in db_values.items():
+                    self._mem_set(k, value, expires_at)
+                for i, keys in enumerate(place_keys):
+                    if results[i] is not None:
+                        continue
+                    for k in keys:
+                        if k in db_values:
+                            results[i] = db_values[k][0]
+                            self._stats["db_hits"] += 1
+                            break
+
+        with self._lock:
+            for value in results:
+                if value is None:
+                    self._stats["misses"] += 1
+                elif value == self.MISS:
+                    self._stats["negative_hits"] += 1
+        return results
+
+    def put(self, place, place_name, kakao_place_id, address):
+        if kakao_place_id:
+            value = (place_name, str(kakao_place_id), address)
+            expires_at = time.time() + self.ttl_sec
+        else:
+            value = self.MISS
+            expires_at = time.time() + self.negative_ttl_sec
+
+        with self._lock:
+            for k in self.keys_for(place):
+                self._mem_set(k, value, expires_at)
+                self._pending[k] = (value, expires_at)
+            self._stats["stored"] += 1
+
+    def _db_get(self, keys):
+        found = {}
+        try:
+            with get_conn() as conn:
+                cur = conn.cursor()
+                cur.execute(
+                    """
+                    SELECT cache_key, place_name, kakao_place_id, address,
+                           EXTRACT(EPOCH FROM expires_at)
+                    FROM kakao_place_matches
+                    WHERE cache_key = ANY(%s)
+                      AND expires_at > NOW();
+                    """,
+                    (keys,),
+                )
+                for key, place_name, kakao_place_id, address, expires_at in cur.fetchall():
+                    if kakao_place_id:
+                        value = (place_name, kakao_place_id, address)
+                    else:
+                        value = self.MISS
+                    found[key] = (value, float(expires_at))
+                cur.close()
+        except Exception as e:
+            log_event("KAKAO_MATCH_CACHE_DB_GET_ERR", logging.WARNING, error=e)
+            with self._lock:
+                self._stats["db_errors"] += 1
+        return found
+
+    def flush(self):
+        """put() 으로 쌓인 항목을 DB 에 한 번에 upsert"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+
+        rows = [
+            (k, v[0], v[1], v[2], datetime.fromtimestamp(expires_at, tz=timezone.utc))
+            for k, (v, expires_at) in pending.items()
+        ]
+        try:
+            with get_conn() as conn:
+                cur = conn.cursor()
+                execute_values(
+                    cur,
+                    """
+                    INSERT INTO kakao_place_matches
+                        (cache_key, place_name, kakao_place_id, address, expires_at)
+                    VALUES %s
+                    ON CONFLICT (cache_key)
+                    DO UPDATE SET
+                        place_name     = EXCLUDED.place_name,
+                        kakao_place_id = EXCLUDED.kakao_place_id,
+                        address        = EXCLUDED.address,
+                        expires_at     = EXCLUDED.expires_at,
+                        updated_at     = NOW();
+                    """,
+                    rows,
+                )
+                conn.commit()
+                cur.close()
+        except Exception as e:
+            log_event("KAKAO_MATCH_CACHE_FLUSH_ERR", logging.WARNING, error=e)
+            with self._lock:
+                self._stats["db_errors"] += 1
+                # 다음 flush 때 다시 시도 (그 사이 새로 들어온 값이 우선)
+                for k, item in pending.items():
+                    self._pending.setdefault(k, item)
+            return 0
+        return len(rows)
+
+    def stats(self):
+        with self._lock:
+            data = dict(self._stats)
+            data["memory_items"] = len(self._mem)
+            data["pending_writes"] = len(self._pending)
+        return data
+
+
+kakao_match_cache = KakaoMatchCache(
+    ttl_sec=KAKAO_MATCH_TTL_DAYS * 86400,
+    negative_ttl_sec=KAKAO_MATCH_NEGATIVE_TTL_HOURS * 3600,
+    max_items=KAKAO_MATCH_MEMORY_MAX,
+)
+
+
+# =========================
+# Google Places 타일 캐시
+# =========================
+
+GOOGLE_PLACES_CACHE_TTL_MIN = float(os.getenv("GOOGLE_PLACES_CACHE_TTL_MIN", "360"))   # 타일 결과 유효 시간(분)
+GOOGLE_PLACES_GEOHASH_PRECISION = int(os.getenv("GOOGLE_PLACES_GEOHASH_PRECISION", "7"))  # 7자리 ≒ 150m x 150m
+GOOGLE_PLACES_RADIUS_BUCKETS = (500, 1000, 1500, 2000, 3000, 5000)
+GOOGLE_PLACES_CACHE_MEMORY_MAX = int(os.getenv("GOOGLE_PLACES_CACHE_MEMORY_MAX", "500"))
+
+_GEOHASH_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def geohash_encode(lat, lon, precision=7):
+    """위도/경도를 geohash 문자열로 변환"""
+    lat_lo, lat_hi = -90.0, 90.0
+    lon_lo, lon_hi = -180.0, 180.0
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True  # 짝수 번째 비트는 경도
+
+    while len(chars) < precision:
+        if even:
+            mid = (lon_lo + lon_hi) / 2
+            if lon >= mid:
+                bits = (bits << 1) | 1
+                lon_lo = mid
+            else:
+                bits <<= 1
+                lon_hi = mid
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            if lat >= mid:
+                bits = (bits << 1) | 1
+                lat_lo = mid
+            else:
+                bits <<= 1
+                lat_hi = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_GEOHASH_BASE32[bits])
+            bits = 0
+            bit_count = 0
+
+    return "".join(chars)
+
+
+def geohash_center(gh):
+    """geohash 셀의 중심 좌표 (lat, lon)"""
+    lat_lo, lat_hi = -90.0, 90.0
+    lon_lo, lon_hi = -180.0, 180.0
+    even = True
+
+    for ch in gh:
+        val = _GEOHASH_BASE32.index(ch)
+        for shift in range(4, -1, -1):
+            bit = (val >> shift) & 1
+            if even:
+                mid = (lon_lo + lon_hi) / 2
+                if bit:
+                    lon_lo = mid
+                else:
+                    lon_hi = mid
+            else:
+                mid = (lat_lo + lat_hi) / 2
+                if bit:
+                    lat_lo = mid
+                else:
+                    lat_hi = mid
+            even = not even
+
+    return (lat_lo + lat_hi) / 2, (lon_lo + lon_hi) / 2
+
+
+def radius_bucket(radius_m):
+    """반경을 정해진 구간으로 올림 (캐시 키 종류를 줄이기 위함)"""
+    for b in GOOGLE_PLACES_RADIUS_BUCKETS:
+        if radius_m <= b:
+            return b
+    return GOOGLE_PLACES_RADIUS_BUCKETS[-1]
+
+
+class GooglePlacesTileCache:
+    """
+    search_google_places 결과 캐시 (geohash 타일 + 반경 구간 단위).
+
+    - 캐시 미스면 사용자 좌표가 아니라 '타일 중심' 기준으로 Google 을 호출해서
+      같은 타일 안의 다른 사용자도 그 결과를 그대로 재사용
+    - 저장하는 건 시간에 따라 안 변하는 정보 + 주간 영업 구간(opening_hours) 뿐
+      (거리, 영업 중 여부는 읽을 때마다 다시 계산)
+    - 1단: 프로세스 메모리 / 2단: Postgres google_places_tiles (JSONB)
+    - 같은 타일을 동시에 미스한 요청은 한 번만 Google 을 호출 (타일별 락)
+    """
+
+    def __init__(self, ttl_sec, max_items=500):
+        self.ttl_sec = ttl_sec
+        self.max_items = max_items
+
+        self._lock = threading.Lock()
+        self._mem = OrderedDict()     # tile_key -> (entries, fetched_at(epoch))
+        self._key_locks = {}
+        self._stats = defaultdict(int)
+
+    def _key_lock(self, key):
+        with self._lock:
+            lock = self._key_locks.get(key)
+            if lock is None:
+                lock = self._key_locks[key] = threading.Lock()
+            return lock
+
+    def _mem_get(self, key):
+        with self._lock:
+            item = self._mem.get(key)
+            if item is None:
+                return None
+            entries, fetched_at = item
+            if time.time() - fetched_at >= self.ttl_sec:
+                del self._mem[key]
+                return None
+            self._mem.move_to_end(key)
+            return entries
+
+    def _mem_set(self, key, entries, fetched_at):
+        with self._lock:
+            self._mem[key] = (entries, fetched_at)
+            self._mem.move_to_end(key)
+            while len(self._mem) > self.max_items:
+                self._mem.popitem(last=False)
+
+    def _db_get(self, key):
+        try:
+            with get_conn() as conn:
+                cur = conn.cursor()
+                cur.execute(
+                    """
+                    SELECT places, EXTRACT(EPOCH FROM fetched_at)
+                    FROM google_places_tiles
+                    WHERE tile_key = %s
+                      AND fetched_at > NOW() - make_interval(secs => %s);
+                    """,
+                    (key, self.ttl_sec),
+                )
+                row = cur.fetchone()
+                cur.close()
+        except Exception as e:
+            log_event("GOOGLE_TILE_CACHE_DB_GET_ERR", logging.WARNING, error=e)
+            with self._lock:
+                self._stats["db_errors"] += 1
+            return None
+
+        if not row:
+            return None
+        return row[0], float(row[1])
+
+    def _db_set(self, key, entries):
+        try:
+            with get_conn() as conn:
+                cur = conn.cursor()
+                cur.execute(
+                    """
+                    INSERT INTO google_places_tiles (tile_key, places, fetched_at)
+                    VALUES (%s, %s, NOW())
+                    ON CONFLICT (tile_key)
+                    DO UPDATE SET
+                        places     = EXCLUDED.places,
+                        fetched_at = EXCLUDED.fetched_at;
+                    """,
+                    (key, Json(entries)),
+                )
+                conn.commit()
+                cur.close()
+        except Exception as e:
+            log_event("GOOGLE_TILE_CACHE_DB_SET_ERR", logging.WARNING, error=e)
+            with self._lock:
+                self._stats["db_errors"] += 1
+
+    def get_or_fetch(self, key, fetch):
+        """
+        캐시된 장소 목록(정적 정보)을 돌려주고, 없으면 fetch() 로 채운다.
+        fetch() 가 None 을 돌려주면(오류) 캐시하지 않고 빈 리스트.
+        """
+        entries = self._mem_get(key)
+        if entries is not None:
+            with self._lock:
+                self._stats["memory_hits"] += 1
+            return entries
+
+        with self._key_lock(key):
+            # 락 기다리는 사이 다른 요청이 채웠을 수 있음
+            entries = self._mem_get(key)
+            if entries is not None:
+                with self._lock:
+                    self._stats["memory_hits"] += 1
+                return entries
+
+            found = self._db_get(key)
+            if found is not None:
+                entries, fetched_at = found
+                self._mem_set(key, entries, fetched_at)
+                with self._lock:
+                    self._stats["db_hits"] += 1
+                return entries
+
+            with self._lock:
+                self._stats["misses"] += 1
+            entries = fetch()
+            if entries is None:
+                with self._lock:
+                    self._stats["fetch_errors"] += 1
+                return []
+
+            self._mem_set(key, entries, time.time())
+            self._db_set(key, entries)
+            return entries
+
+    def stats(self):
+        with self._lock:
+            data = dict(self._stats)
+            data["memory_tiles"] = len(self._mem)
+        return data
+
+
+google_places_cache = GooglePlacesTileCache(
+    ttl_sec=GOOGLE_PLACES_CACHE_TTL_MIN * 60,
+    max_items=GOOGLE_PLACES_CACHE_MEMORY_MAX,
+)
+
+
 def search_google_places(lat, lon, radius_m=1500, max_results=20):
     """
     Google Places 'searchNearby'로 (lat, lon) 주변 음식점 목록을 가져온다.
+    (geohash 타일 + 반경 구간 단위로 캐시, 거리/영업 여부는 매번 다시 계산)
     - 반환 형식: [
         {
-          name, lat, lon, rating,
+          google_place_id, name, lat, lon, rating,
           address, open_info, category,
           photo_url, distance_km, reviews,
           user_rating_count, open_now, open_in_1h
@@ -489,10 +2388,36 @@ def search_google_places(lat, lon, radius_m=1500, max_results=20):
       ]
     """
     if not GOOGLE_PLACES_API_KEY:
-        print("⚠ GOOGLE_PLACES_API_KEY가 설정되어 있지 않습니다.")
+        log_event("GOOGLE_PLACES_API_KEY_MISSING", logging.WARNING)
         return []
 
-    url = "https://places.googleapis.com/v1/places:searchNearby"
+    tile = geohash_encode(lat, lon, GOOGLE_PLACES_GEOHASH_PRECISION)
+    bucket = radius_bucket(radius_m)
+    key = f"{tile}:{bucket}:{max_results}"
+    center_lat, center_lon = geohash_center(tile)
+
+    entries = google_places_cache.get_or_fetch(
+        key,
+        lambda: fetch_google_places(center_lat, center_lon, bucket, max_results),
+    )
+
+    # 한국 서비스용이라 KST(+9) 기준으로 계산
+    now_kst = datetime.utcnow() + timedelta(hours=9)
+
+    # 사용자 위치 기준 거리는 한 번에 계산 (좌표 없는 곳은 0.0)
+    lats = [e.get("lat") if e.get("lat") is not None else np.nan for e in entries]
+    lons = [e.get("lon") if e.get("lon") is not None else np.nan for e in entries]
+    dists = np.nan_to_num(haversine_km(lat, lon, lats, lons)).tolist() if entries else []
+
+    return [_google_place_view(e, d, now_kst) for e, d in zip(entries, dists)]
+
+
+def fetch_google_places(lat, lon, radius_m=1500, max_results=20):
+    """
+    실제 Google Places 'searchNearby' 호출.
+    반환: 캐시 가능한 정적 정보 리스트 (오류면 None)
+    """
+    url = f"{GOOGLE_PLACES_BASE}/v1/places:searchNearby"
 
     field_mask = ",".join([
         "places.id",
@@ -526,234 +2451,315 @@ def search_google_places(lat, lon, radius_m=1500, max_results=20):
     }
 
     try:
-        resp = requests.post(url, headers=headers, json=body, timeout=5)
+        resp = google_http.post(url, headers=headers, json=body)
         # 여기서 상태코드 먼저 확인
         if not resp.ok:
-            print(
-                "[GOOGLE_PLACES_ERROR]",
-                "status=", resp.status_code,
-                "body=", resp.text[:500]  # 길면 500자까지만
+            log_event(
+                "GOOGLE_PLACES_ERROR", logging.WARNING,
+                status=resp.status_code,
+                body=resp.text[:500],  # 길면 500자까지만
             )
-            return []
+            return None
         data = resp.json()
         raw_places = data.get("places", [])
     except Exception as e:
-        print("[GOOGLE_PLACES_EXCEPTION]", e)
-        return []
+        log_event("GOOGLE_PLACES_EXCEPTION", logging.WARNING, error=e)
+        return None
 
-    results = []
-
-    for p in raw_places:
-        display_name = p.get("displayName", {})
-        name = display_name.get("text", "")
-
-        loc = p.get("location", {})
-        plat = loc.get("latitude")
-        plon = loc.get("longitude")
-
-        rating = p.get("rating", 0.0)
-        user_rating_count = p.get("userRatingCount", 0)
-        address = p.get("shortFormattedAddress") or ""
-
-        # ── 영업시간 / 영업 여부 (현재 + 1시간 뒤) ─────────────────
-        open_info = ""
-        open_now = None
-        open_in_1h = None
-
-        opening = p.get("currentOpeningHours") or p.get("regularOpeningHours")
-        if opening:
-            # 1) human readable 텍스트 (카드에 노출용)
-            weekday_desc = opening.get("weekdayDescriptions") or []
-            closed_days_en = []
-            open_ranges = []
-
-            for line in weekday_desc:
-                if ":" in line:
-                    day_part, rest = line.split(":", 1)
-                    day_en = day_part.strip()
-                    info = rest.strip()
-                else:
-                    day_en = ""
-                    info = line.strip()
+    return [_parse_google_place(p) for p in raw_places]
 
-                if "Closed" in info or "closed" in info:
-                    closed_days_en.append(day_en)
-                else:
-                    if info:
-                        open_ranges.append(info)
-
-            day_map = {
-                "Monday": "월요일",
-                "Tuesday": "화요일",
-                "Wednesday": "수요일",
-                "Thursday": "목요일",
-                "Friday": "금요일",
-                "Saturday": "토요일",
-                "Sunday": "일요일",
-            }
-            if closed_days_en:
-                closed_kr = ", ".join(day_map.get(d, d) for d in closed_days_en)
+
+def _parse_google_place(p):
+    """Google 응답 1건 → 캐시 가능한(시간에 따라 안 변하는) 정보만 추출"""
+    display_name = p.get("displayName", {})
+    name = display_name.get("text", "")
+
+    loc = p.get("location", {})
+    plat = loc.get("latitude")
+    plon = loc.get("longitude")
+
+    rating = p.get("rating", 0.0)
+    user_rating_count = p.get("userRatingCount", 0)
+    address = p.get("shortFormattedAddress") or ""
+
+    # ── 영업시간 텍스트 + periods ───────────────────────────────
+    open_info = ""
+    periods = []
+
+    opening = p.get("currentOpeningHours") or p.get("regularOpeningHours")
+    if opening:
+        # 1) human readable 텍스트 (카드에 노출용)
+        weekday_desc = opening.get("weekdayDescriptions") or []
+        closed_days_en = []
+        open_ranges = []
+
+        for line in weekday_desc:
+            if ":" in line:
+                day_part, rest = line.split(":", 1)
+                day_en = day_part.strip()
+                info = rest.strip()
             else:
-                closed_kr = "별도 휴무일 정보 없음"
+                day_en = ""
+                info = line.strip()
 
-            if open_ranges:
-                hours_text = open_ranges[0]
+            if "Closed" in info or "closed" in info:
+                closed_days_en.append(day_en)
             else:
-                hours_text = "영업 시간 정보 없음"
+                if info:
+                    open_ranges.append(info)
+
+        day_map = {
+            "Monday": "월요일",
+            "Tuesday": "화요일",
+            "Wednesday": "수요일",
+            "Thursday": "목요일",
+            "Friday": "금요일",
+            "Saturday": "토요일",
+            "Sunday": "일요일",
+        }
+        if closed_days_en:
+            closed_kr = ", ".join(day_map.get(d, d) for d in closed_days_en)
+        else:
+            closed_kr = "별도 휴무일 정보 없음"
 
-            open_info = f"휴무 요일: {closed_kr}, 영업 시간: {hours_text}"
+        if open_ranges:
+            hours_text = open_ranges[0]
+        else:
+            hours_text = "영업 시간 정보 없음"
 
-            # 2) periods 기반 현재/1시간 뒤 영업 여부 계산
-            periods = opening.get("periods") or []
-            # 한국 서비스용이라 KST(+9) 기준으로 계산
-            now_kst = datetime.utcnow() + timedelta(hours=9)
-            if periods:
-                open_now = _is_open_at(periods, now_kst)
-                open_in_1h = _is_open_at(periods, now_kst + timedelta(hours=1))
+        open_info = f"휴무 요일: {closed_kr}, 영업 시간: {hours_text}"
 
-            # Google이 openNow도 주면 그대로 활용 (보정용)
-            if open_now is None and "openNow" in opening:
-                open_now = bool(opening.get("openNow"))
+        # 2) periods 는 주간 구간으로 한 번만 변환해서 저장, 영업 여부는 읽을 때 bisect
+        periods = opening.get("periods") or []
 
-        # ───────────────────────────────────────────────────────────
+    # ───────────────────────────────────────────────────────────
 
-        raw_cat = p.get("primaryTypeDisplayName") or ""
-        if isinstance(raw_cat, dict):
-            en_cat = raw_cat.get("text", "")
-        else:
-            en_cat = str(raw_cat) if raw_cat is not None else ""
-        category = translate_category_to_kr(en_cat)
-
-        # 사진 여러 장
-        photos = p.get("photos") or []
-        photo_urls = []
-        for ph in photos[:5]:
-            photo_name = ph.get("name")
-            if not photo_name:
-                continue
-            url = (
-                f"https://places.googleapis.com/v1/{photo_name}/media"
-                f"?maxWidthPx=400&maxHeightPx=300&key={GOOGLE_PLACES_API_KEY}"
-            )
-            photo_urls.append(url)
+    raw_cat = p.get("primaryTypeDisplayName") or ""
+    if isinstance(raw_cat, dict):
+        en_cat = raw_cat.get("text", "")
+    else:
+        en_cat = str(raw_cat) if raw_cat is not None else ""
+    category = translate_category_to_kr(en_cat)
+
+    # 사진 여러 장 (URL 에 API 키가 들어가므로 이름만 저장)
+    photos = p.get("photos") or []
+    photo_names = [ph.get("name") for ph in photos[:5] if ph.get("name")]
+
+    reviews_raw = p.get("reviews") or []
+    reviews = []
+    for rv in reviews_raw:
+        text_info = rv.get("text", {})
+        txt = text_info.get("text", "")
+        if txt:
+            reviews.append(txt)
+
+    return {
+        "google_place_id": p.get("id"),
+        "name": name,
+        "lat": plat,
+        "lon": plon,
+        "rating": rating,
+        "address": address,
+        "open_info": open_info,
+        "opening_hours": compile_opening_hours(periods),
+        "category": category,
+        "photo_names": photo_names,
+        "reviews": reviews,
+        "user_rating_count": user_rating_count,
+    }
 
-        photo_url = photo_urls[0] if photo_urls else None
 
-        reviews_raw = p.get("reviews") or []
-        reviews = []
-        for rv in reviews_raw:
-            text_info = rv.get("text", {})
-            txt = text_info.get("text", "")
-            if txt:
-                reviews.append(txt)
+def _google_place_view(entry, dist_km, now_kst):
+    """캐시된 정적 정보 + 사용자와의 거리 / 현재 시각 → search_google_places 결과 형식"""
+    plat = entry.get("lat")
+    plon = entry.get("lon")
 
-        dist_km = 0.0
-        try:
-            if plat is not None and plon is not None:
-                dist_km = calculate_distance(lat, lon, plat, plon)
-        except Exception:
-            dist_km = 0.0
+    photo_urls = [
+        f"https://places.googleapis.com/v1/{photo_name}/media"
+        f"?maxWidthPx=400&maxHeightPx=300&key={GOOGLE_PLACES_API_KEY}"
+        for photo_name in entry.get("photo_names") or []
+    ]
+    photo_url = photo_urls[0] if photo_urls else None
 
-        results.append(
-            {
-                "name": name,
-                "lat": plat,
-                "lon": plon,
-                "rating": rating,
-                "address": address,
-                "open_info": open_info,
-                "category": category,
-                "photo_url": photo_url,
-                "photo_urls": photo_urls,
-                "distance_km": dist_km,
-                "reviews": reviews,
-                "user_rating_count": user_rating_count,
-                "open_now": open_now,
-                "open_in_1h": open_in_1h,
-            }
-        )
+    # 현재/1시간 뒤 영업 여부 (예전 캐시 항목은 periods 만 있으므로 그때만 변환)
+    if "opening_hours" in entry:
+        hours = entry["opening_hours"]
+    else:
+        hours = compile_opening_hours(entry.get("periods"))
+    minute = week_minute(now_kst)
+    open_now = is_open_at_minute(hours, minute)
+    open_in_1h = is_open_at_minute(hours, minute + 60)
 
-    return results
+    return {
+        "google_place_id": entry.get("google_place_id"),
+        "name": entry.get("name"),
+        "lat": plat,
+        "lon": plon,
+        "rating": entry.get("rating"),
+        "address": entry.get("address"),
+        "open_info": entry.get("open_info"),
+        "category": entry.get("category"),
+        "photo_url": photo_url,
+        "photo_urls": photo_urls,
+        "distance_km": dist_km,
+        "reviews": list(entry.get("reviews") or []),
+        "user_rating_count": entry.get("user_rating_count"),
+        "open_now": open_now,
+        "open_in_1h": open_in_1h,
+        "opening_hours": hours,
+    }
 
 
 # ================== ALIGO 공통 유틸 =========================
 
-def get_aligo_token():
-    """알리고 토큰 발급"""
+def get_aligo_token(ttl_min=ALIGO_TOKEN_TTL_MIN):
+    """알리고 토큰 발급 (ttl_min 분 동안 유효)"""
     if not ALIGO_API_KEY or not ALIGO_USER_ID:
-        app.logger.error("[ALIGO] APIKEY / USERID 미설정")
+        log_event("ALIGO_CONFIG_ERROR", logging.ERROR, missing="APIKEY/USERID")
         return None
 
-    url = "https://kakaoapi.aligo.in/akv10/token/create/30/s/"
+    # /token/create/{시간}/{단위}/  (단위 i = 분)
+    url = f"{ALIGO_API_BASE}/akv10/token/create/{int(ttl_min)}/i/"
     data = {
         "apikey": ALIGO_API_KEY,
         "userid": ALIGO_USER_ID,
     }
 
     try:
-        r = requests.post(url, data=data, timeout=5)
+        r = aligo_http.post(url, data=data)
         r.raise_for_status()
         js = r.json()
     except Exception as e:
-        app.logger.exception("[ALIGO] token 요청 실패: %s", e)
+        log_event("ALIGO_TOKEN_ERROR", logging.ERROR, exc_info=True, error=e)
         return None
 
     if js.get("code") != 0:
-        app.logger.error("[ALIGO] token 발급 실패: %s", js)
+        log_event("ALIGO_TOKEN_ERROR", logging.ERROR, code=js.get("code"), message=js.get("message"))
         return None
 
     return js.get("token")
 
 
-def send_alimtalk(
-    template_code,
-    receiver,
-    subject,
-    message,
-    btn_mobile_url=None,
-    btn_pc_url=None,
-    btn_name="자세히 보기",
-    button_json=None,
-    emtitle=None,   # ✅ 강조표기 템플릿용
-):
-    """알리고 알림톡 공통 발송 함수"""
-    token = get_aligo_token()
-    if not token:
-        return False, {"msg": "TOKEN_ERROR"}
-
-    if not (ALIGO_SENDER_KEY and ALIGO_SENDER):
-        app.logger.error("[ALIGO] SENDER_KEY / SENDER 미설정")
-        return False, {"msg": "CONFIG_ERROR"}
-
-    url = "https://kakaoapi.aligo.in/akv10/alimtalk/send/"
-
-    payload = {
-        "apikey": ALIGO_API_KEY,
-        "userid": ALIGO_USER_ID,
-        "senderkey": ALIGO_SENDER_KEY,
-        "token": token,
-        "tpl_code": template_code,
-        "sender": ALIGO_SENDER,
-        "receiver_1": receiver,
-        "subject_1": subject,   # 부제(자유롭게 써도 됨)
-        "message_1": message,   # 템플릿 본문과 100% 일치해야 함
-        "failover": "N",
-    }
+class AligoTokenManager:
+    """
+    알리고 토큰을 워커 안에서 재사용하기 위한 관리자 (스레드 안전).
 
-    # ✅ 강조표기 타이틀(템플릿에서 emtitle_1 로 지정된 부분)
-    if emtitle:
-        payload["emtitle_1"] = emtitle
+    - 발급받은 토큰은 만료 refresh_margin 초 전까지 그대로 사용
+    - 만료 임박 구간에서는 한 스레드만 미리 재발급하고,
+      나머지 스레드는 아직 유효한 기존 토큰으로 계속 발송
+    - 토큰이 없거나 이미 만료됐으면 락을 잡고 한 번만 발급 (나머지는 대기 후 재사용)
+    """
 
-    # 테스트 모드
-    if ALIGO_TESTMODE.upper() == "Y":
-        payload["testMode"] = "Y"
+    def __init__(self, issue, ttl_sec, refresh_margin_sec=60):
+        self._issue = issue
+        self.ttl_sec = ttl_sec
+        # 마진이 TTL 보다 크면 매번 재발급하게 되므로 TTL 절반으로 제한
+        self.refresh_margin_sec = min(refresh_margin_sec, ttl_sec / 2)
+
+        self._lock = threading.Lock()          # 토큰/통계 보호
+        self._refresh_lock = threading.Lock()  # 동시에 한 스레드만 발급
+        self._token = None
+        self._expires_at = 0.0
+
+        self._stats = {
+            "issued": 0,
+            "issue_failures": 0,
+            "served_cached": 0,
+            "invalidated": 0,
+            "refresh_ms_last": 0.0,
+            "refresh_ms_max": 0.0,
+            "refresh_ms_total": 0.0,
+        }
 
+    def _refresh(self):
+        started = time.monotonic()
+        token = self._issue()
+        elapsed_ms = (time.monotonic() - started) * 1000
+
+        with self._lock:
+            self._stats["refresh_ms_last"] = elapsed_ms
+            self._stats["refresh_ms_max"] = max(self._stats["refresh_ms_max"], elapsed_ms)
+            self._stats["refresh_ms_total"] += elapsed_ms
+            if not token:
+                self._stats["issue_failures"] += 1
+                return None
+            self._stats["issued"] += 1
+            # 발급 요청 시작 시각 기준으로 만료 계산 (보수적으로)
+            self._token = token
+            self._expires_at = started + self.ttl_sec
+        return token
+
+    def get(self):
+        now = time.monotonic()
+        with self._lock:
+            token, expires_at = self._token, self._expires_at
+
+        if token and now < expires_at - self.refresh_margin_sec:
+            with self._lock:
+                self._stats["served_cached"] += 1
+            return token
+
+        if token and now < expires_at:
+            # 만료 임박: 누가 재발급 중이면 기존 토큰 그대로 사용
+            if self._refresh_lock.acquire(blocking=False):
+                try:
+                    new_token = self._refresh()
+                finally:
+                    self._refresh_lock.release()
+                if new_token:
+                    return new_token
+            with self._lock:
+                self._stats["served_cached"] += 1
+            return token
+
+        # 토큰 없음 / 만료 → 한 스레드만 발급
+        with self._refresh_lock:
+            with self._lock:
+                if self._token and time.monotonic() < self._expires_at - self.refresh_margin_sec:
+                    self._stats["served_cached"] += 1
+                    return self._token
+            return self._refresh()
+
+    def invalidate(self, token=None):
+        """
+        알리고가 토큰을 거부했을 때 캐시 비우기 → 다음 get() 에서 새로 발급.
+        token 을 주면 그 토큰이 아직 캐시에 있을 때만 비움
+        (다른 스레드가 이미 새 토큰을 받아둔 경우 그걸 버리지 않도록)
+        """
+        with self._lock:
+            if token is not None and self._token != token:
+                return
+            self._token = None
+            self._expires_at = 0.0
+            self._stats["invalidated"] += 1
+
+    def stats(self):
+        with self._lock:
+            data = dict(self._stats)
+            refreshes = data["issued"] + data["issue_failures"]
+            data["refresh_ms_avg"] = round(data.pop("refresh_ms_total") / refreshes, 1) if refreshes else 0.0
+            data["refresh_ms_last"] = round(data["refresh_ms_last"], 1)
+            data["refresh_ms_max"] = round(data["refresh_ms_max"], 1)
+            data["has_token"] = self._token is not None
+            data["expires_in_sec"] = max(0.0, round(self._expires_at - time.monotonic(), 1))
+        return data
+
+
+aligo_token_manager = AligoTokenManager(
+    get_aligo_token,
+    ttl_sec=ALIGO_TOKEN_TTL_MIN * 60,
+    refresh_margin_sec=ALIGO_TOKEN_REFRESH_MARGIN_SEC,
+)
+
+
+def _alimtalk_button_json(btn_mobile_url=None, btn_pc_url=None, btn_name="자세히 보기", button_json=None):
+    """button_N 에 들어갈 JSON 문자열 (버튼 없으면 None)"""
     # 1) 버튼 JSON 직접 지정 (AC 채널추가 등)
     if button_json is not None:
-        payload["button_1"] = json.dumps(button_json, ensure_ascii=False)
+        return json.dumps(button_json, ensure_ascii=False)
 
     # 2) 버튼 JSON 없고, 웹링크 버튼 쓰는 경우 (reco/feedback)
-    elif btn_mobile_url or btn_pc_url:
+    if btn_mobile_url or btn_pc_url:
         mobile = btn_mobile_url or btn_pc_url
         pc = btn_pc_url or btn_mobile_url
         button_obj = {
@@ -766,18 +2772,238 @@ def send_alimtalk(
                 }
             ]
         }
-        payload["button_1"] = json.dumps(button_obj, ensure_ascii=False)
+        return json.dumps(button_obj, ensure_ascii=False)
+
+    return None
+
+
+def alimtalk_item(
+    receiver,
+    subject,
+    message,
+    btn_mobile_url=None,
+    btn_pc_url=None,
+    btn_name="자세히 보기",
+    button_json=None,
+    emtitle=None,
+):
+    """send_alimtalk_batch 에 넘길 수신자 1명분 데이터"""
+    return {
+        "receiver": receiver,
+        "subject": subject,
+        "message": message,
+        "emtitle": emtitle,
+        "button": _alimtalk_button_json(btn_mobile_url, btn_pc_url, btn_name, button_json),
+    }
+
+
+def send_alimtalk_batch(template_code, items, batch_size=None):
+    """
+    알리고 알림톡 다건 발송.
+    items 를 batch_size 명씩 잘라 receiver_N / message_N / button_N 슬롯에 채워서
+    요청 1번에 여러 명씩 보낸다.
+
+    반환: {수신번호: (ok, res)}
+      - res 에는 해당 요청의 알리고 응답과 몇 번째 슬롯이었는지(slot)가 들어감
+      - 응답 info 의 fcnt 가 0 이면 요청에 묶인 번호 모두 성공
+      - fcnt > 0 이면 mid 로 전송 내역을 조회해서 번호별 결과(detail)를 붙임.
+        내역에 없거나 아직 결과가 안 나온 번호는 ok=False, res["delivery"] = "unknown"
+        (실제로 갔을 수도 있으므로 재발송 여부는 호출하는 쪽에서 판단)
+    """
+    batch_size = max(1, min(int(batch_size or ALIGO_BATCH_MAX), ALIGO_BATCH_MAX))
+
+    # 같은 번호가 두 번 들어오면 한 번만 발송
+    unique_items = list({it["receiver"]: it for it in items if it.get("receiver")}.values())
+    results = {}
+    if not unique_items:
+        return results
+
+    token = aligo_token_manager.get()
+    if not token:
+        for it in unique_items:
+            results[it["receiver"]] = (False, {"msg": "TOKEN_ERROR"})
+        return results
+
+    if not (ALIGO_SENDER_KEY and ALIGO_SENDER):
+        log_event("ALIGO_CONFIG_ERROR", logging.ERROR, missing="SENDER_KEY/SENDER")
+        for it in unique_items:
+            results[it["receiver"]] = (False, {"msg": "CONFIG_ERROR"})
+        return results
+
+    url = f"{ALIGO_API_BASE}/akv10/alimtalk/send/"
+
+    for start in range(0, len(unique_items), batch_size):
+        chunk = unique_items[start:start + batch_size]
+
+        payload = {
+            "apikey": ALIGO_API_KEY,
+            "userid": ALIGO_USER_ID,
+            "senderkey": ALIGO_SENDER_KEY,
+            "token": token,
+            "tpl_code": template_code,
+            "sender": ALIGO_SENDER,
+            "failover": "N",
+        }
+
+        for n, it in enumerate(chunk, start=1):
+            payload[f"receiver_{n}"] = it["receiver"]
+            payload[f"subject_{n}"] = it.get("subject") or ""   # 부제(자유롭게 써도 됨)
+            payload[f"message_{n}"] = it["message"]             # 템플릿 본문과 100% 일치해야 함
+
+            # ✅ 강조표기 타이틀(템플릿에서 emtitle_N 로 지정된 부분)
+            if it.get("emtitle"):
+                payload[f"emtitle_{n}"] = it["emtitle"]
+
+            if it.get("button"):
+                payload[f"button_{n}"] = it["button"]
+
+        # 테스트 모드
+        if ALIGO_TESTMODE.upper() == "Y":
+            payload["testMode"] = "Y"
+
+        js, token_error = _post_alimtalk(url, payload, len(chunk))
+        if token_error:
+            # 캐시된 토큰을 알리고가 거부 (조기 폐기 / 시계 차이 등) → 새로 받아서 이 묶음만 한 번 더
+            log_event("ALIGO_TOKEN_REJECTED", logging.WARNING, code=(js or {}).get("code"))
+            aligo_token_manager.invalidate(token)
+            fresh = aligo_token_manager.get()
+            if fresh:
+                token = payload["token"] = fresh
+                js, _ = _post_alimtalk(url, payload, len(chunk))
+
+        info = (js or {}).get("info") or {}
+        log_event(
+            "ALIGO_SEND_RESULT",
+            logging.INFO if js is not None and js.get("code") == 0 else logging.WARNING,
+            template=template_code,
+            chunk=len(chunk),
+            code=(js or {}).get("code"),
+            message=(js or {}).get("message"),
+            mid=info.get("mid"),
+            scnt=info.get("scnt"),
+            fcnt=info.get("fcnt"),
+        )
+
+        results.update(_alimtalk_chunk_results(chunk, js))
+
+    return results
+
+
+def _is_aligo_token_error(js):
+    """알리고 응답이 토큰/인증 오류인지 (코드 대신 메시지로 판단)"""
+    if not js or js.get("code") == 0:
+        return False
+    message = str(js.get("message") or "")
+    return "토큰" in message or "token" in message.lower() or "인증" in message
+
+
+def _post_alimtalk(url, payload, count):
+    """발송 요청 1번 → (응답 JSON 또는 None, 토큰 오류 여부)"""
+    try:
+        r = aligo_http.post(url, data=payload, timeout=(2.0, max(5, count * 0.05)))
+        if r.status_code in (401, 403):
+            return None, True
+        r.raise_for_status()
+        js = r.json()
+    except Exception as e:
+        log_event("ALIGO_SEND_ERROR", logging.ERROR, exc_info=True, chunk=count, error=e)
+        return None, False
+    return js, _is_aligo_token_error(js)
+
+
+def _alimtalk_chunk_results(chunk, js):
+    """알리고 발송 응답 1건 → 그 요청에 묶인 번호별 (ok, res)"""
+    results = {}
+    if js is None:
+        for n, it in enumerate(chunk, start=1):
+            results[it["receiver"]] = (False, {"msg": "EXCEPTION", "slot": n})
+        return results
+
+    info = js.get("info") or {}
+    fcnt = _to_int_or_none(info.get("fcnt")) or 0
+    scnt = _to_int_or_none(info.get("scnt"))
+
+    if js.get("code") != 0 or fcnt == 0:
+        ok = js.get("code") == 0
+        for n, it in enumerate(chunk, start=1):
+            results[it["receiver"]] = (ok, dict(js, slot=n))
+        return results
+
+    # 일부 실패 → 번호별 결과 조회 (전부 실패면 조회할 필요 없음)
+    details = _aligo_delivery_details(info.get("mid")) if scnt else {}
+    for n, it in enumerate(chunk, start=1):
+        detail = details.get(_digits(it["receiver"]))
+        if scnt == 0:
+            results[it["receiver"]] = (False, dict(js, slot=n, delivery="failed"))
+        elif detail is None or not detail.get("rslt"):
+            results[it["receiver"]] = (False, dict(js, slot=n, msg="PARTIAL", delivery="unknown"))
+        else:
+            delivered = str(detail["rslt"]) in ALIGO_DELIVERED_RSLT
+            results[it["receiver"]] = (
+                delivered,
+                dict(js, slot=n, delivery="sent" if delivered else "failed", detail=detail),
+            )
+    return results
+
 
+def _digits(phone):
+    return "".join(ch for ch in str(phone or "") if ch.isdigit())
+
+
+def _aligo_delivery_details(mid):
+    """
+    알리고 전송 내역 상세 (/akv10/history/detail/) → {숫자만 남긴 수신번호: 내역 1건}
+    조회 실패 / mid 없음이면 빈 dict
+    """
+    if not mid:
+        return {}
     try:
-        r = requests.post(url, data=payload, timeout=5)
+        r = aligo_http.post(
+            f"{ALIGO_API_BASE}/akv10/history/detail/",
+            data={
+                "apikey": ALIGO_API_KEY,
+                "userid": ALIGO_USER_ID,
+                "mid": mid,
+                "page": 1,
+                "limit": ALIGO_BATCH_MAX,
+            },
+            timeout=(2.0, 5.0),
+        )
         r.raise_for_status()
         js = r.json()
     except Exception as e:
-        app.logger.exception("[ALIGO] 발송 예외: %s", e)
-        return False, {"msg": "EXCEPTION"}
+        log_event("ALIGO_DETAIL_ERR", logging.WARNING, mid=mid, error=e)
+        return {}
+    if js.get("code") != 0:
+        log_event("ALIGO_DETAIL_ERR", logging.WARNING, mid=mid, code=js.get("code"), message=js.get("message"))
+        return {}
+    return {_digits(item.get("phone")): item for item in js.get("list") or [] if item.get("phone")}
+
 
-    app.logger.info("[ALIGO] 발송 결과: %s", js)
-    return js.get("code") == 0, js
+def send_alimtalk(
+    template_code,
+    receiver,
+    subject,
+    message,
+    btn_mobile_url=None,
+    btn_pc_url=None,
+    btn_name="자세히 보기",
+    button_json=None,
+    emtitle=None,   # ✅ 강조표기 템플릿용
+):
+    """알리고 알림톡 공통 발송 함수 (1명)"""
+    item = alimtalk_item(
+        receiver,
+        subject,
+        message,
+        btn_mobile_url=btn_mobile_url,
+        btn_pc_url=btn_pc_url,
+        btn_name=btn_name,
+        button_json=button_json,
+        emtitle=emtitle,
+    )
+    results = send_alimtalk_batch(template_code, [item])
+    return results.get(receiver, (False, {"msg": "NO_RECEIVER"}))
 
 # ================== 알림톡 3종 래퍼 =========================
 
@@ -824,11 +3050,7 @@ def send_welcome_message(phone: str):
     )
 
 
-def send_reco_message(phone: str, time_label: str):
-    """2) 맛집 추천 알림톡 (템플릿코드 UD_8535)"""
-    if not phone or not time_label:
-        return False, {"msg": "PARAM_ERROR"}
-
+def _reco_item(phone: str, time_label: str):
     base_url = BASE_SERVER_URL.rstrip("/") if BASE_SERVER_URL else ""
     link = f"{base_url}/reco?phone={phone}&time={time_label}"
 
@@ -843,8 +3065,7 @@ def send_reco_message(phone: str, time_label: str):
         "오늘은 어떤 음식을 먹어 볼까요?\n"
     )
 
-    return send_alimtalk(
-        "UD_8535",
+    return alimtalk_item(
         phone,
         subject,
         message,
@@ -854,18 +3075,31 @@ def send_reco_message(phone: str, time_label: str):
     )
 
 
-def send_feedback_message(phone: str, time_label: str):
-    """3) 피드백 요청 알림톡 (템플릿코드 UD_8446)"""
+def send_reco_messages(phones, time_label: str):
+    """2) 맛집 추천 알림톡 다건 발송 (템플릿코드 UD_8535) → {phone: (ok, res)}"""
+    if not time_label:
+        return {p: (False, {"msg": "PARAM_ERROR"}) for p in phones}
+
+    items = [_reco_item(p, time_label) for p in phones if p]
+    return send_alimtalk_batch("UD_8535", items)
+
+
+def send_reco_message(phone: str, time_label: str):
+    """2) 맛집 추천 알림톡 (템플릿코드 UD_8535)"""
     if not phone or not time_label:
         return False, {"msg": "PARAM_ERROR"}
 
+    return send_reco_messages([phone], time_label)[phone]
+
+
+def _feedback_item(phone: str, time_label: str):
     base_url = BASE_SERVER_URL.rstrip("/") if BASE_SERVER_URL else ""
     link = f"{base_url}/feedback-form?phone={phone}&time={time_label}"
 
-    # subject_1 = 부제(템플릿 일치 검사 안 함) → 편한 문구나 빈 문자열 가능
+    # subject_N = 부제(템플릿 일치 검사 안 함) → 편한 문구나 빈 문자열 가능
     subject = ""
 
-    # ✅ 템플릿의 '강조표기 타이틀(emtitle_1)' 과 1글자도 동일하게
+    # ✅ 템플릿의 '강조표기 타이틀(emtitle_N)' 과 1글자도 동일하게
     #    (알리고 템플릿 설정 화면에서 강조표기 문구 그대로 복사해서 넣어줘야 함)
     emtitle = "오늘 방문하신 맛집은 어떠셨나요?"
 
@@ -877,9 +3111,8 @@ def send_feedback_message(phone: str, time_label: str):
     )
 
     # 버튼은 템플릿에서 WL + "피드백 남기러가기!" 로 등록되어 있음.
-    # send_alimtalk 안에서 btn_* 인자를 받아 WL 버튼 JSON으로 변환해서 보냄.
-    return send_alimtalk(
-        "UD_8446",
+    # alimtalk_item 안에서 btn_* 인자를 받아 WL 버튼 JSON으로 변환해서 보냄.
+    return alimtalk_item(
         phone,
         subject,
         message,
@@ -890,138 +3123,590 @@ def send_feedback_message(phone: str, time_label: str):
     )
 
 
+def send_feedback_messages(phones, time_label: str):
+    """3) 피드백 요청 알림톡 다건 발송 (템플릿코드 UD_8446) → {phone: (ok, res)}"""
+    if not time_label:
+        return {p: (False, {"msg": "PARAM_ERROR"}) for p in phones}
+
+    items = [_feedback_item(p, time_label) for p in phones if p]
+    return send_alimtalk_batch("UD_8446", items)
+
+
+def send_feedback_message(phone: str, time_label: str):
+    """3) 피드백 요청 알림톡 (템플릿코드 UD_8446)"""
+    if not phone or not time_label:
+        return False, {"msg": "PARAM_ERROR"}
+
+    return send_feedback_messages([phone], time_label)[phone]
+
+
 
 # =========================
 # 유저 선호도 관련 함수
 # =========================
+# user_feedback 전체를 매번 GROUP BY 하지 않고,
+# user_category_profile / user_restaurant_profile 에 누적된 합계/개수만 읽는다.
 
-def get_user_prefs(phone, cur):
+def record_feedback_in_profile(cur, phone, restaurant_name, category, time_of_day, rating):
     """
-    user_feedback 테이블 기준으로, 이 사용자가
-    카테고리별로 준 평균 rating 딕셔너리 반환.
-    예: {"한식": 4.5, "양식": 3.0}
+    user_feedback INSERT 와 같은 트랜잭션 안에서 호출해서
+    취향 프로필(합계/개수)을 바로 갱신한다.
     """
-    try:
+    if rating is None or not phone:
+        return
+
+    cur.execute(
+        """
+        INSERT INTO user_category_profile
+            (phone_number, time_of_day, category, rating_sum, rating_count)
+        VALUES (%s, %s, %s, %s, 1)
+        ON CONFLICT (phone_number, time_of_day, category)
+        DO UPDATE SET
+            rating_sum   = user_category_profile.rating_sum + EXCLUDED.rating_sum,
+            rating_count = user_category_profile.rating_count + 1,
+            updated_at   = NOW();
+        """,
+        (phone, time_of_day or "", category or "", rating),
+    )
+
+    if restaurant_name:
         cur.execute(
             """
-            SELECT category, AVG(rating)
-            FROM user_feedback
-            WHERE phone_number = %s
-            GROUP BY category;
+            INSERT INTO user_restaurant_profile
+                (phone_number, restaurant_name, rating_sum, rating_count)
+            VALUES (%s, %s, %s, 1)
+            ON CONFLICT (phone_number, restaurant_name)
+            DO UPDATE SET
+                rating_sum   = user_restaurant_profile.rating_sum + EXCLUDED.rating_sum,
+                rating_count = user_restaurant_profile.rating_count + 1,
+                updated_at   = NOW();
             """,
-            (phone,),
+            (phone, restaurant_name, rating),
         )
-    except UndefinedColumn:
-        return {}
 
-    rows = cur.fetchall()
-    prefs = {}
-    for c, r in rows:
-        if c:
-            prefs[c] = float(r)
-    return prefs
 
+def category_prefs_from_profile(rows, time_of_day=None):
+    """
+    user_category_profile 행들 [(time_of_day, category, rating_sum, rating_count), ...] 로
+    카테고리별 평균 rating 계산.
+    - time_of_day 가 있고 그 시간대 피드백이 있으면 그 시간대 기준
+    - 없으면 전체 시간대 합산 기준
+    """
+    if time_of_day:
+        timed = [r for r in rows if r[0] == time_of_day]
+        if timed:
+            rows = timed
+
+    totals = defaultdict(lambda: [0, 0])
+    for _, category, rating_sum, rating_count in rows:
+        if category and rating_count:
+            totals[category][0] += rating_sum
+            totals[category][1] += rating_count
+
+    return {c: float(s) / n for c, (s, n) in totals.items()}
 
-def get_user_prefs_by_time(phone, time_of_day, cur):
+
+@dataclass
+class UserContext:
+    """api_reco 에서 쓰는 사용자 정보 묶음 (load_user_context 결과)"""
+    user_categories: list = field(default_factory=list)     # 회원가입 때 고른 선호 카테고리
+    category_prefs: dict = field(default_factory=dict)      # 카테고리별 평균 점수 (시간대 우선)
+    restaurant_prefs: dict = field(default_factory=dict)    # 가게별 평균 점수
+    recent_ids_2d: set = field(default_factory=set)         # 최근 2일 추천한 restaurant_id
+    recent_names_2d: set = field(default_factory=set)       # 최근 2일 추천한 가게 이름
+
+
+def load_user_context(phone, time_of_day=None):
     """
-    특정 시간대(time_of_day)에 대한 카테고리별 평균 rating.
-    데이터가 없으면 전체(get_user_prefs) 기준으로 fallback.
+    선호 카테고리 / 카테고리·가게 취향 프로필 / 최근 2일 추천 이력을
+    쿼리 1번(DB 왕복 1번)으로 가져와 UserContext 로 반환.
     """
-    if not time_of_day:
-        return get_user_prefs(phone, cur)
+    ctx = UserContext()
+    if not phone:
+        return ctx
 
-    try:
+    with get_conn() as conn:
+        cur = conn.cursor()
         cur.execute(
             """
-            SELECT category, AVG(rating)
+            SELECT
+                (SELECT preferences_categories
+                   FROM users
+                  WHERE phone_number = %(phone)s),
+                (SELECT COALESCE(json_agg(json_build_array(
+                            time_of_day, category, rating_sum, rating_count)), '[]'::json)
+                   FROM user_category_profile
+                  WHERE phone_number = %(phone)s),
+                (SELECT COALESCE(json_agg(json_build_array(
+                            restaurant_name, rating_sum, rating_count)), '[]'::json)
+                   FROM user_restaurant_profile
+                  WHERE phone_number = %(phone)s),
+                (SELECT COALESCE(json_agg(json_build_array(
+                            restaurant_name, restaurant_id)), '[]'::json)
+                   FROM recommendation_logs
+                  WHERE phone_number = %(phone)s
+                    AND created_at >= NOW() - INTERVAL '2 days');
+            """,
+            {"phone": phone},
+        )
+        pref_cats, category_rows, restaurant_rows, recent_rows = cur.fetchone()
+        cur.close()
+
+    if pref_cats:
+        ctx.user_categories = [c.strip() for c in str(pref_cats).split(",") if c.strip()]
+
+    ctx.category_prefs = category_prefs_from_profile(category_rows, time_of_day)
+
+    for name, rating_sum, rating_count in restaurant_rows:
+        if name and rating_count:
+            ctx.restaurant_prefs[name] = float(rating_sum) / rating_count
+
+    for name, rid in recent_rows:
+        if rid is not None:
+            ctx.recent_ids_2d.add(rid)
+        if name:
+            ctx.recent_names_2d.add(name)
+
+    return ctx
+
+
+def rebuild_user_profiles(phone=None):
+    """
+    user_feedback 원본으로 취향 프로필을 다시 계산 (백필/보정용).
+    phone 을 주면 그 사용자만, 없으면 전체.
+    """
+    where = "WHERE rating IS NOT NULL"
+    params = ()
+    if phone:
+        where += " AND phone_number = %s"
+        params = (phone,)
+
+    with get_conn() as conn:
+        cur = conn.cursor()
+        if phone:
+            cur.execute("DELETE FROM user_category_profile WHERE phone_number = %s;", params)
+            cur.execute("DELETE FROM user_restaurant_profile WHERE phone_number = %s;", params)
+        else:
+            cur.execute("DELETE FROM user_category_profile;")
+            cur.execute("DELETE FROM user_restaurant_profile;")
+
+        cur.execute(
+            f"""
+            INSERT INTO user_category_profile
+                (phone_number, time_of_day, category, rating_sum, rating_count)
+            SELECT phone_number, COALESCE(time_of_day, ''), COALESCE(category, ''),
+                   SUM(rating), COUNT(rating)
+            FROM user_feedback
+            {where}
+            GROUP BY phone_number, COALESCE(time_of_day, ''), COALESCE(category, '');
+            """,
+            params,
+        )
+        category_rows = cur.rowcount
+        cur.execute(
+            f"""
+            INSERT INTO user_restaurant_profile
+                (phone_number, restaurant_name, rating_sum, rating_count)
+            SELECT phone_number, restaurant_name, SUM(rating), COUNT(rating)
             FROM user_feedback
-            WHERE phone_number = %s
-              AND time_of_day = %s
-            GROUP BY category;
+            {where}
+            GROUP BY phone_number, restaurant_name;
             """,
-            (phone, time_of_day),
+            params,
+        )
+        restaurant_rows = cur.rowcount
+        conn.commit()
+        cur.close()
+
+    return category_rows, restaurant_rows
+
+
+@app.cli.command("rebuild-profiles")
+@click.option("--phone", default=None, help="특정 사용자만 다시 계산")
+def rebuild_profiles_command(phone):
+    """user_feedback 으로 취향 프로필 테이블 재계산:  flask --app app rebuild-profiles"""
+    category_rows, restaurant_rows = rebuild_user_profiles(phone)
+    click.echo(f"[REBUILD_PROFILES] category_rows={category_rows}, restaurant_rows={restaurant_rows}")
+
+
+# =========================
+# 이벤트 쓰기 파이프라인 (write-behind)
+# =========================
+# /go 클릭 로그, 좋아요/별로예요, 추천 로그처럼 "응답에 필요 없는" INSERT 는
+# 메모리 버퍼에 넣고 바로 응답한다. 백그라운드 스레드가 모아서 한 번에 넣음.
+
+EVENT_BUFFER_MAX = int(os.getenv("EVENT_BUFFER_MAX", "10000"))          # 버퍼 최대 이벤트 수 (넘치면 버림)
+EVENT_FLUSH_BATCH = int(os.getenv("EVENT_FLUSH_BATCH", "200"))          # 이만큼 쌓이면 바로 flush
+EVENT_FLUSH_INTERVAL_SEC = float(os.getenv("EVENT_FLUSH_INTERVAL_SEC", "1.0"))  # 최소 이 주기로 flush
+EVENT_FLUSH_RETRIES = int(os.getenv("EVENT_FLUSH_RETRIES", "3"))        # DB 오류 시 배치 재시도 횟수
+
+
+def _insert_click_logs(cur, rows):
+    execute_values(
+        cur,
+        """
+        INSERT INTO click_logs (phone_number, restaurant_id, restaurant_name, time_of_day, clicked_at)
+        VALUES %s;
+        """,
+        rows,
+    )
+
+
+def _insert_feedback_events(cur, rows):
+    execute_values(
+        cur,
+        """
+        INSERT INTO user_feedback
+            (phone_number, restaurant_name, category, rating, source, time_of_day, restaurant_id, created_at)
+        VALUES %s;
+        """,
+        rows,
+    )
+    # 취향 프로필도 같은 트랜잭션에서 갱신
+    for phone, name, category, rating, _, time_of_day, _, _ in rows:
+        record_feedback_in_profile(cur, phone, name, category, time_of_day, rating)
+
+
+def _insert_reco_log_events(cur, rows):
+    execute_values(
+        cur,
+        """
+        INSERT INTO recommendation_logs
+            (phone_number, restaurant_name, time_of_day, restaurant_id, created_at)
+        VALUES %s;
+        """,
+        rows,
+    )
+
+
+class EventPipeline:
+    """
+    이벤트 write-behind 버퍼.
+
+    - emit(kind, row): 버퍼에 넣기만 하고 바로 리턴 (꽉 차면 버리고 dropped 증가)
+    - 백그라운드 스레드가 EVENT_FLUSH_BATCH 개 또는 EVENT_FLUSH_INTERVAL_SEC 마다
+      kind 별로 multi-row INSERT (트랜잭션 1번)
+    - 배치 INSERT 가 실패하면 한 줄씩 다시 넣어서 문제 행만 버림
+      (DB 연결이 안 되거나 도중에 끊기면 아직 커밋 안 된 행만 다음 주기에 재시도)
+    - 프로세스 종료 시(atexit) 남은 이벤트 flush
+    """
+
+    def __init__(self, writers, max_size=10000, batch_size=200, interval_sec=1.0, retries=3):
+        self._writers = writers          # kind -> (cur, rows) 함수
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.interval_sec = interval_sec
+        self.retries = retries
+
+        self._queue = queue.Queue(maxsize=max_size)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._stopping = threading.Event()
+        self._retry_batch = []           # [(kind, row, 시도 횟수)]
+
+        self._stats = defaultdict(int)
+        self._last_flush_ms = 0.0
+
+    # ── 생산자 쪽 ─────────────────────────────────────────────
+
+    def _ensure_thread(self):
+        # gunicorn fork 이후 자식 프로세스에서 처음 쓸 때 스레드 시작
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name="event-flusher", daemon=True)
+            self._thread.start()
+
+    def emit(self, kind, row):
+        """버퍼에 넣고 성공 여부 리턴 (DB 는 건드리지 않음)"""
+        if kind not in self._writers:
+            raise ValueError(f"unknown event kind: {kind}")
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait((kind, row, 0))
+        except queue.Full:
+            with self._lock:
+                self._stats[f"dropped_{kind}"] += 1
+                self._stats["dropped"] += 1
+            return False
+        with self._lock:
+            self._stats["enqueued"] += 1
+        return True
+
+    # ── 소비자(flush) 쪽 ─────────────────────────────────────
+
+    def _drain(self, first=None):
+        batch = list(self._retry_batch)
+        self._retry_batch = []
+        if first is not None:
+            batch.append(first)
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                first = self._queue.get(timeout=self.interval_sec)
+            except queue.Empty:
+                first = None
+
+            # 배치가 찰 때까지 interval 동안 조금 더 모음
+            if first is not None and self._queue.qsize() < self.batch_size - 1:
+                deadline = time.monotonic() + self.interval_sec
+                while self._queue.qsize() < self.batch_size - 1 and time.monotonic() < deadline:
+                    if self._stopping.wait(0.05):
+                        break
+
+            batch = self._drain(first)
+            if batch:
+                self._flush(batch)
+
+    def _flush(self, batch):
+        started = time.monotonic()
+        by_kind = defaultdict(list)
+        for kind, row, attempts in batch:
+            by_kind[kind].append((row, attempts))
+
+        # kind 별로 커밋(또는 문제 행으로 버림)까지 끝난 행 수
+        # → 중간에 연결이 끊겨도 이미 들어간 행은 다시 넣지 않음
+        progress = {}
+        try:
+            with get_conn() as conn:
+                for kind, items in by_kind.items():
+                    self._flush_kind(conn, kind, items, progress)
+        except Exception as e:
+            # 커넥션을 못 얻었거나 도중에 끊긴 경우 → 아직 안 들어간 행만 다음 주기에 재시도
+            log_event("EVENT_FLUSH_ERR", logging.ERROR, error=e)
+            with self._lock:
+                self._stats["flush_errors"] += 1
+            for kind, items in by_kind.items():
+                for row, attempts in items[progress.get(kind, 0):]:
+                    if attempts + 1 < self.retries:
+                        self._retry_batch.append((kind, row, attempts + 1))
+                    else:
+                        with self._lock:
+                            self._stats[f"dropped_{kind}"] += 1
+                            self._stats["dropped"] += 1
+            if not self._stopping.is_set():
+                self._stopping.wait(self.interval_sec)
+            return
+
+        with self._lock:
+            self._last_flush_ms = (time.monotonic() - started) * 1000
+            self._stats["flushes"] += 1
+
+    def _flush_kind(self, conn, kind, items, progress):
+        writer = self._writers[kind]
+        rows = [row for row, _ in items]
+        progress[kind] = 0
+        with conn.cursor() as cur:
+            self._write_rows(conn, cur, kind, writer, rows, progress)
+
+    def _write_rows(self, conn, cur, kind, writer, rows, progress):
+        """
+        rows 를 넣고 처리한 행 수를 progress[kind] 에 기록.
+        연결 오류(OperationalError / InterfaceError)는 그대로 올려보냄
+        → _flush 가 progress 이후 행만 재시도
+        """
+        try:
+            writer(cur, rows)
+            conn.commit()
+            progress[kind] = len(rows)
+            with self._lock:
+                self._stats[f"written_{kind}"] += len(rows)
+            return
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            raise
+        except Exception as e:
+            conn.rollback()
+            log_event("EVENT_BATCH_ERR", logging.WARNING, kind=kind, rows=len(rows), error=e)
+
+        # 배치 중 일부 행이 문제(FK 위반 등) → 한 줄씩 넣고 실패한 행만 버림
+        for row in rows:
+            try:
+                writer(cur, [row])
+                conn.commit()
+                with self._lock:
+                    self._stats[f"written_{kind}"] += 1
+            except (psycopg2.OperationalError, psycopg2.InterfaceError):
+                raise
+            except Exception as e:
+                conn.rollback()
+                log_event("EVENT_ROW_DROPPED", logging.ERROR, kind=kind, error=e)
+                with self._lock:
+                    self._stats[f"dropped_{kind}"] += 1
+                    self._stats["dropped"] += 1
+            progress[kind] += 1
+
+    def flush_now(self):
+        """버퍼에 남은 이벤트를 현재 스레드에서 전부 flush (종료 시 사용)"""
+        while True:
+            batch = self._drain()
+            if not batch:
+                return
+            retry_before = len(batch)
+            self._flush(batch)
+            if len(self._retry_batch) >= retry_before:
+                # DB 가 계속 안 되면 무한 반복하지 않음
+                return
+
+    def stop(self):
+        self._stopping.set()
+        if self._thread is not None and self._pid == os.getpid():
+            self._thread.join(timeout=self.interval_sec * 2 + 1)
+        self.flush_now()
+
+    def stats(self):
+        with self._lock:
+            data = dict(self._stats)
+            data["backlog"] = self._queue.qsize() + len(self._retry_batch)
+            data["capacity"] = self.max_size
+            data["last_flush_ms"] = round(self._last_flush_ms, 1)
+            data["flusher_alive"] = bool(self._thread and self._thread.is_alive())
+        return data
+
+
+event_pipeline = EventPipeline(
+    {
+        "click": _insert_click_logs,
+        "feedback": _insert_feedback_events,
+        "reco_log": _insert_reco_log_events,
+    },
+    max_size=EVENT_BUFFER_MAX,
+    batch_size=EVENT_FLUSH_BATCH,
+    interval_sec=EVENT_FLUSH_INTERVAL_SEC,
+    retries=EVENT_FLUSH_RETRIES,
+)
+atexit.register(event_pipeline.stop)
+
+
+def _to_int_or_none(v):
+    # 쿼리스트링으로 오는 id 값 정리 (잘못된 값 하나가 배치 INSERT 를 깨지 않도록)
+    try:
+        return int(v) if v not in (None, "") else None
+    except (TypeError, ValueError):
+        return None
+
+
+def emit_click_log(phone, restaurant_id, restaurant_name, time_of_day):
+    return event_pipeline.emit(
+        "click",
+        (phone, restaurant_id, restaurant_name, time_of_day, datetime.now(timezone.utc)),
+    )
+
+
+def emit_feedback(phone, restaurant_name, category, rating, source, time_of_day, restaurant_id):
+    return event_pipeline.emit(
+        "feedback",
+        (phone, restaurant_name, category, rating, source, time_of_day, restaurant_id,
+         datetime.now(timezone.utc)),
+    )
+
+
+def emit_recommendation_logs(phone, time_of_day, picked):
+    now = datetime.now(timezone.utc)
+    for c in picked:
+        event_pipeline.emit(
+            "reco_log",
+            (phone, c["name"], time_of_day, c.get("restaurant_id"), now),
         )
-    except UndefinedColumn:
-        # time_of_day 컬럼이 없으면 기존 전체 선호도로 대체
-        return get_user_prefs(phone, cur)
 
-    rows = cur.fetchall()
-    if not rows:
-        return get_user_prefs(phone, cur)
 
-    prefs = {}
-    for c, r in rows:
-        if c:
-            prefs[c] = float(r)
-    return prefs
+# =========================
+# 거리 계산
+# =========================
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEG_LAT = 111.32
+
+
+def haversine_km(lat, lon, lats, lons):
+    """
+    기준점 1개 (lat, lon) ↔ 여러 점 (lats, lons) 거리(km) 배열.
+    lats / lons 는 리스트나 NumPy 배열 (스칼라도 가능).
+    """
+    rlat = np.radians(lat)
+    rlats = np.radians(np.asarray(lats, dtype=float))
+    dlat = rlats - rlat
+    dlon = np.radians(np.asarray(lons, dtype=float)) - np.radians(lon)
+
+    a = np.sin(dlat / 2) ** 2 + np.cos(rlat) * np.cos(rlats) * np.sin(dlon / 2) ** 2
+    return EARTH_RADIUS_KM * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+
+def haversine_matrix_km(lats1, lons1, lats2, lons2):
+    """여러 점 ↔ 여러 점 거리(km) 행렬 (shape: len(lats1) x len(lats2))"""
+    rlats1 = np.radians(np.asarray(lats1, dtype=float))[:, None]
+    rlons1 = np.radians(np.asarray(lons1, dtype=float))[:, None]
+    rlats2 = np.radians(np.asarray(lats2, dtype=float))[None, :]
+    rlons2 = np.radians(np.asarray(lons2, dtype=float))[None, :]
+
+    a = (
+        np.sin((rlats2 - rlats1) / 2) ** 2
+        + np.cos(rlats1) * np.cos(rlats2) * np.sin((rlons2 - rlons1) / 2) ** 2
+    )
+    return EARTH_RADIUS_KM * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+
+def bbox_deltas(lat, radius_km):
+    """반경 radius_km 를 덮는 위/경도 차이 (dlat, dlon)"""
+    dlat = radius_km / KM_PER_DEG_LAT
+    dlon = radius_km / max(KM_PER_DEG_LAT * math.cos(math.radians(lat)), 1e-6)
+    return dlat, dlon
 
 
-def get_user_restaurant_prefs(phone, cur):
+def points_within_radius(lat, lon, lats, lons, radius_km):
     """
-    user_feedback 기준으로, 이 사용자가
-    특정 가게별로 준 평균 rating 딕셔너리 반환.
-    예: {"김영섭초밥": 1.0, "맛있는파스타": 4.8}
+    (lat, lon) 반경 radius_km 안에 있는 점들의 (인덱스 배열, 거리 배열).
+    bounding box 로 먼저 걸러서 확실히 먼 점은 삼각함수 계산을 건너뛴다.
     """
-    try:
-        cur.execute(
-            """
-            SELECT restaurant_name, AVG(rating)
-            FROM user_feedback
-            WHERE phone_number = %s
-            GROUP BY restaurant_name;
-            """,
-            (phone,),
-        )
-    except UndefinedColumn:
-        return {}
+    lats = np.asarray(lats, dtype=float)
+    lons = np.asarray(lons, dtype=float)
+    dlat, dlon = bbox_deltas(lat, radius_km)
 
-    rows = cur.fetchall()
-    prefs = {}
-    for name, r in rows:
-        if name:
-            prefs[name] = float(r)
-    return prefs
+    idx = np.flatnonzero(
+        (np.abs(lats - lat) <= dlat) & (np.abs(lons - lon) <= dlon)
+    )
+    if idx.size == 0:
+        return idx, np.empty(0)
 
+    dist = haversine_km(lat, lon, lats[idx], lons[idx])
+    keep = dist <= radius_km
+    return idx[keep], dist[keep]
 
-# =========================
-# 거리 계산
-# =========================
 
 def calculate_distance(lat1, lon1, lat2, lon2):
-    R = 6371.0
-    rlat1, rlon1, rlat2, rlon2 = map(
-        math.radians, [lat1, lon1, lat2, lon2]
-    )
-    dlat = rlat2 - rlat1
-    dlon = rlon2 - rlon1
+    return float(haversine_km(lat1, lon1, lat2, lon2))
 
-    a = (
-        math.sin(dlat / 2) ** 2
-        + math.cos(rlat1) * math.cos(rlat2) * math.sin(dlon / 2) ** 2
-    )
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-    return R * c
 
-def calculate_distance(lat1, lon1, lat2, lon2):
-    R = 6371.0
-    rlat1, rlon1, rlat2, rlon2 = map(
-        math.radians, [lat1, lon1, lat2, lon2]
-    )
-    dlat = rlat2 - rlat1
-    dlon = rlon2 - rlon1
+# =========================
+# 영업시간 (주간 분 단위 구간)
+# =========================
+# Google periods 를 한 번만 파싱해서 "월요일 00:00 부터 몇 분째" 기준의
+# 정렬된 [시작, 끝) 구간 리스트로 만들어 둔다. (캐시/restaurants 에 이 형태로 저장)
+#   예) 월~금 11:00-21:00 → [[660, 1260], [2100, 2700], ...]
+# 영업 여부는 bisect 한 번으로 판단.
 
-    a = (
-        math.sin(dlat / 2) ** 2
-        + math.cos(rlat1) * math.cos(rlat2) * math.sin(dlon / 2) ** 2
-    )
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-    return R * c
+WEEK_MINUTES = 7 * 1440
 
 
-def _is_open_at(periods, dt):
+def week_minute(dt):
+    """dt → 주 시작(월요일 00:00) 기준 분"""
+    return dt.weekday() * 1440 + dt.hour * 60 + dt.minute
+
+
+def compile_opening_hours(periods):
     """
-    Google Places currentOpeningHours.regularOpeningHours 의 periods 구조를 이용해서
-    dt 시각에 영업 중인지 판단한다.
+    Google Places regularOpeningHours 의 periods → 정렬/병합된 주간 구간 리스트.
 
     periods 예시 (v1):
     [
@@ -1032,44 +3717,83 @@ def _is_open_at(periods, dt):
       ...
     ]
     day: 0=월요일, 6=일요일 (문서 기준)
+
+    - periods 가 없으면 None (영업시간 모름)
+    - 닫힘 정보가 없으면 여는 시각부터 24시간 영업으로 간주
+    - 다음 주로 넘어가는 심야 영업은 주 끝/주 처음 두 구간으로 나눔
     """
     if not periods or not isinstance(periods, list):
         return None
 
-    # dt를 "주 시작(월요일 00:00) 기준 분 단위" 로 변환
-    # (서버는 UTC 기준, 한국 식당만 쓴다 가정하고 KST(+9)로 보정해서 search_google_places 쪽에서 넘김)
-    week_minutes = dt.weekday() * 1440 + dt.hour * 60 + dt.minute
-
+    raw = []
     for period in periods:
         open_info = period.get("open") or {}
         if "day" not in open_info or "hour" not in open_info or "minute" not in open_info:
             continue
 
         o_day = open_info["day"]
-        o_hour = open_info["hour"]
-        o_minute = open_info["minute"]
-        open_min = o_day * 1440 + o_hour * 60 + o_minute
+        open_min = o_day * 1440 + open_info["hour"] * 60 + open_info["minute"]
 
         close_info = period.get("close")
         if close_info and "hour" in close_info and "minute" in close_info:
             c_day = close_info.get("day", o_day)
-            c_hour = close_info["hour"]
-            c_minute = close_info["minute"]
-            close_min = c_day * 1440 + c_hour * 60 + c_minute
+            close_min = c_day * 1440 + close_info["hour"] * 60 + close_info["minute"]
         else:
-            # 닫힘 정보 없으면 24시간 영업으로 간주 (해당 요일 기준)
             close_min = open_min + 24 * 60
 
-        # 영업 시간이 다음 주로 넘어가는 케이스(심야 영업 등) 처리
         if close_min <= open_min:
-            close_min += 7 * 1440
+            close_min += WEEK_MINUTES
+
+        # [open, close) 를 한 주(0 ~ WEEK_MINUTES) 안으로 접기
+        raw.append((max(open_min, 0), min(close_min, WEEK_MINUTES)))
+        if close_min > WEEK_MINUTES:
+            raw.append((max(open_min - WEEK_MINUTES, 0), min(close_min - WEEK_MINUTES, WEEK_MINUTES)))
+
+    merged = []
+    for start, end in sorted(r for r in raw if r[0] < r[1]):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def is_open_at_minute(hours, minute):
+    """
+    compile_opening_hours 결과로 주간 minute 에 영업 중인지.
+    hours 가 None(모름)이면 None.
+    """
+    if hours is None:
+        return None
+    minute %= WEEK_MINUTES
+    i = bisect.bisect_right(hours, [minute, WEEK_MINUTES + 1]) - 1
+    return i >= 0 and minute < hours[i][1]
+
+
+def flatten_opening_hours(hours_list):
+    """
+    여러 가게의 영업시간 → 벡터 판정용 평탄화 배열 (owner, starts, ends, known).
+      owner[k]: k 번째 구간이 속한 가게 인덱스
+      known[i]: i 번째 가게의 영업시간을 아는지
+    """
+    counts = np.array([len(h) if h is not None else 0 for h in hours_list], dtype=np.int64)
+    known = np.array([h is not None for h in hours_list], dtype=bool)
+    owner = np.repeat(np.arange(len(hours_list), dtype=np.int64), counts)
+    flat = [iv for h in hours_list if h for iv in h]
+    bounds = np.array(flat, dtype=np.int64).reshape(-1, 2)
+    return owner, bounds[:, 0], bounds[:, 1], known
 
-        # 주 단위로 한 번, +7일 뒤로 한 번 검사해서 wrap-around 처리
-        for base in (week_minutes, week_minutes + 7 * 1440):
-            if open_min <= base < close_min:
-                return True
 
-    return False
+def open_mask(n, owner, starts, ends, known, minute):
+    """
+    가게 n 곳에 대해 주간 minute 에 영업 중인지 한 번에 판정한 bool 배열.
+    영업시간을 모르는 가게는 True (제외하지 않음).
+    """
+    minute %= WEEK_MINUTES
+    is_open = np.zeros(n, dtype=bool)
+    is_open[owner[(starts <= minute) & (minute < ends)]] = True
+    return is_open | ~known
+
 
 import re
 
@@ -1077,88 +3801,194 @@ import re
 # 리뷰 분석 / 대표메뉴 / 요약
 # =========================
 
+# 1) 한글 메뉴 키워드 (리뷰 원문에서 그대로 찾음)
+MENU_KEYWORDS_KO = [
+    # 한식/분식
+    "김치찌개", "된장찌개", "불고기", "삼겹살", "갈비",
+    "냉면", "비빔밥", "떡볶이", "라볶이", "튀김", "순대", "김밥",
+    "칼국수", "국수",
+
+    # 일식
+    "초밥", "스시", "라멘", "우동", "돈카츠", "텐동",
+
+    # 중식 + 딤섬 계열 (딘타이펑 대응)
+    "짜장면", "짬뽕", "탕수육", "마라탕",
+    "만두", "샤오롱바오", "소롱포", "딤섬",
+
+    # 양고기 계열 (양국 등)
+    "양고기", "양꼬치", "양갈비",
+
+    # 양식/기타
+    "파스타", "피자", "리조또", "스테이크",
+    "치킨", "버거", "뷔페",
+]
+
+# 2) 영어 메뉴 키워드 → 한글 매핑 (소문자 기준)
+MENU_KEYWORDS_EN = {
+    "sushi": "초밥",
+    "ramen": "라멘",
+    "udon": "우동",
+    "pasta": "파스타",
+    "pizza": "피자",
+    "steak": "스테이크",
+    "bbq": "바비큐",
+    "barbecue": "바비큐",
+    "burger": "버거",
+    "sandwich": "샌드위치",
+    "chicken": "치킨",
+    "noodle": "면요리",
+    "noodles": "면요리",
+    "curry": "카레",
+    "coffee": "커피",
+    "buffet": "뷔페",
+
+    # 딤섬/만두 계열 (딘타이펑)
+    "dumpling": "만두",
+    "dumplings": "만두",
+    "xiao long bao": "샤오롱바오",
+    "xiaolongbao": "샤오롱바오",
+    "xialongbao": "샤오롱바오",
+    "dim sum": "딤섬",
+    "dimsum": "딤섬",
+
+    # 양고기 계열 (양국)
+    "lamb": "양고기",
+    "mutton": "양고기",
+}
+
+# 코드 수정 없이 키워드를 늘리고 싶을 때 쓰는 JSON 파일 (없으면 기본 목록만 사용)
+#   {"ko": ["쌀국수", "반미"], "en": {"pho": "쌀국수"}}
+MENU_KEYWORDS_FILE = os.getenv(
+    "MENU_KEYWORDS_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "menu_keywords.json"),
+)
+MENU_CACHE_MAX = int(os.getenv("MENU_CACHE_MAX", "20000"))   # 리뷰별 추출 결과 캐시 개수
+
+
+class KeywordMatcher:
+    """
+    여러 키워드를 텍스트 한 번 훑어서 찾는 Aho-Corasick 오토마톤.
+    (겹치는 키워드도 다 찾음: "칼국수" 안의 "국수", "noodles" 안의 "noodle")
+    """
+
+    def __init__(self, patterns):
+        self.patterns = list(patterns)
+        self._goto = [{}]        # 상태별 다음 글자 → 상태
+        self._fail = [0]
+        self._out = [()]         # 상태에서 끝나는 패턴 id 들
+
+        for pid, pat in enumerate(self.patterns):
+            state = 0
+            for ch in pat:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(())
+                    self._goto[state][ch] = nxt
+                state = nxt
+            self._out[state] = self._out[state] + (pid,)
+
+        # BFS 로 실패 링크 계산 + 실패 링크 쪽 출력 합치기
+        pending = list(self._goto[0].values())
+        while pending:
+            state = pending.pop(0)
+            for ch, nxt in self._goto[state].items():
+                pending.append(nxt)
+                f = self._fail[state]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                fallback = self._goto[f].get(ch, 0)
+                self._fail[nxt] = fallback if fallback != nxt else 0
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def find_ids(self, text):
+        """text 안에 한 번이라도 나온 패턴 id 집합"""
+        goto, fail, out = self._goto, self._fail, self._out
+        root = goto[0]
+        found = set()
+        state = 0
+        for ch in text:
+            if state:
+                while state and ch not in goto[state]:
+                    state = fail[state]
+                state = goto[state].get(ch, 0)
+            else:
+                # 대부분의 글자는 어떤 키워드의 시작도 아님 → 바로 다음 글자로
+                state = root.get(ch, 0)
+                if not state:
+                    continue
+            if out[state]:
+                found.update(out[state])
+        return found
+
+
+def _load_menu_keyword_file(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return [], {}
+    except Exception as e:
+        log_event("MENU_KEYWORDS_FILE_ERR", logging.WARNING, path=path, error=e)
+        return [], {}
+    return list(data.get("ko") or []), dict(data.get("en") or {})
+
+
+def build_menu_matcher(path=MENU_KEYWORDS_FILE):
+    """
+    기본 키워드 + 데이터 파일 키워드로 (matcher, labels) 생성.
+    labels[pid] = 화면에 보여줄 메뉴 이름. pid 순서 = 결과 우선순위 (한글 목록 → 영어 목록).
+    영어는 소문자로 찾기 때문에 전체를 소문자 텍스트 한 번에 돌린다 (한글은 영향 없음).
+    """
+    extra_ko, extra_en = _load_menu_keyword_file(path)
+
+    patterns, labels = [], []
+    for kw in list(dict.fromkeys(MENU_KEYWORDS_KO + extra_ko)):
+        patterns.append(kw.lower())
+        labels.append(kw)
+    for eng, kor in {**MENU_KEYWORDS_EN, **extra_en}.items():
+        patterns.append(eng.lower())
+        labels.append(kor)
+    return KeywordMatcher(patterns), labels
+
+
+menu_matcher, menu_labels = build_menu_matcher()
+_menu_cache = OrderedDict()      # 리뷰 해시 → 추출 결과 (LRU)
+_menu_cache_lock = threading.Lock()
+
+
 def extract_menu_from_review(review_text):
     """
     리뷰 텍스트 안에서 '대표 메뉴' 후보를 뽑는다.
     - 한글 메뉴 키워드
     - 영어 메뉴 키워드 → 한글 매핑
     - 딘타이펑(만두/딤섬), 양국(양고기) 케이스 강화
+    (키워드 전체를 한 번에 훑고, 같은 리뷰는 해시 기준으로 캐시)
     """
     if not review_text:
         return []
 
     text = str(review_text)
+    key = hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
 
-    # 1) 한글 메뉴 키워드
-    menu_keywords = [
-        # 한식/분식
-        "김치찌개", "된장찌개", "불고기", "삼겹살", "갈비",
-        "냉면", "비빔밥", "떡볶이", "라볶이", "튀김", "순대", "김밥",
-        "칼국수", "국수",
-
-        # 일식
-        "초밥", "스시", "라멘", "우동", "돈카츠", "텐동",
-
-        # 중식 + 딤섬 계열 (딘타이펑 대응)
-        "짜장면", "짬뽕", "탕수육", "마라탕",
-        "만두", "샤오롱바오", "소롱포", "딤섬",
-
-        # 양고기 계열 (양국 등)
-        "양고기", "양꼬치", "양갈비",
-
-        # 양식/기타
-        "파스타", "피자", "리조또", "스테이크",
-        "치킨", "버거", "뷔페",
-    ]
-
-    found = []
-    for kw in menu_keywords:
-        if kw in text:
-            found.append(kw)
-
-    # 2) 영어 메뉴 키워드 → 한글 매핑
-    lower = text.lower()
-    eng_map = {
-        "sushi": "초밥",
-        "ramen": "라멘",
-        "udon": "우동",
-        "pasta": "파스타",
-        "pizza": "피자",
-        "steak": "스테이크",
-        "bbq": "바비큐",
-        "barbecue": "바비큐",
-        "burger": "버거",
-        "sandwich": "샌드위치",
-        "chicken": "치킨",
-        "noodle": "면요리",
-        "noodles": "면요리",
-        "curry": "카레",
-        "coffee": "커피",
-        "buffet": "뷔페",
-
-        # 딤섬/만두 계열 (딘타이펑)
-        "dumpling": "만두",
-        "dumplings": "만두",
-        "xiao long bao": "샤오롱바오",
-        "xiaolongbao": "샤오롱바오",
-        "xialongbao": "샤오롱바오",
-        "dim sum": "딤섬",
-        "dimsum": "딤섬",
-
-        # 양고기 계열 (양국)
-        "lamb": "양고기",
-        "mutton": "양고기",
-    }
+    with _menu_cache_lock:
+        cached = _menu_cache.get(key)
+        if cached is not None:
+            _menu_cache.move_to_end(key)
+            return list(cached)
 
-    for eng, kor in eng_map.items():
-        if eng in lower:
-            found.append(kor)
+    found = [menu_labels[pid] for pid in sorted(menu_matcher.find_ids(text.lower()))]
 
     # 3) 중복 제거 + 너무 많으면 상위만 사용
-    found_unique = list(dict.fromkeys(found))
-    return found_unique[:4]
-
+    result = tuple(list(dict.fromkeys(found))[:4])
 
+    with _menu_cache_lock:
+        _menu_cache[key] = result
+        if len(_menu_cache) > MENU_CACHE_MAX:
+            _menu_cache.popitem(last=False)
+    return list(result)
 
 
 def _normalize_category_kr(category: str | None) -> str | None:
@@ -1245,507 +4075,374 @@ def build_keywords(category, rating, distance_km, preferred=False, review_text="
 
 
 # =========================
-# Flask 페이지 라우트
+# 추천 점수 계산 (NumPy 벡터화)
 # =========================
+# 후보 수만큼 도는 if/elif 대신 배열 연산 한 번으로 점수 + 추천 이유를 계산.
+# api_reco 와 배치성 작업이 같은 함수를 쓰도록 여기 한 곳에만 둔다.
+
+# 추천 이유 플래그 (비트). 문구는 REASON_TEXTS 순서대로 붙는다.
+REASON_SIGNUP_CATEGORY = 1 << 0
+REASON_CATEGORY_LOVED = 1 << 1
+REASON_CATEGORY_LIKED = 1 << 2
+REASON_CATEGORY_MEH = 1 << 3
+REASON_CATEGORY_DISLIKED = 1 << 4
+REASON_RESTAURANT_LOVED = 1 << 5
+REASON_RESTAURANT_DISLIKED = 1 << 6
+
+REASON_TEXTS = [
+    (REASON_SIGNUP_CATEGORY, "회원가입에서 선택한 선호 카테고리와 일치해요."),
+    (REASON_CATEGORY_LOVED, "이 시간대에 자주 높게 평가한 음식 종류예요."),
+    (REASON_CATEGORY_LIKED, "이 시간대에 만족도가 높은 카테고리예요."),
+    (REASON_CATEGORY_MEH, "예전에 살짝 아쉬웠던 카테고리지만, 근처라 후보에 포함했어요."),
+    (REASON_CATEGORY_DISLIKED, "평균 만족도가 낮았던 카테고리라 점수를 낮췄어요."),
+    (REASON_RESTAURANT_LOVED, "이전에 이 가게에 높은 점수를 주신 적이 있어요."),
+    (REASON_RESTAURANT_DISLIKED, "예전에 별로라고 평가하신 가게라 점수를 크게 낮췄어요."),
+]
+
+# '선호' 배지를 붙이는 플래그
+PREFERRED_REASONS = REASON_SIGNUP_CATEGORY | REASON_CATEGORY_LOVED | REASON_RESTAURANT_LOVED
+
+
+@dataclass
+class CandidateFeatures:
+    """
+    점수 계산용 후보 특성 배열 (길이 N 으로 모두 같음).
+    category_id / restaurant_id 는 categories / restaurant_names 의 인덱스.
+    """
+    rating: np.ndarray              # float, 없으면 nan
+    review_count: np.ndarray        # int
+    distance_km: np.ndarray         # float, 없으면 nan
+    category_id: np.ndarray         # int → categories[i]
+    restaurant_id: np.ndarray       # int → restaurant_names[i]
+    categories: list = field(default_factory=list)
+    restaurant_names: list = field(default_factory=list)
 
-@app.route("/")
-def index():
-    phone = request.args.get("phone", "").strip()
-    time_of_day = request.args.get("time", "").strip()
-    return redirect(f"/reco?phone={phone}&time={time_of_day}")
-
-
-@app.route("/signup")
-def signup():
-    html = """
-<!DOCTYPE html>
-<html>
-<head>
-  <meta charset="utf-8">
-  <title>내 위치·취향 기반 맛집 알림 서비스, 냠냠이!</title>
-  <meta name="viewport" content="width=device-width, initial-scale=1.0">
-
-  <link href="https://fonts.googleapis.com/css2?family=Noto+Sans+KR:wght@400;500;700&display=swap" rel="stylesheet">
-
-  <style>
-    * {
-      box-sizing: border-box;
-    }
-
-    body {
-      font-family: "Noto Sans KR", sans-serif;
-      background: linear-gradient(180deg, #ffeaf5, #e3f0ff);
-      margin: 0;
-      padding: 12px;
-      display: flex;
-      justify-content: center;
-      align-items: flex-start;
-      min-height: 100vh;
-    }
-
-    .wrap {
-      width: 100%;
-      max-width: 480px;
-      background: #ffffff;
-      padding: 24px 18px 26px;
-      border-radius: 20px;
-      box-shadow: 0 16px 45px rgba(0, 0, 0, 0.08);
-      text-align: center;
-    }
-
-    .logo {
-      width: 70px;
-      margin: 0 auto 8px;
-      display: block;
-    }
+    def __len__(self):
+        return len(self.rating)
 
-    h1 {
-      font-size: 20px;
-      margin-bottom: 6px;
-      word-break: keep-all;
-      line-height: 1.4;
-    }
 
-    .subtitle {
-      font-size: 13px;
-      color: #666;
-      margin-bottom: 16px;
-      line-height: 1.6;
-      word-break: keep-all;
-    }
+def build_candidate_features(rows):
+    """
+    [(name, category, rating, review_count, distance_km), ...] → CandidateFeatures.
+    같은 카테고리/가게 이름은 같은 id 로 묶는다 (프로필 조회는 종류별 1번).
+    """
+    n = len(rows)
+    rating = np.full(n, np.nan)
+    review_count = np.zeros(n, dtype=np.int64)
+    distance_km = np.full(n, np.nan)
+    category_id = np.zeros(n, dtype=np.int64)
+    restaurant_id = np.zeros(n, dtype=np.int64)
+
+    cat_index = {}
+    name_index = {}
+    for i, (name, category, r, cnt, dist) in enumerate(rows):
+        if r is not None:
+            rating[i] = r
+        review_count[i] = cnt or 0
+        if dist is not None:
+            distance_km[i] = dist
+        category_id[i] = cat_index.setdefault(category or "", len(cat_index))
+        restaurant_id[i] = name_index.setdefault(name or "", len(name_index))
+
+    return CandidateFeatures(
+        rating=rating,
+        review_count=review_count,
+        distance_km=distance_km,
+        category_id=category_id,
+        restaurant_id=restaurant_id,
+        categories=list(cat_index),
+        restaurant_names=list(name_index),
+    )
 
-    .phone-block {
-      margin: 14px 0 12px;
-      text-align: left;
-    }
 
-    .phone-label {
-      font-size: 13px;
-      color: #555;
-      margin-left: 4px;
-      margin-bottom: 4px;
-    }
+def _profile_lookup(keys, prefs):
+    """keys 순서대로 prefs 평균 점수 배열 (없으면 nan)"""
+    out = np.full(len(keys), np.nan)
+    if prefs:
+        for i, k in enumerate(keys):
+            v = prefs.get(k)
+            if v is not None:
+                out[i] = v
+    return out
 
-    .phone-input {
-      width: 100%;
-      display: block;
-      padding: 11px 14px;
-      border-radius: 999px;
-      border: 1px solid #ddd;
-      font-size: 15px;
-      text-align: center;
-      background: #fafafa;
-    }
 
-    .section-title {
-      font-size: 14px;
-      font-weight: 600;
-      margin: 14px 0 6px;
-      text-align: left;
-    }
+def score_candidates(features, profile):
+    """
+    후보 전체 점수와 추천 이유 플래그를 한 번에 계산.
+      profile: UserContext (user_categories / category_prefs / restaurant_prefs)
+    반환: (scores float 배열, reason_flags int 배열)
 
-    .chips-row {
-      display: flex;
-      flex-wrap: wrap;
-      justify-content: flex-start;
-      gap: 8px;
-      margin-bottom: 4px;
-    }
+    점수 = (rating*10*리뷰수가중치 - 거리 + 선호카테고리 5점)
+           × 시간대 카테고리 가중치 × 가게 가중치
+    """
+    rating = np.where(np.isnan(features.rating), 3.0, features.rating)
+    dist = np.where(np.isnan(features.distance_km), 0.0, features.distance_km)
+
+    # 리뷰 수에 따른 신뢰도 가중치 (50+ / 20+ / 5+ / 그 외)
+    review_factor = np.select(
+        [features.review_count >= 50, features.review_count >= 20, features.review_count >= 5],
+        [1.2, 1.1, 1.0],
+        default=0.9,
+    )
+    scores = rating * 10 * review_factor - dist
+    flags = np.zeros(len(features), dtype=np.int64)
+
+    # 회원가입 선호 카테고리 (부분 문자열 일치) – 카테고리 종류별로 한 번만 판정
+    user_categories = [uc for uc in (profile.user_categories or []) if uc]
+    signup_hit = np.array(
+        [bool(cat) and any(uc in cat for uc in user_categories) for cat in features.categories],
+        dtype=bool,
+    )
+    if signup_hit.any():
+        hit = signup_hit[features.category_id]
+        scores = scores + np.where(hit, 5.0, 0.0)
+        flags |= np.where(hit, REASON_SIGNUP_CATEGORY, 0)
+
+    # 시간대별 카테고리 선호도
+    cat_avg = _profile_lookup(features.categories, profile.category_prefs)[features.category_id]
+    has_cat = ~np.isnan(cat_avg)
+    if has_cat.any():
+        avg = np.where(has_cat, cat_avg, 3.0)
+        conds = [avg >= 4.5, avg >= 4.0, avg >= 3.0, avg >= 2.0]
+        scores = scores * np.select(conds, [1.3, 1.15, 1.0, 0.7], default=0.4)
+        flags |= np.where(
+            has_cat,
+            np.select(
+                conds,
+                [REASON_CATEGORY_LOVED, REASON_CATEGORY_LIKED, 0, REASON_CATEGORY_MEH],
+                default=REASON_CATEGORY_DISLIKED,
+            ),
+            0,
+        )
 
-    .chip {
-      flex: 0 1 calc(50% - 8px);   /* 모바일에서 두 줄 정렬 */
-      display: inline-flex;
-      align-items: center;
-      justify-content: center;
-      gap: 6px;
-      padding: 7px 10px;
-      border-radius: 999px;
-      border: 1px solid #ddd;
-      font-size: 13px;
-      cursor: pointer;
-      background: #fafafa;
-      white-space: nowrap;
-    }
+    # 개별 가게 선호도
+    rest_avg = _profile_lookup(features.restaurant_names, profile.restaurant_prefs)[features.restaurant_id]
+    has_rest = ~np.isnan(rest_avg)
+    if has_rest.any():
+        avg = np.where(has_rest, rest_avg, 3.0)
+        loved = has_rest & (avg >= 4.0)
+        disliked = has_rest & (avg <= 2.5)
+        scores = scores * np.select([loved, disliked], [1.3, 0.2], default=1.0)
+        flags |= np.where(loved, REASON_RESTAURANT_LOVED, 0)
+        flags |= np.where(disliked, REASON_RESTAURANT_DISLIKED, 0)
+
+    return scores, flags
+
+
+def reasons_from_flags(flags):
+    """플래그 하나 → (화면용 이유 문장, 선호 여부)"""
+    flags = int(flags)
+    text = " ".join(t for bit, t in REASON_TEXTS if flags & bit)
+    return text, bool(flags & PREFERRED_REASONS)
+
+
+@app.cli.command("bench-scoring")
+@click.option("--n", "n", default=10000, show_default=True, help="후보 수")
+@click.option("--repeat", default=20, show_default=True)
+def bench_scoring_command(n, repeat):
+    """score_candidates 단독 벤치마크 (무작위 후보 n 개)"""
+    rng = np.random.default_rng(0)
+    cats = ["한식", "중식", "일식", "양식", "분식", "카페", "치킨", "피자"]
+    rows = [
+        (
+            f"가게{i}",
+            cats[i % len(cats)],
+            float(rng.uniform(1, 5)) if i % 17 else None,
+            int(rng.integers(0, 300)),
+            round(float(rng.uniform(0, 3)), 1),
+        )
+        for i in range(n)
+    ]
+    profile = UserContext(
+        user_categories=["한식", "분식"],
+        category_prefs={"한식": 4.6, "중식": 4.1, "일식": 2.5, "피자": 1.5},
+        restaurant_prefs={f"가게{i}": (5.0 if i % 2 else 1.0) for i in range(0, n, 50)},
+    )
 
-    .chip input {
-      margin: 0;
-    }
+    started = time.perf_counter()
+    features = build_candidate_features(rows)
+    build_ms = (time.perf_counter() - started) * 1000
 
-    .chip span {
-      padding-top: 1px;
-    }
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        score_candidates(features, profile)
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
 
-    .btn {
-      width: 100%;
-      margin: 8px auto 0;
-      display: block;
-      padding: 11px 0;
-      border-radius: 999px;
-      border: none;
-      font-size: 15px;
-      font-weight: 600;
-      cursor: pointer;
-    }
+    click.echo(
+        f"n={n} build_features={build_ms:.2f}ms "
+        f"score p50={timings[len(timings) // 2]:.3f}ms min={timings[0]:.3f}ms max={timings[-1]:.3f}ms"
+    )
 
-    .btn-location {
-      background: #f4f4f4;
-      color: #333;
-      margin-top: 10px;
-    }
 
-    .btn-submit {
-      background: #ff6b81;
-      color: white;
-      margin-top: 12px;
-    }
+# =========================
+# 응답 압축 / 조건부 캐시
+# =========================
+# 카톡 링크로 모바일에서 열리는 페이지가 대부분이라
+#  - 일정 크기 이상 텍스트 응답은 br(설치돼 있으면) / gzip 압축
+#  - 정적 파일 · 요청마다 안 바뀌는 페이지는 미리 압축해 둔 바이트 사용
+#  - GET 응답에는 strong ETag + If-None-Match → 304
+#  - 라우트별 Cache-Control
+
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))   # 이보다 작으면 압축 안 함
+COMPRESS_LEVEL = int(os.getenv("COMPRESS_LEVEL", "6"))              # gzip 레벨 (1~9)
+STATIC_MAX_AGE = int(os.getenv("STATIC_MAX_AGE", "604800"))         # 정적 파일 브라우저 캐시 (초)
+
+COMPRESSIBLE_MIMETYPES = {
+    "text/html",
+    "text/css",
+    "text/plain",
+    "text/javascript",
+    "application/javascript",
+    "application/json",
+    "image/svg+xml",
+}
+COMPRESSIBLE_STATIC_EXTS = (".css", ".js", ".svg", ".html", ".json", ".txt")
+
+# endpoint → Cache-Control (뷰에서 직접 지정한 값이 있으면 그걸 우선)
+CACHE_CONTROL_BY_ENDPOINT = {
+    "reco_page": "private, no-cache",        # 전화번호별 화면 → 매번 ETag 로 확인
+    "feedback_form": "private, no-cache",
+    "api_reco": "no-store",                  # 매번 랜덤 추천
+    "api_quick_feedback": "no-store",
+    "go_kakao_map": "no-store",
+}
 
-    #status {
-      font-size: 12px;
-      color: #333;
-      margin-top: 6px;
-      text-align: center;
-      word-break: keep-all;
-    }
+app.config["SEND_FILE_MAX_AGE_DEFAULT"] = STATIC_MAX_AGE
 
-    .location-help {
-      font-size: 12px;
-      color: #777;
-      margin-top: 8px;
-      line-height: 1.5;
-      word-break: keep-all;
-      text-align: left;
-    }
+_precompressed = {}      # 원본 ETag → {"gzip": bytes, "br": bytes}
 
-    .agreements {
-      width: 100%;
-      margin: 12px auto 0;
-      font-size: 11px;
-      color: #777;
-      text-align: left;
-      line-height: 1.5;
-    }
 
-    .agreements label {
-      display: inline-flex;
-      align-items: flex-start;
-      gap: 6px;
-      margin-top: 4px;
-    }
+def _encodings_available():
+    return ("br", "gzip") if brotli is not None else ("gzip",)
 
-    .agreements input {
-      margin-top: 2px;
-    }
 
-    .agreements a {
-      color: #555;
-      text-decoration: underline;
-      cursor: pointer;
-    }
+def compress_body(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=5)
+    return gzip.compress(body, compresslevel=COMPRESS_LEVEL, mtime=0)
 
-    .footer {
-      margin-top: 14px;
-      font-size: 11px;
-      color: #999;
-      text-align: center;
-      word-break: keep-all;
-    }
 
-    /* 약관 모달 */
-    .modal-terms {
-      position: fixed;
-      inset: 0;
-      display: none;
-      justify-content: center;
-      align-items: center;
-      z-index: 999;
-    }
+def precompress(etag, body):
+    """요청마다 안 바뀌는 본문을 미리 압축해서 ETag 기준으로 보관"""
+    if len(body) >= COMPRESS_MIN_BYTES:
+        _precompressed[etag] = {enc: compress_body(body, enc) for enc in _encodings_available()}
 
-    .modal-terms-backdrop {
-      position: absolute;
-      inset: 0;
-      background: rgba(0, 0, 0, 0.45);
-    }
 
-    .modal-terms-content {
-      position: relative;
-      background: #fff;
-      width: 90%;
-      max-width: 420px;
-      max-height: 80vh;
-      border-radius: 18px;
-      padding: 18px 16px 14px;
-      box-shadow: 0 10px 30px rgba(0, 0, 0, 0.25);
-      overflow-y: auto;
-      font-size: 12px;
-      text-align: left;
-    }
+def precompress_static_files():
+    """static/ 안의 텍스트 계열 파일을 시작할 때 미리 압축 (png 등은 이미 압축돼 있어서 제외)"""
+    folder = app.static_folder
+    if not folder or not os.path.isdir(folder):
+        return 0
+    count = 0
+    for root, _, files in os.walk(folder):
+        for fname in files:
+            if not fname.lower().endswith(COMPRESSIBLE_STATIC_EXTS):
+                continue
+            path = os.path.join(root, fname)
+            with open(path, "rb") as f:
+                body = f.read()
+            rel = os.path.relpath(path, folder).replace(os.sep, "/")
+            precompress(f"static:{rel}", body)
+            count += 1
+    return count
+
+
+@app.after_request
+def optimize_response(resp):
+    endpoint = request.endpoint or ""
+
+    cache_control = CACHE_CONTROL_BY_ENDPOINT.get(endpoint)
+    if cache_control is None and endpoint.startswith("admin"):
+        cache_control = "no-store"
+    if cache_control and "Cache-Control" not in resp.headers:
+        resp.headers["Cache-Control"] = cache_control
+
+    if resp.status_code != 200 or "Content-Encoding" in resp.headers:
+        return resp
+    if resp.mimetype not in COMPRESSIBLE_MIMETYPES:
+        return resp
+
+    # 정적 파일: 미리 압축해 둔 게 있을 때만 (send_file 스트림 대신 바이트로 교체)
+    stored = None
+    if endpoint == "static":
+        stored = _precompressed.get(f"static:{(request.view_args or {}).get('filename')}")
+        if stored is None:
+            return resp
+        resp.direct_passthrough = False
+    elif resp.is_streamed:
+        return resp
+
+    body = resp.get_data()
+    resp.vary.add("Accept-Encoding")
+
+    encoding = None
+    if len(body) >= COMPRESS_MIN_BYTES:
+        encoding = request.accept_encodings.best_match(_encodings_available())
+
+    # strong ETag: 원본 해시 + 인코딩별 접미사 (표현마다 다른 값이어야 함)
+    if request.method in ("GET", "HEAD"):
+        base_etag, weak = resp.get_etag()
+        if base_etag is None:
+            base_etag, weak = hashlib.sha1(body).hexdigest(), False
+        if stored is None:
+            stored = _precompressed.get(base_etag)
+        if not weak:
+            resp.set_etag(f"{base_etag}-{encoding}" if encoding else base_etag)
+            resp.make_conditional(request)
+            if resp.status_code == 304:
+                return resp
+
+    if encoding:
+        data = stored.get(encoding) if stored else None
+        if data is None:
+            data = compress_body(body, encoding)
+        resp.set_data(data)
+        resp.headers["Content-Encoding"] = encoding
+    return resp
 
-    .modal-terms-content h3 {
-      font-size: 14px;
-      margin-top: 0;
-      margin-bottom: 8px;
-      text-align: center;
-    }
 
-    .modal-terms-content h4 {
-      font-size: 13px;
-      margin-bottom: 4px;
-    }
+# =========================
+# Flask 페이지 라우트
+# =========================
 
-    .modal-terms-body {
-      font-size: 12px;
-      line-height: 1.6;
-      text-align: left;
-      word-break: keep-all;
-    }
+@app.route("/")
+def index():
+    phone = request.args.get("phone", "").strip()
+    time_of_day = request.args.get("time", "").strip()
+    return redirect(f"/reco?phone={phone}&time={time_of_day}")
 
-    .modal-terms-close {
-      margin-top: 10px;
-      width: 100%;
-      padding: 8px 0;
-      border-radius: 999px;
-      border: none;
-      background: #ff6b81;
-      color: #fff;
-      font-size: 13px;
-      cursor: pointer;
-    }
 
-    /* 데스크탑에서 chip 폭 살짝 줄이기 */
-    @media (min-width: 480px) {
-      .chip {
-        flex: 0 0 auto;
-      }
-      .section-title {
-        text-align: center;
-      }
-      .location-help {
-        text-align: center;
-      }
-    }
-  </style>
-</head>
-<body>
-
-<div class="wrap">
-  <img src="/static/logo.png" class="logo" alt="냠냠이 로고">
-
-  <h1>내 위치·취향 기반 맛집 알림 서비스, 냠냠이!</h1>
-  <p class="subtitle">
-    고객님이 선택하신 선호 음식과 현재 위치를 기반으로,<br>
-    아침·점심·저녁·야식 시간에 맞춰 주변 맛집을 카카오톡으로 보내드립니다.
-  </p>
-
-  <div class="phone-block">
-    <div class="phone-label">휴대폰 번호</div>
-    <input type="text" id="phone" class="phone-input" placeholder="'-' 없이 숫자만 입력">
-  </div>
-
-  <div class="section-title">선호하는 음식 종류</div>
-  <div class="chips-row">
-    <label class="chip">
-      <input type="checkbox" name="category" value="한식"><span>한식</span>
-    </label>
-    <label class="chip">
-      <input type="checkbox" name="category" value="중식"><span>중식</span>
-    </label>
-    <label class="chip">
-      <input type="checkbox" name="category" value="일식"><span>일식</span>
-    </label>
-    <label class="chip">
-      <input type="checkbox" name="category" value="양식"><span>양식</span>
-    </label>
-    <label class="chip">
-      <input type="checkbox" name="category" value="분식"><span>분식</span>
-    </label>
-  </div>
-
-  <div class="section-title">알림 받고 싶은 시간대</div>
-  <div class="chips-row">
-    <label class="chip">
-      <input type="checkbox" name="alert" value="아침"><span>아침(08시)</span>
-    </label>
-    <label class="chip">
-      <input type="checkbox" name="alert" value="점심"><span>점심(11시)</span>
-    </label>
-    <label class="chip">
-      <input type="checkbox" name="alert" value="저녁"><span>저녁(17시)</span>
-    </label>
-    <label class="chip">
-      <input type="checkbox" name="alert" value="야식"><span>야식(21시)</span>
-    </label>
-  </div>
-
-  <button class="btn btn-location" onclick="getLocation()">📍 현재 위치 설정</button>
-
-  <p class="location-help">
-    기본적으로 현재 위치를 기반으로 주변 맛집을 추천 드리며,<br>
-    현재 위치를 받지 못할 경우, 신청 시 설정한 위치 기반 주변 맛집 안내를 발송 드립니다.
-  </p>
-
-  <div id="status">아직 위치가 설정되지 않았습니다.</div>
-
-  <div class="agreements">
-    <label>
-      <input type="checkbox" id="agree-service">
-      <span>서비스 이용 약관 및 개인정보 수집·이용에 동의합니다. (<a onclick="openTerms()">내용 보기</a>)</span>
-    </label>
-  </div>
-
-  <button class="btn btn-submit" onclick="submitForm()">신청하기</button>
-
-  <div class="footer">
-    운영: 돕힝연구소 · 대표자: 김신혁 · 본 서비스는 테스트용 베타 서비스입니다.
-  </div>
-</div>
-
-<div id="terms-modal" class="modal-terms">
-  <div class="modal-terms-backdrop" onclick="closeTerms()"></div>
-  <div class="modal-terms-content">
-    <h3>서비스 이용 약관 및 개인정보 수집·이용 동의</h3>
-    <div class="modal-terms-body">
-      <h4>1. 서비스 개요</h4>
-      <p>
-        본 서비스는 이용자가 선택한 선호 음식과 설정한 위치를 바탕으로,
-        지정한 시간대에 주변 음식점을 추천하여 카카오톡으로 안내하는 알림 서비스입니다.
-      </p>
-
-      <h4>2. 수집 항목</h4>
-      <ul>
-        <li>휴대폰 번호</li>
-        <li>위치 정보(위도·경도)</li>
-        <li>선호 음식 종류, 알림 희망 시간대</li>
-        <li>서비스 이용 기록 및 선택적으로 제출한 이용 후기</li>
-      </ul>
-
-      <h4>3. 이용 목적</h4>
-      <ul>
-        <li>시간대별 맞춤형 맛집 추천 알림 발송</li>
-        <li>추천 품질 개선을 위한 통계·분석</li>
-        <li>서비스 이용 내역 확인 및 문의 대응</li>
-      </ul>
-
-      <h4>4. 보관 및 파기</h4>
-      <p>
-        수집된 정보는 서비스 제공 기간 동안 보관되며,
-        이용자가 서비스 탈퇴 또는 삭제를 요청하는 경우 지체 없이 파기합니다.
-        관련 법령에서 별도의 보관 기간을 정한 경우 해당 기간 동안만 보관합니다.
-      </p>
-
-      <h4>5. 제3자 제공 및 위탁</h4>
-      <p>
-        법령상 요구되거나 이용자의 별도 동의가 있는 경우를 제외하고,
-        제3자에게 개인정보를 제공하지 않으며 필수적인 시스템 운영을 위해
-        일부 업무를 외부 서비스(예: 카카오 알림 발송 대행사)에 위탁할 수 있습니다.
-      </p>
-
-      <h4>6. 동의 거부 권리</h4>
-      <p>
-        이용자는 개인정보 수집·이용에 대한 동의를 거부할 권리가 있으며,
-        다만 이 경우 서비스 이용(맛집 알림 제공)이 제한될 수 있습니다.
-      </p>
-
-      <p style="margin-top:10px; font-size:11px; color:#999;">
-        * 본 약관 및 안내문은 일반적인 예시이며, 실제 상용 서비스 운영 시에는
-        별도의 법률 검토가 필요할 수 있습니다.
-      </p>
-    </div>
-    <button type="button" class="modal-terms-close" onclick="closeTerms()">닫기</button>
-  </div>
-</div>
-
-<script>
-  let currentLat = null;
-  let currentLon = null;
-
-  function getLocation() {
-    if (!navigator.geolocation) {
-      document.getElementById("status").innerText = "⚠ 브라우저에서 위치 정보를 지원하지 않습니다.";
-      return;
-    }
+SIGNUP_CACHE_MAX_AGE = int(os.getenv("SIGNUP_CACHE_MAX_AGE", "86400"))   # /signup 브라우저 캐시 (초)
 
-    document.getElementById("status").innerText = "위치를 불러오는 중입니다...";
+_signup_page = None     # (html bytes, etag, last_modified) – 요청마다 바뀌는 값이 없어서 한 번만 렌더링
+_signup_page_lock = threading.Lock()
 
-    navigator.geolocation.getCurrentPosition(
-      function(pos) {
-        currentLat = pos.coords.latitude;
-        currentLon = pos.coords.longitude;
-        document.getElementById("status").innerText = "✅ 현재 위치 설정 완료";
-      },
-      function(err) {
-        document.getElementById("status").innerText = "위치 정보를 가져오지 못했습니다. 다시 시도해주세요.";
-      }
-    );
-  }
-
-  function openTerms() {
-    const m = document.getElementById("terms-modal");
-    if (m) m.style.display = "flex";
-  }
-
-  function closeTerms() {
-    const m = document.getElementById("terms-modal");
-    if (m) m.style.display = "none";
-  }
-
-  function submitForm() {
-    const phone = document.getElementById("phone").value.trim();
-
-    if (!phone) {
-      alert("휴대폰 번호를 입력해주세요.");
-      return;
-    }
 
-    if (!/^[0-9]+$/.test(phone)) {
-      alert("휴대폰 번호는 '-' 없이 숫자만 입력해주세요.");
-      return;
-    }
+def _render_signup_page():
+    global _signup_page
+    if _signup_page is None:
+        with _signup_page_lock:
+            if _signup_page is None:
+                body = render_template("signup.html").encode("utf-8")
+                path = os.path.join(app.root_path, app.template_folder, "signup.html")
+                last_modified = datetime.fromtimestamp(os.path.getmtime(path), timezone.utc)
+                etag = hashlib.sha1(body).hexdigest()
+                precompress(etag, body)
+                _signup_page = (body, etag, last_modified)
+    return _signup_page
 
-    if (!currentLat || !currentLon) {
-      alert("먼저 '현재 위치 설정' 버튼을 눌러 위치를 설정해주세요.");
-      return;
-    }
-    if (!document.getElementById("agree-service").checked) {
-      alert("서비스 이용 약관에 동의해주세요.");
-      return;
-    }
 
-    const categoryEls = document.querySelectorAll("input[name='category']:checked");
-    const alertEls = document.querySelectorAll("input[name='alert']:checked");
-
-    const categories = Array.from(categoryEls).map(el => el.value);
-    const alertTimes = Array.from(alertEls).map(el => el.value);
-
-    fetch("/register", {
-      method: "POST",
-      headers: {"Content-Type": "application/json"},
-      body: JSON.stringify({
-        phone_number: phone,
-        latitude: currentLat,
-        longitude: currentLon,
-        preferences_categories: categories,
-        preferences_focus: "맛",
-        alert_times: alertTimes
-      })
-    })
-    .then(res => res.json())
-    .then(data => {
-      if (data.success) {
-        alert("✅ 신청이 완료되었습니다! 선택하신 시간대에 맞춰 맛집을 보내드릴게요.");
-      } else {
-        alert("오류: " + (data.message || "알 수 없는 오류"));
-      }
-    })
-    .catch(err => {
-      alert("요청 중 오류가 발생했습니다.");
-    });
-  }
-</script>
-
-</body>
-</html>
-"""
-    return render_template_string(html)
+@app.route("/signup")
+def signup():
+    body, etag, last_modified = _render_signup_page()
+    resp = app.response_class(body, mimetype="text/html")
+    resp.set_etag(etag)
+    resp.last_modified = last_modified
+    resp.cache_control.public = True
+    resp.cache_control.max_age = SIGNUP_CACHE_MAX_AGE
+    return resp   # 304 / 압축은 optimize_response 에서
 
 
 @app.route("/reco")
@@ -1759,20 +4456,19 @@ def reco_page():
 
     if phone:
         try:
-            conn = get_conn()
-            cur = conn.cursor()
-            cur.execute(
-                "SELECT latitude, longitude FROM users WHERE phone_number = %s",
-                (phone,),
-            )
-            row = cur.fetchone()
-            if row and row[0] is not None and row[1] is not None:
-                signup_lat, signup_lon = float(row[0]), float(row[1])
-                has_signup_location = True
-            cur.close()
-            conn.close()
+            with get_conn() as conn:
+                cur = conn.cursor()
+                cur.execute(
+                    "SELECT latitude, longitude FROM users WHERE phone_number = %s",
+                    (phone,),
+                )
+                row = cur.fetchone()
+                if row and row[0] is not None and row[1] is not None:
+                    signup_lat, signup_lon = float(row[0]), float(row[1])
+                    has_signup_location = True
+                cur.close()
         except Exception as e:
-            print("[RECO_PAGE_USER_LOCATION_ERR]", e)
+            log_event("RECO_PAGE_USER_LOCATION_ERR", logging.WARNING, error=e)
 
     return render_template(
         "reco.html",
@@ -1794,297 +4490,91 @@ def admin_dashboard():
     if key != ADMIN_PASSWORD:
         return "UNAUTHORIZED", 403
 
-    conn = get_conn()
-    cur = conn.cursor()
+    with get_conn() as conn:
+        cur = conn.cursor()
 
-    cur.execute("SELECT COUNT(*) FROM users;")
-    total_users = cur.fetchone()[0]
+        cur.execute("SELECT COUNT(*) FROM users;")
+        total_users = cur.fetchone()[0]
 
-    cur.execute("SELECT COUNT(*) FROM users WHERE is_active = TRUE;")
-    active_users = cur.fetchone()[0]
+        cur.execute("SELECT COUNT(*) FROM users WHERE is_active = TRUE;")
+        active_users = cur.fetchone()[0]
 
-    try:
-        cur.execute("""
-            SELECT COUNT(*) 
-            FROM recommendation_logs
-            WHERE created_at::date = CURRENT_DATE;
-        """)
-        today_reco = cur.fetchone()[0]
-    except Exception:
-        conn.rollback()
-        cur.execute("SELECT COUNT(*) FROM recommendation_logs;")
-        today_reco = cur.fetchone()[0]
+        try:
+            cur.execute("""
+                SELECT COUNT(*) 
+                FROM recommendation_logs
+                WHERE created_at::date = CURRENT_DATE;
+            """)
+            today_reco = cur.fetchone()[0]
+        except Exception:
+            conn.rollback()
+            cur.execute("SELECT COUNT(*) FROM recommendation_logs;")
+            today_reco = cur.fetchone()[0]
 
-    try:
-        cur.execute("SELECT COUNT(*) FROM user_feedback;")
-        feedback_count = cur.fetchone()[0]
-    except Exception:
-        conn.rollback()
-        feedback_count = 0
+        try:
+            cur.execute("SELECT COUNT(*) FROM user_feedback;")
+            feedback_count = cur.fetchone()[0]
+        except Exception:
+            conn.rollback()
+            feedback_count = 0
 
-    try:
-        cur.execute("""
-            SELECT category, AVG(rating) AS avg_rating, COUNT(*) AS cnt
-            FROM user_feedback
-            GROUP BY category
-            ORDER BY avg_rating DESC, cnt DESC
-            LIMIT 5;
-        """)
-        category_stats = cur.fetchall()
-    except Exception:
-        conn.rollback()
-        category_stats = []
+        try:
+            cur.execute("""
+                SELECT category, AVG(rating) AS avg_rating, COUNT(*) AS cnt
+                FROM user_feedback
+                GROUP BY category
+                ORDER BY avg_rating DESC, cnt DESC
+                LIMIT 5;
+            """)
+            category_stats = cur.fetchall()
+        except Exception:
+            conn.rollback()
+            category_stats = []
 
-    try:
-        cur.execute("""
-            SELECT phone_number, latitude, longitude, alert_times, created_at, is_active
-            FROM users
-            ORDER BY created_at DESC
-            LIMIT 10;
-        """)
-        recent_users = cur.fetchall()
-    except Exception:
-        conn.rollback()
-        cur.execute("""
-            SELECT phone_number, latitude, longitude, alert_times, is_active
-            FROM users
-            ORDER BY phone_number DESC
-            LIMIT 10;
-        """)
-        rows = cur.fetchall()
-        recent_users = [(r[0], r[1], r[2], r[3], None, r[4]) for r in rows]
+        try:
+            cur.execute("""
+                SELECT phone_number, latitude, longitude, alert_times, created_at, is_active
+                FROM users
+                ORDER BY created_at DESC
+                LIMIT 10;
+            """)
+            recent_users = cur.fetchall()
+        except Exception:
+            conn.rollback()
+            cur.execute("""
+                SELECT phone_number, latitude, longitude, alert_times, is_active
+                FROM users
+                ORDER BY phone_number DESC
+                LIMIT 10;
+            """)
+            rows = cur.fetchall()
+            recent_users = [(r[0], r[1], r[2], r[3], None, r[4]) for r in rows]
 
-    try:
-        cur.execute("""
-            SELECT phone_number, restaurant_name, category, rating, comment, created_at
-            FROM user_feedback
-            ORDER BY created_at DESC
-            LIMIT 10;
-        """)
-        recent_feedback = cur.fetchall()
-    except Exception:
-        conn.rollback()
         try:
             cur.execute("""
-                SELECT phone_number, restaurant_name, category, rating
+                SELECT phone_number, restaurant_name, category, rating, comment, created_at
                 FROM user_feedback
-                ORDER BY id DESC
+                ORDER BY created_at DESC
                 LIMIT 10;
             """)
-            rows = cur.fetchall()
-            recent_feedback = [(r[0], r[1], r[2], r[3], None) for r in rows]
+            recent_feedback = cur.fetchall()
         except Exception:
-            recent_feedback = []
-
-    conn.close()
-
-    html = """
-<!DOCTYPE html>
-<html>
-<head>
-<meta charset="utf-8">
-<title>냠냠이 관리자 대시보드</title>
-<meta name="viewport" content="width=device-width, initial-scale=1.0">
-<style>
-body {
-  font-family: system-ui, -apple-system, BlinkMacSystemFont, "Segoe UI", sans-serif;
-  background: #f6f7fb;
-  margin: 0;
-  padding: 0;
-}
-h1 { margin-top:0; }
-.cards {
-  display:flex;
-  flex-wrap:wrap;
-  gap:12px;
-  margin-bottom:20px;
-}
-page-title {
-  width: 100%;
-  max-width: 520px;
-  padding: 0 24px;
-  margin: 8px auto 18px;
-  text-align: center;
-  font-size: 35px;   /* 크게 */
-  font-weight: 700;
-  color: #222;
-  display: none;     /* 로딩 끝나고 JS에서 보이게 */
-}
-.card {
-  background:white;
-  padding:10px 14px;
-  border-radius:10px;
-  box-shadow:0 2px 8px rgba(0,0,0,0.05);
-  min-width:150px;
-}
-.card-title {
-  font-size:12px;
-  color:#777;
-  margin-bottom:4px;
-}
-.card-value {
-  font-size:18px;
-  font-weight:700;
-}
-.section-title {
-  margin-top:20px;
-  margin-bottom:8px;
-  font-size:15px;
-  font-weight:600;
-}
-table {
-  width:100%;
-  border-collapse: collapse;
-  background:white;
-  border-radius:10px;
-  overflow:hidden;
-  box-shadow:0 2px 8px rgba(0,0,0,0.05);
-  margin-bottom:16px;
-}
-th, td {
-  padding:8px 10px;
-  border-bottom:1px solid #eee;
-  font-size:12px;
-}
-th {
-  background:#fafafa;
-}
-tr:last-child td {
-  border-bottom:none;
-}
-.small {
-  font-size:11px;
-  color:#999;
-}
-</style>
-</head>
-<body>
-
-<h1>냠냠이 관리자 대시보드</h1>
-<p class="small">내부용 통계 페이지입니다. URL과 key는 외부에 공유하지 마세요.</p>
-
-<p class="small">
-  👉 <a href="/admin/restaurants?key={{ admin_key }}">[식당 DB 탭으로 이동]</a>
-</p>
-
-
-<div class="cards">
-  <div class="card">
-    <div class="card-title">전체 가입자 수</div>
-    <div class="card-value">{{ total_users }}</div>
-  </div>
-  <div class="card">
-    <div class="card-title">활성 사용자 수</div>
-    <div class="card-value">{{ active_users }}</div>
-  </div>
-  <div class="card">
-    <div class="card-title">오늘 발송된 추천 수</div>
-    <div class="card-value">{{ today_reco }}</div>
-  </div>
-  <div class="card">
-    <div class="card-title">누적 피드백 수</div>
-    <div class="card-value">{{ feedback_count }}</div>
-  </div>
-</div>
-
-<div class="section-title">카테고리별 평균 평점 TOP5</div>
-<table>
-  <tr>
-    <th>카테고리</th>
-    <th>평균 평점</th>
-    <th>피드백 수</th>
-  </tr>
-  {% for c, avg, cnt in category_stats %}
-  <tr>
-    <td>{{ c }}</td>
-    <td>{{ "%.2f"|format(avg) }}</td>
-    <td>{{ cnt }}</td>
-  </tr>
-  {% endfor %}
-  {% if not category_stats %}
-  <tr><td colspan="3">아직 피드백이 없습니다.</td></tr>
-  {% endif %}
-</table>
-
-<div class="section-title">최근 가입자 10명</div>
-<table>
-  <tr>
-    <th>전화번호</th>
-    <th>위도</th>
-    <th>경도</th>
-    <th>알림시간</th>
-    <th>가입일시</th>
-    <th>활성</th>
-    <th>관리</th>
-  </tr>
-  {% for row in recent_users %}
-  <tr>
-    <td>{{ row[0] }}</td>
-    <td>{{ row[1] }}</td>
-    <td>{{ row[2] }}</td>
-    <td>{{ row[3] }}</td>
-    <td>{{ row[4] if row[4] else "-" }}</td>
-    <td>{{ 'ON' if row[5] else 'OFF' }}</td>
-    <td>
-      <form method="POST" action="/admin/users/update?key={{ admin_key }}" style="margin-bottom:4px; font-size:11px;">
-        <input type="hidden" name="phone_number" value="{{ row[0] }}">
-        <input type="text" name="latitude"  value="{{ row[1] }}" style="width:80px; font-size:11px;" placeholder="위도">
-        <input type="text" name="longitude" value="{{ row[2] }}" style="width:80px; font-size:11px;" placeholder="경도">
-        <input type="text" name="alert_times" value="{{ row[3] or '' }}" placeholder="예: 아침,점심" style="width:120px; font-size:11px;">
-        <label style="font-size:11px;">
-          <input type="checkbox" name="is_active" {% if row[5] %}checked{% endif %}> 활성
-        </label>
-        <button type="submit" style="font-size:11px;">수정</button>
-      </form>
-
-      <form method="POST"
-            action="/admin/users/delete?key={{ admin_key }}"
-            onsubmit="return confirm('정말 이 회원과 관련 데이터를 모두 삭제할까요?');"
-            style="font-size:11px;">
-        <input type="hidden" name="phone_number" value="{{ row[0] }}">
-        <button type="submit" style="font-size:11px; color:#c00;">삭제</button>
-      </form>
-    </td>
-  </tr>
-  {% endfor %}
-  {% if not recent_users %}
-  <tr><td colspan="7">가입자가 없습니다.</td></tr>
-  {% endif %}
-</table>
-
-<div class="section-title">최근 피드백 10개</div>
-<table>
-  <tr>
-    <th>전화번호</th>
-    <th>가게명</th>
-    <th>카테고리</th>
-    <th>평점</th>
-    <th>댓글</th>
-    <th>작성일시</th>
-  </tr>
-  {% for row in recent_feedback %}
-  <tr>
-    <td>{{ row[0] }}</td>
-    <td>{{ row[1] }}</td>
-    <td>{{ row[2] }}</td>
-    <td>{{ row[3] }}</td>
-    <td style="max-width:200px; white-space:normal;">
-      {{ row[4] if row[4] else '-' }}
-    </td>
-    <td>{{ row[5] if row[5] else '-' }}</td>
-  </tr>
-  {% endfor %}
-  {% if not recent_feedback %}
-  <tr><td colspan="6">피드백이 없습니다.</td></tr>
-  {% endif %}
-</table>
-
-
-</body>
-</html>
-"""
-    return render_template_string(
-        html,
+            conn.rollback()
+            try:
+                cur.execute("""
+                    SELECT phone_number, restaurant_name, category, rating
+                    FROM user_feedback
+                    ORDER BY id DESC
+                    LIMIT 10;
+                """)
+                rows = cur.fetchall()
+                recent_feedback = [(r[0], r[1], r[2], r[3], None) for r in rows]
+            except Exception:
+                recent_feedback = []
+
+
+    return render_template(
+        "admin.html",
         total_users=total_users,
         active_users=active_users,
         today_reco=today_reco,
@@ -2094,129 +4584,128 @@ tr:last-child td {
         recent_feedback=recent_feedback,
         admin_key=key,)
 
-@app.route("/admin/restaurants")
-def admin_restaurants():
+@app.route("/admin/restaurants")
+def admin_restaurants():
+    """
+    restaurants 테이블 조회용 관리자 페이지.
+    URL 예시:
+      /admin/restaurants?key=관리자비밀번호
+    """
+    key = request.args.get("key", "")
+    if key != ADMIN_PASSWORD:
+        return "UNAUTHORIZED", 403
+
+    with get_conn() as conn:
+        cur = conn.cursor()
+
+        # 최근 저장된 식당 100개 (id 역순)
+        cur.execute(
+            """
+            SELECT id, name, category, address, lat, lon, rating, num_reviews
+            FROM restaurants
+            ORDER BY id DESC
+            LIMIT 100;
+            """
+        )
+        rows = cur.fetchall()
+
+    return render_template("admin_restaurants.html", rows=rows, admin_key=key)
+
+
+@app.route("/admin/db-pool")
+def admin_db_pool():
+    """
+    DB 커넥션 풀 상태 확인용.
+      /admin/db-pool?key=관리자비밀번호
+    (워커 프로세스별 값이라, gunicorn 워커가 여러 개면 요청 받은 워커 기준)
+    """
+    key = request.args.get("key", "")
+    if key != ADMIN_PASSWORD:
+        return "UNAUTHORIZED", 403
+
+    stats = db_pool.stats()
+    stats["pid"] = os.getpid()
+    return jsonify(stats)
+
+
+@app.route("/admin/cache-stats")
+def admin_cache_stats():
     """
-    restaurants 테이블 조회용 관리자 페이지.
-    URL 예시:
-      /admin/restaurants?key=관리자비밀번호
+    외부 API 결과 캐시 상태 확인용 (워커 프로세스 기준).
+      /admin/cache-stats?key=관리자비밀번호
     """
     key = request.args.get("key", "")
     if key != ADMIN_PASSWORD:
         return "UNAUTHORIZED", 403
 
-    conn = get_conn()
-    cur = conn.cursor()
+    return jsonify({
+        "pid": os.getpid(),
+        "kakao_match": kakao_match_cache.stats(),
+        "google_places": google_places_cache.stats(),
+        "aligo_token": aligo_token_manager.stats(),
+        "restaurant_index": restaurant_index.stats(),
+    })
+
 
-    # 최근 저장된 식당 100개 (id 역순)
-    cur.execute(
-        """
-        SELECT id, name, category, address, lat, lon, rating, num_reviews
-        FROM restaurants
-        ORDER BY id DESC
-        LIMIT 100;
-        """
+metrics.register(Gauge(
+    "nyam_db_pool_connections",
+    "DB 커넥션 풀 연결 수 (in_use / idle)",
+    lambda: {("in_use",): db_pool.stats()["in_use"], ("idle",): db_pool.stats()["idle"]},
+    ("state",),
+))
+metrics.register(Gauge(
+    "nyam_event_backlog",
+    "이벤트 write-behind 버퍼에 쌓인 이벤트 수",
+    lambda: event_pipeline.stats()["backlog"],
+))
+metrics.register(Gauge(
+    "nyam_event_dropped_total",
+    "버퍼가 꽉 차거나 저장 실패로 버린 이벤트 수 (프로세스 시작 이후 누적)",
+    lambda: event_pipeline.stats().get("dropped", 0),
+    kind="counter",
+))
+
+
+@app.route("/metrics")
+def metrics_endpoint():
+    """Prometheus 스크랩용 (METRICS_KEY 를 설정했으면 ?key= 필요)"""
+    if METRICS_KEY and request.args.get("key", "") != METRICS_KEY:
+        return "UNAUTHORIZED", 403
+    return app.response_class(
+        metrics.render(),
+        mimetype="text/plain",
+        headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"},
     )
-    rows = cur.fetchall()
-    conn.close()
-
-    html = """
-<!DOCTYPE html>
-<html>
-<head>
-<meta charset="utf-8">
-<title>냠냠이 – 식당 DB</title>
-<meta name="viewport" content="width=device-width, initial-scale=1.0">
-<style>
-body {
-  font-family: system-ui, -apple-system, BlinkMacSystemFont, "Segoe UI", sans-serif;
-  background: #f6f7fb;
-  margin: 0;
-  padding: 16px;
-}
-h1 {
-  margin-top: 0;
-}
-.small {
-  font-size: 12px;
-  color: #777;
-  margin-bottom: 10px;
-}
-a {
-  color: #3366cc;
-  text-decoration: none;
-}
-a:hover {
-  text-decoration: underline;
-}
-table {
-  width: 100%;
-  border-collapse: collapse;
-  background: white;
-  border-radius: 8px;
-  overflow: hidden;
-  box-shadow: 0 2px 8px rgba(0,0,0,0.05);
-}
-th, td {
-  padding: 6px 8px;
-  border-bottom: 1px solid #eee;
-  font-size: 12px;
-}
-th {
-  background: #fafafa;
-  text-align: left;
-}
-tr:last-child td {
-  border-bottom: none;
-}
-td.numeric {
-  text-align: right;
-}
-</style>
-</head>
-<body>
-
-<h1>식당 DB (restaurants)</h1>
-<p class="small">
-  최근 저장된 식당 100개만 보여줍니다.<br>
-  🔙 <a href="/admin?key={{ admin_key }}">[요약 대시보드로 돌아가기]</a>
-</p>
-
-<table>
-  <tr>
-    <th>ID</th>
-    <th>이름</th>
-    <th>카테고리</th>
-    <th>주소</th>
-    <th>위도</th>
-    <th>경도</th>
-    <th>평점</th>
-    <th>리뷰수</th>
-  </tr>
-  {% if not rows %}
-  <tr>
-    <td colspan="8">아직 저장된 식당 데이터가 없습니다.</td>
-  </tr>
-  {% else %}
-    {% for r in rows %}
-    <tr>
-      <td class="numeric">{{ r[0] }}</td> <!-- id -->
-      <td>{{ r[1] }}</td>                <!-- name -->
-      <td>{{ r[2] or '-' }}</td>         <!-- category -->
-      <td>{{ r[3] or '-' }}</td>         <!-- address -->
-      <td class="numeric">{{ r[4] if r[4] is not none else '-' }}</td> <!-- lat -->
-      <td class="numeric">{{ r[5] if r[5] is not none else '-' }}</td> <!-- lon -->
-      <td class="numeric">{{ "%.1f"|format(r[6]) if r[6] is not none else '-' }}</td> <!-- rating -->
-      <td class="numeric">{{ r[7] }}</td> <!-- num_reviews -->
-    </tr>
-    {% endfor %}
-  {% endif %}
-</table>
-
-</body>
-</html>
-"""
-    return render_template_string(html, rows=rows, admin_key=key)
+
+
+@app.route("/admin/http-clients")
+def admin_http_clients():
+    """
+    외부 API 세션별 요청 수 / 오류 수 / 연결 재사용 현황 (워커 프로세스 기준).
+      /admin/http-clients?key=관리자비밀번호
+    """
+    key = request.args.get("key", "")
+    if key != ADMIN_PASSWORD:
+        return "UNAUTHORIZED", 403
+
+    data = {name: c.stats() for name, c in http_clients.items()}
+    data["pid"] = os.getpid()
+    return jsonify(data)
+
+
+@app.route("/admin/events")
+def admin_events():
+    """
+    이벤트 write-behind 버퍼 상태 (쌓인 개수 / 버린 개수 / flush 시간).
+      /admin/events?key=관리자비밀번호
+    """
+    key = request.args.get("key", "")
+    if key != ADMIN_PASSWORD:
+        return "UNAUTHORIZED", 403
+
+    stats = event_pipeline.stats()
+    stats["pid"] = os.getpid()
+    return jsonify(stats)
 
 
 @app.route("/admin/users/update", methods=["POST"])
@@ -2240,23 +4729,22 @@ def admin_update_user():
     except ValueError:
         return "위도/경도는 숫자만 입력해주세요.", 400
 
-    conn = get_conn()
-    cur = conn.cursor()
+    with get_conn() as conn:
+        cur = conn.cursor()
 
-    cur.execute(
-        """
-        UPDATE users
-        SET latitude = %s,
-            longitude = %s,
-            alert_times = %s,
-            is_active = %s
-        WHERE phone_number = %s;
-        """,
-        (lat, lon, alert_times, is_active, phone),
-    )
+        cur.execute(
+            """
+            UPDATE users
+            SET latitude = %s,
+                longitude = %s,
+                alert_times = %s,
+                is_active = %s
+            WHERE phone_number = %s;
+            """,
+            (lat, lon, alert_times, is_active, phone),
+        )
 
-    conn.commit()
-    conn.close()
+        conn.commit()
 
     return redirect(f"/admin?key={key}")
 
@@ -2272,15 +4760,16 @@ def admin_delete_user():
     if not phone:
         return "phone_number is required", 400
 
-    conn = get_conn()
-    cur = conn.cursor()
+    with get_conn() as conn:
+        cur = conn.cursor()
 
-    cur.execute("DELETE FROM user_feedback WHERE phone_number = %s;", (phone,))
-    cur.execute("DELETE FROM recommendation_logs WHERE phone_number = %s;", (phone,))
-    cur.execute("DELETE FROM users WHERE phone_number = %s;", (phone,))
+        cur.execute("DELETE FROM user_feedback WHERE phone_number = %s;", (phone,))
+        cur.execute("DELETE FROM user_category_profile WHERE phone_number = %s;", (phone,))
+        cur.execute("DELETE FROM user_restaurant_profile WHERE phone_number = %s;", (phone,))
+        cur.execute("DELETE FROM recommendation_logs WHERE phone_number = %s;", (phone,))
+        cur.execute("DELETE FROM users WHERE phone_number = %s;", (phone,))
 
-    conn.commit()
-    conn.close()
+        conn.commit()
 
     return redirect(f"/admin?key={key}")
 
@@ -2305,25 +4794,24 @@ def api_save_user():
     else:
         preferences_categories_str = preferences_categories or ""
 
-    conn = get_conn()
-    cur = conn.cursor()
+    with get_conn() as conn:
+        cur = conn.cursor()
 
-    cur.execute(
-        """
-        INSERT INTO users (phone_number, preferred_distance_km, preferred_price_range, preferences_categories)
-        VALUES (%s, %s, %s, %s)
-        ON CONFLICT (phone_number)
-        DO UPDATE SET
-            preferred_distance_km = EXCLUDED.preferred_distance_km,
-            preferred_price_range = EXCLUDED.preferred_price_range,
-            preferences_categories = EXCLUDED.preferences_categories;
-        """,
-        (phone, preferred_distance_km, preferred_price_range, preferences_categories_str),
-    )
+        cur.execute(
+            """
+            INSERT INTO users (phone_number, preferred_distance_km, preferred_price_range, preferences_categories)
+            VALUES (%s, %s, %s, %s)
+            ON CONFLICT (phone_number)
+            DO UPDATE SET
+                preferred_distance_km = EXCLUDED.preferred_distance_km,
+                preferred_price_range = EXCLUDED.preferred_price_range,
+                preferences_categories = EXCLUDED.preferences_categories;
+            """,
+            (phone, preferred_distance_km, preferred_price_range, preferences_categories_str),
+        )
 
-    conn.commit()
-    cur.close()
-    conn.close()
+        conn.commit()
+        cur.close()
 
     return jsonify({"result": "ok"})
 
@@ -2410,7 +4898,7 @@ def register():
     except Exception as e:
         if conn:
             conn.rollback()
-        print("[REGISTER_ERROR]", e)
+        log_event("REGISTER_ERROR", logging.ERROR, error=e)
         return jsonify({"success": False, "message": "서버 오류가 발생했습니다."}), 500
 
     finally:
@@ -2424,10 +4912,10 @@ def register():
         try:
             ok, res = send_welcome_message(phone)
             if not ok:
-                print("[WELCOME_ERROR]", res)
+                log_event("WELCOME_ERROR", logging.WARNING, result=res)
         except Exception as e:
             # 웰컴 실패해도 회원가입 자체는 성공으로 처리
-            print("[WELCOME_EXCEPTION]", e)
+            log_event("WELCOME_EXCEPTION", logging.WARNING, error=e)
 
     # 프론트에서 data.success를 보고 있으므로 이 형식 유지
     return jsonify({"success": True})
@@ -2471,34 +4959,18 @@ def api_quick_feedback():
     # 좋아요면 5점, 싫어요면 1점
     rating = 5 if like_flag else 1
 
-    conn = get_conn()
-    cur = conn.cursor()
-
-    try:
-        # user_feedback 테이블에 저장
-        cur.execute(
-            """
-            INSERT INTO user_feedback (phone_number, restaurant_name, category, rating, source, time_of_day, restaurant_id)
-            VALUES (%s, %s, %s, %s, %s, %s, %s)
-            """,
-            (
-                phone,
-                name,
-                category,
-                rating,
-                'quick',
-                time_of_day,
-                restaurant_id,
-            ),
-        )
-        conn.commit()
-    except Exception as e:
-        conn.rollback()
-        print("[QUICK_FEEDBACK_ERROR]", e)
-        return jsonify({"error": "DB 저장 중 오류 발생"}), 500
-    finally:
-        cur.close()
-        conn.close()
+    # user_feedback 저장 + 취향 프로필 갱신은 이벤트 파이프라인에서 일괄 처리
+    if not emit_feedback(
+        phone,
+        name,
+        category,
+        rating,
+        'quick',
+        time_of_day,
+        _to_int_or_none(restaurant_id),
+    ):
+        log_event("QUICK_FEEDBACK_DROPPED", logging.WARNING, phone_hash=phone_hash(phone), name=name)
+        return jsonify({"error": "잠시 후 다시 시도해 주세요."}), 503
 
     return jsonify({"result": "ok"})
 
@@ -2549,7 +5021,7 @@ def feedback_form():
         rows = cur.fetchall()
         cur.close()
     except Exception as e:
-        print("[FEEDBACK_FORM_QUERY_ERROR]", e)
+        log_event("FEEDBACK_FORM_QUERY_ERROR", logging.ERROR, error=e)
         if conn:
             conn.close()
         return "서버 오류로 데이터를 불러오지 못했습니다.", 500
@@ -2558,188 +5030,12 @@ def feedback_form():
         conn.close()
 
     # rows: [(name, category, last_time), ...]
-    item_blocks = ""
-    if not rows:
-        item_blocks = """
-        <div class="empty">
-          아직 좋아요를 누른 맛집이 없습니다.<br>
-          오늘의 추천에서 마음에 드는 가게에 👍를 눌러 주세요!
-        </div>
-        """
-    else:
-        for name, category, last_time in rows:
-            cat_text = category or "기타"
-            item_blocks += f"""
-            <form method="POST" action="/submit-feedback" class="store-card">
-              <input type="hidden" name="phone_number" value="{phone}">
-              <input type="hidden" name="restaurant_name" value="{name}">
-              <input type="hidden" name="category" value="{cat_text}">
-              <input type="hidden" name="time_of_day" value="{time_of_day}">
-
-              <div class="store-header">
-                <div class="store-name">{name}</div>
-                <div class="store-cat">{cat_text}</div>
-              </div>
-
-              <div class="field">
-                <div class="label">만족도 (1 ~ 5점)</div>
-                <div class="rating-stars">
-                  <label>
-                    <input type="radio" name="rating" value="5" checked>
-                    <span>★★★★★ (5점)</span>
-                  </label>
-                  <label>
-                    <input type="radio" name="rating" value="4">
-                    <span>★★★★☆ (4점)</span>
-                  </label>
-                  <label>
-                    <input type="radio" name="rating" value="3">
-                    <span>★★★☆☆ (3점)</span>
-                  </label>
-                  <label>
-                    <input type="radio" name="rating" value="2">
-                    <span>★★☆☆☆ (2점)</span>
-                  </label>
-                  <label>
-                    <input type="radio" name="rating" value="1">
-                    <span>★☆☆☆☆ (1점)</span>
-                  </label>
-                </div>
-              </div>
-
-              <div class="field">
-                <div class="label">한 줄 후기 (선택)</div>
-                <textarea name="comment"
-                  placeholder="예) 양 많고 분위기 좋아요. 데이트 코스로 추천!"></textarea>
-              </div>
-
-              <button type="submit" class="btn">이 가게 평가하기</button>
-            </form>
-            """
-
-    html = f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-      <meta charset="utf-8">
-      <title>오늘의 맛집 피드백</title>
-      <meta name="viewport" content="width=device-width, initial-scale=1.0">
-      <style>
-        body {{
-          font-family: "Noto Sans KR", sans-serif;
-          background: #f5f5f5;
-          margin: 0;
-          padding: 0;
-          display: flex;
-          justify-content: center;
-          align-items: flex-start;
-          min-height: 100vh;
-        }}
-        .wrap {{
-          background: white;
-          width: 95%;
-          max-width: 480px;
-          padding: 20px 18px 24px;
-          margin: 24px 0;
-          border-radius: 18px;
-          box-shadow: 0 12px 30px rgba(0,0,0,0.08);
-        }}
-        h2 {{
-          font-size: 18px;
-          margin: 0 0 6px;
-        }}
-        .desc {{
-          font-size: 13px;
-          color: #666;
-          margin-bottom: 12px;
-        }}
-        .empty {{
-          font-size: 14px;
-          color: #777;
-          text-align: center;
-          padding: 24px 8px;
-        }}
-        .store-card {{
-          border-radius: 14px;
-          border: 1px solid #eee;
-          padding: 14px 12px 16px;
-          margin-top: 12px;
-          background: #fafafa;
-        }}
-        .store-header {{
-          display: flex;
-          justify-content: space-between;
-          align-items: baseline;
-          margin-bottom: 8px;
-        }}
-        .store-name {{
-          font-size: 15px;
-          font-weight: 600;
-        }}
-        .store-cat {{
-          font-size: 12px;
-          color: #999;
-        }}
-        .field {{
-          margin-top: 8px;
-        }}
-        .label {{
-          font-size: 12px;
-          margin-bottom: 4px;
-          color: #444;
-        }}
-        textarea {{
-          width: 100%;
-          min-height: 60px;
-          font-size: 13px;
-          padding: 6px;
-          border-radius: 8px;
-          border: 1px solid #ddd;
-          resize: vertical;
-          box-sizing: border-box;
-        }}
-        .btn {{
-          margin-top: 10px;
-          width: 100%;
-          padding: 9px 0;
-          border-radius: 999px;
-          border: none;
-          background: #ff6b81;
-          color: white;
-          font-size: 14px;
-          cursor: pointer;
-        }}
-        .rating-stars {{
-          display: flex;
-          flex-direction: column;
-          gap: 4px;
-          font-size: 13px;
-          align-items: flex-start;
-        }}
-        .rating-stars label {{
-          display: flex;
-          align-items: center;
-          gap: 4px;
-          cursor: pointer;
-        }}
-        .rating-stars input[type="radio"] {{
-          accent-color: #ffb400;
-        }}
-      </style>
-    </head>
-    <body>
-      <div class="wrap">
-        <h2>좋아요 누르신 맛집들, 어떠셨나요?</h2>
-        <div class="desc">
-          별점과 짧은 한 줄 후기를 남겨주시면<br>
-          다음 추천에 더 정확하게 반영해드릴게요 :)
-        </div>
-        {item_blocks}
-      </div>
-    </body>
-    </html>
-    """
-    return render_template_string(html)
+    return render_template(
+        "feedback_form.html",
+        rows=rows,
+        phone=phone,
+        time_of_day=time_of_day,
+    )
 
 @app.route("/submit-feedback", methods=["POST"])
 def submit_feedback():
@@ -2771,54 +5067,25 @@ def submit_feedback():
         conn = get_conn()
         cur = conn.cursor()
 
-        try:
-            # comment 컬럼이 있다고 가정하고 시도
-            cur.execute(
-                """
-                INSERT INTO user_feedback
-                (phone_number, restaurant_name, category, rating, comment, source, time_of_day, restaurant_id)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s);
-                """,
-                (
-                    phone,
-                    restaurant,
-                    category,
-                    rating,
-                    comment,
-                    'form',
-                    time_of_day,
-                    restaurant_id,
-                ),
-            )
-        except UndefinedColumn:
-            # comment 컬럼이 없을 경우 컬럼 추가 후 다시 시도
-            conn.rollback()
-            cur.execute(
-                """
-                ALTER TABLE user_feedback
-                ADD COLUMN IF NOT EXISTS comment TEXT;
-                """
-            )
-            conn.commit()
-
-            cur = conn.cursor()
-            cur.execute(
-                """
-                INSERT INTO user_feedback
-                (phone_number, restaurant_name, category, rating, comment, source, time_of_day, restaurant_id)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s);
-                """,
-                (
-                    phone,
-                    restaurant,
-                    category,
-                    rating,
-                    comment,
-                    'form',
-                    time_of_day,
-                    restaurant_id,
-                ),
-            )
+        # comment 컬럼은 baseline 마이그레이션(v1)에서 보장
+        cur.execute(
+            """
+            INSERT INTO user_feedback
+            (phone_number, restaurant_name, category, rating, comment, source, time_of_day, restaurant_id)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s);
+            """,
+            (
+                phone,
+                restaurant,
+                category,
+                rating,
+                comment,
+                'form',
+                time_of_day,
+                restaurant_id,
+            ),
+        )
+        record_feedback_in_profile(cur, phone, restaurant, category, time_of_day, rating)
 
         conn.commit()
         cur.close()
@@ -2837,7 +5104,7 @@ def submit_feedback():
         """
 
     except Exception as e:
-        print("[SUBMIT_FEEDBACK_ERROR]", e)
+        log_event("SUBMIT_FEEDBACK_ERROR", logging.ERROR, error=e)
         if conn:
             conn.rollback()
         return (
@@ -2848,27 +5115,24 @@ def submit_feedback():
         if conn:
             conn.close()
 
-@app.route("/cron/send-reco", methods=["GET"])
-def cron_send_reco():
-    """
-    외부 크론에서:
-      GET /cron/send-reco?time=아침
-      GET /cron/send-reco?time=점심
-    이런 식으로 호출.
+# =========================
+# 크론 발송 (백그라운드 잡)
+# =========================
 
-    - users.alert_times 에 해당 time 문자열(아침/점심/저녁/야식)이 포함된
-      활성 사용자에게 맛집 추천 알림톡 발송
-    """
-    time_label = (request.args.get("time") or "").strip()
-    if not time_label:
-        return jsonify({
-            "result": "error",
-            "message": "time 쿼리 파라미터 필요 (예: 아침,점심,저녁,야식)"
-        }), 400
+CRON_JOB_WORKERS = int(os.getenv("CRON_JOB_WORKERS", "2"))
+CRON_JOB_STALE_MIN = int(os.getenv("CRON_JOB_STALE_MIN", "30"))   # 이 시간 동안 진행이 없으면 죽은 잡으로 간주
 
-    conn = get_conn()
-    cur = conn.cursor()
-    try:
+# 크론 발송은 웹 요청 스레드가 아니라 여기서 돈다
+cron_job_executor = ThreadPoolExecutor(
+    max_workers=CRON_JOB_WORKERS,
+    thread_name_prefix="cron-job",
+)
+
+
+def get_reco_alert_phones(time_label):
+    """users.alert_times 에 time_label 이 포함된(또는 비어있는) 활성 사용자 번호"""
+    with get_conn() as conn:
+        cur = conn.cursor()
         cur.execute(
             """
             SELECT phone_number
@@ -2883,27 +5147,240 @@ def cron_send_reco():
             (f"%{time_label}%",),
         )
         phones = [row[0] for row in cur.fetchall()]
-    finally:
         cur.close()
-        conn.close()
+    return phones
 
-    sent = []
-    failed = []
 
-    for p in phones:
-        ok, res = send_reco_message(p, time_label)
-        if ok:
-            sent.append(p)
-        else:
-            failed.append({"phone": p, "res": res})
+def get_feedback_alert_phones(time_label):
+    """오늘 time_label 에 추천 나간 가게 중 1곳 이상 좋아요(5점) 누른 사용자 번호"""
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            SELECT DISTINCT rl.phone_number
+            FROM recommendation_logs rl
+            JOIN user_feedback uf
+              ON uf.phone_number = rl.phone_number
+             AND uf.restaurant_name = rl.restaurant_name
+            WHERE rl.time_of_day = %s
+              AND rl.created_at::date = CURRENT_DATE
+              AND uf.rating >= 5
+              AND uf.created_at::date = CURRENT_DATE
+            """,
+            (time_label,),
+        )
+        phones = [row[0] for row in cur.fetchall()]
+        cur.close()
+    return phones
+
+
+# kind → (대상자 조회 함수, 다건 발송 함수)
+CRON_SEND_KINDS = {
+    "reco": (get_reco_alert_phones, send_reco_messages),
+    "feedback": (get_feedback_alert_phones, send_feedback_messages),
+}
+
+CRON_JOB_COLUMNS = (
+    "id", "kind", "time_label", "status",
+    "target_count", "processed_count", "sent_count", "failed_count",
+    "failed_sample", "error",
+    "created_at", "started_at", "finished_at", "updated_at",
+)
+
+
+def create_cron_job(kind, time_label):
+    """
+    cron_jobs 에 대기(queued) 잡을 만든다.
+    같은 kind/time 으로 이미 대기·실행 중인 잡이 있으면 그 잡을 그대로 돌려줌
+    (GitHub Actions 재시도 등으로 같은 발송이 두 번 도는 것 방지)
+
+    - 중복 판단은 부분 유니크 인덱스(idx_cron_jobs_active_kind_time) + ON CONFLICT 로
+      → 동시에 두 요청이 들어와도 하나만 INSERT 됨
+    - CRON_JOB_STALE_MIN 동안 진행이 없던 잡은 먼저 stale 로 바꿔서 새 잡이 들어갈 수 있게 함
+
+    반환: (job_id, 새로 만들었는지)
+    """
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            UPDATE cron_jobs
+            SET status = 'stale', finished_at = NOW(), updated_at = NOW()
+            WHERE kind = %s
+              AND time_label = %s
+              AND status IN ('queued', 'running')
+              AND updated_at <= NOW() - make_interval(mins => %s);
+            """,
+            (kind, time_label, CRON_JOB_STALE_MIN),
+        )
+
+        # INSERT 가 충돌했는데 SELECT 전에 그 잡이 끝나버린 경우 한 번 더 시도
+        for _ in range(2):
+            job_id = uuid.uuid4().hex
+            cur.execute(
+                """
+                INSERT INTO cron_jobs (id, kind, time_label, status)
+                VALUES (%s, %s, %s, 'queued')
+                ON CONFLICT DO NOTHING
+                RETURNING id;
+                """,
+                (job_id, kind, time_label),
+            )
+            if cur.fetchone():
+                conn.commit()
+                cur.close()
+                return job_id, True
+
+            cur.execute(
+                """
+                SELECT id
+                FROM cron_jobs
+                WHERE kind = %s
+                  AND time_label = %s
+                  AND status IN ('queued', 'running')
+                LIMIT 1;
+                """,
+                (kind, time_label),
+            )
+            row = cur.fetchone()
+            if row:
+                conn.commit()
+                cur.close()
+                return row[0], False
+
+        conn.commit()
+        cur.close()
+    raise RuntimeError(f"cron job 생성 실패 (kind={kind}, time={time_label})")
+
+
+def update_cron_job(job_id, **fields):
+    """잡 상태 갱신 (진행 상황 기록 실패가 발송 자체를 멈추진 않음)"""
+    if not fields:
+        return
+    assignments = sql.SQL(", ").join(
+        sql.SQL("{} = %s").format(sql.Identifier(k)) for k in fields
+    )
+    query = sql.SQL("UPDATE cron_jobs SET {}, updated_at = NOW() WHERE id = %s;").format(assignments)
+    values = [Json(v) if k == "failed_sample" else v for k, v in fields.items()]
+    try:
+        with get_conn() as conn:
+            cur = conn.cursor()
+            cur.execute(query, values + [job_id])
+            conn.commit()
+            cur.close()
+    except Exception as e:
+        log_event("CRON_JOB_UPDATE_ERR", logging.ERROR, job_id=job_id, error=e)
+
+
+def get_cron_job(job_id):
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            sql.SQL("SELECT {} FROM cron_jobs WHERE id = %s;").format(
+                sql.SQL(", ").join(sql.Identifier(c) for c in CRON_JOB_COLUMNS)
+            ),
+            (job_id,),
+        )
+        row = cur.fetchone()
+        cur.close()
+    if not row:
+        return None
+    return dict(zip(CRON_JOB_COLUMNS, row))
+
+
+def run_cron_send_job(job_id, kind, time_label):
+    """
+    실제 발송 잡. ALIGO_BATCH_MAX 명 단위로 보내면서 진행 상황을 cron_jobs 에 기록.
+    """
+    get_phones, send_batch = CRON_SEND_KINDS[kind]
+    update_cron_job(job_id, status="running", started_at=datetime.now(timezone.utc))
+
+    try:
+        phones = list(dict.fromkeys(get_phones(time_label)))
+        update_cron_job(job_id, target_count=len(phones))
+
+        processed = 0
+        sent_count = 0
+        failed = []
+
+        for start in range(0, len(phones), ALIGO_BATCH_MAX):
+            chunk = phones[start:start + ALIGO_BATCH_MAX]
+            results = send_batch(chunk, time_label)
+
+            for p in chunk:
+                ok, res = results.get(p, (False, {"msg": "NOT_SENT"}))
+                if ok:
+                    sent_count += 1
+                else:
+                    failed.append({"phone": p, "res": res})
+
+            processed += len(chunk)
+            log_event(
+                "CRON_JOB_PROGRESS",
+                job_id=job_id, kind=kind, time_of_day=time_label,
+                processed=processed, total=len(phones), sent=sent_count, failed=len(failed),
+            )
+            update_cron_job(
+                job_id,
+                processed_count=processed,
+                sent_count=sent_count,
+                failed_count=len(failed),
+                failed_sample=failed[:50],  # 최대 50개까지만
+            )
+
+        update_cron_job(job_id, status="done", finished_at=datetime.now(timezone.utc))
+    except Exception as e:
+        log_event("CRON_JOB_ERROR", logging.ERROR, exc_info=True, job_id=job_id, kind=kind, error=e)
+        update_cron_job(
+            job_id,
+            status="failed",
+            error=str(e)[:500],
+            finished_at=datetime.now(timezone.utc),
+        )
+
+
+def enqueue_cron_send(kind):
+    """/cron/send-* 공통: 잡 등록 후 바로 202 응답"""
+    time_label = (request.args.get("time") or "").strip()
+    if not time_label:
+        return jsonify({
+            "result": "error",
+            "message": "time 쿼리 파라미터 필요 (예: 아침,점심,저녁,야식)"
+        }), 400
+
+    try:
+        job_id, created = create_cron_job(kind, time_label)
+    except Exception as e:
+        log_event("CRON_JOB_CREATE_ERR", logging.ERROR, kind=kind, error=e)
+        return jsonify({"result": "error", "message": "잡 등록 실패"}), 500
+
+    if created:
+        cron_job_executor.submit(run_cron_send_job, job_id, kind, time_label)
 
     return jsonify({
-        "result": "ok",
+        "result": "accepted" if created else "already_running",
+        "kind": kind,
         "time": time_label,
-        "sent_count": len(sent),
-        "failed_count": len(failed),
-        "failed": failed,
-    })
+        "job_id": job_id,
+        "status_url": f"/cron/jobs/{job_id}",
+    }), 202
+
+
+@app.route("/cron/send-reco", methods=["GET"])
+def cron_send_reco():
+    """
+    외부 크론에서:
+      GET /cron/send-reco?time=아침
+      GET /cron/send-reco?time=점심
+    이런 식으로 호출.
+
+    - users.alert_times 에 해당 time 문자열(아침/점심/저녁/야식)이 포함된
+      활성 사용자에게 맛집 추천 알림톡 발송
+    - 발송은 백그라운드 잡으로 돌고, 바로 202 + job_id 응답
+      (진행 상황은 /cron/jobs/<job_id>)
+    """
+    return enqueue_cron_send("reco")
+
 
 @app.route("/cron/send-feedback", methods=["GET"])
 def cron_send_feedback():
@@ -2914,60 +5391,63 @@ def cron_send_feedback():
     - 오늘 해당 time에 추천 나간 사람 중
     - 최소 1곳 이상 '좋아요(5점)' 남긴 사용자에게
       피드백 알림톡 발송
+    - 발송은 백그라운드 잡으로 돌고, 바로 202 + job_id 응답
     """
-    time_label = (request.args.get("time") or "").strip()
-    if not time_label:
-        return jsonify({
-            "result": "error",
-            "message": "time 쿼리 파라미터 필요 (예: 아침,점심,저녁,야식)"
-        }), 400
-
-    conn = get_conn()
-    cur = conn.cursor()
-    try:
-        cur.execute(
-            """
-            SELECT DISTINCT rl.phone_number
-            FROM recommendation_logs rl
-            JOIN user_feedback uf
-              ON uf.phone_number = rl.phone_number
-             AND uf.restaurant_name = rl.restaurant_name
-            WHERE rl.time_of_day = %s
-              AND rl.created_at::date = CURRENT_DATE
-              AND uf.rating >= 5
-              AND uf.created_at::date = CURRENT_DATE
-            """,
-            (time_label,),
-        )
-        phones = [row[0] for row in cur.fetchall()]
-    finally:
-        cur.close()
-        conn.close()
-
-    sent = []
-    failed = []
-
-    for p in phones:
-        ok, res = send_feedback_message(p, time_label)
+    return enqueue_cron_send("feedback")
 
-        # 상세 응답은 서버 로그에만 남김
-        print("[CRON_FEEDBACK]", "phone=", p, "ok=", ok, "res=", res)
 
-        if ok:
-            sent.append(p)
-        else:
-            failed.append(p)  # ← 번호만 저장 (가볍게)
-
-    # 실패 번호도 너무 많으면 잘라서 리턴 (안전빵)
-    failed_sample = failed[:50]
+@app.route("/cron/jobs/<job_id>", methods=["GET"])
+def cron_job_status(job_id):
+    """크론 발송 잡 진행 상황 (대상 수, 처리 수, 성공/실패 수, 소요 시간)"""
+    try:
+        job = get_cron_job(job_id)
+    except Exception as e:
+        log_event("CRON_JOB_STATUS_ERR", logging.ERROR, job_id=job_id, error=e)
+        return jsonify({"result": "error", "message": "잡 조회 실패"}), 500
+
+    if not job:
+        return jsonify({"result": "error", "message": "없는 job_id"}), 404
+
+    started_at = job["started_at"]
+    finished_at = job["finished_at"]
+    duration_sec = None
+    if started_at:
+        end = finished_at or datetime.now(timezone.utc)
+        duration_sec = round((end - started_at).total_seconds(), 2)
+
+    status = job["status"]
+    updated_at = job["updated_at"]
+    if (
+        status in ("queued", "running")
+        and updated_at
+        and datetime.now(timezone.utc) - updated_at > timedelta(minutes=CRON_JOB_STALE_MIN)
+    ):
+        # 워커 재시작 등으로 중간에 끊긴 잡
+        status = "stale"
+
+    target = job["target_count"]
+    progress = None
+    if target:
+        progress = round(job["processed_count"] / target, 3)
+    elif status == "done":
+        progress = 1.0
 
     return jsonify({
-        "result": "ok",
-        "time": time_label,
-        "target_count": len(phones),
-        "sent_count": len(sent),
-        "failed_count": len(failed),
-        "failed_sample": failed_sample,  # 최대 50개까지만
+        "job_id": job["id"],
+        "kind": job["kind"],
+        "time": job["time_label"],
+        "status": status,
+        "target_count": target,
+        "processed_count": job["processed_count"],
+        "sent_count": job["sent_count"],
+        "failed_count": job["failed_count"],
+        "failed_sample": job["failed_sample"] or [],
+        "progress": progress,
+        "error": job["error"],
+        "created_at": job["created_at"].isoformat() if job["created_at"] else None,
+        "started_at": started_at.isoformat() if started_at else None,
+        "finished_at": finished_at.isoformat() if finished_at else None,
+        "duration_sec": duration_sec,
     })
 
 
@@ -2999,42 +5479,384 @@ def test_alimtalk():
     return jsonify({"ok": ok, "aligo_response": res})
 
 # =========================
-# 위치 기반 추천 API (Google Places + Kakao)
+# 로컬 추천 모드 (restaurants 공간 인덱스)
 # =========================
-def upsert_restaurant_and_get_id(cur, name, category, address, lat, lon, rating, num_reviews):
+# 한 번이라도 보여준 가게는 restaurants 에 좌표/평점/카드 정보가 남아 있으므로,
+# 주변에 "최근에 본 가게"가 충분하면 Google/Kakao 호출 없이 메모리에서 바로 추천한다.
+# 모자라거나 오래된 지역만 기존 라이브 경로로 가서 테이블(=인덱스)을 채운다.
+
+RECO_LOCAL_MODE = os.getenv("RECO_LOCAL_MODE", "auto")                      # auto | off
+LOCAL_RECO_MIN_PLACES = int(os.getenv("LOCAL_RECO_MIN_PLACES", "8"))        # 반경 안에 이만큼 있어야 로컬로 처리
+LOCAL_RECO_MAX_AGE_HOURS = float(os.getenv("LOCAL_RECO_MAX_AGE_HOURS", "24"))  # 이보다 오래 전에 본 가게는 제외
+LOCAL_RECO_MAX_CANDIDATES = int(os.getenv("LOCAL_RECO_MAX_CANDIDATES", "200"))  # 가까운 순으로 최대 후보 수
+LOCAL_INDEX_CELL_DEG = float(os.getenv("LOCAL_INDEX_CELL_DEG", "0.01"))     # 격자 한 칸 (위도 기준 약 1.1km)
+LOCAL_INDEX_REFRESH_SEC = int(os.getenv("LOCAL_INDEX_REFRESH_SEC", "300"))  # DB 에서 전체 다시 읽는 주기
+
+
+class RestaurantSpatialIndex:
     """
-    restaurants 테이블에 (name + address) 기준 upsert 하고,
-    해당 row의 id를 리턴한다.
+    restaurants 테이블을 위경도 격자(grid bucket)로 나눠 메모리에 올려두는 인덱스.
+
+    - 키: (floor(lat / cell), floor(lon / cell)) → 그 칸에 있는 restaurant id 집합
+    - query(lat, lon, radius_m): 반경을 덮는 칸들만 골라서 NumPy 로 한 번에 거리 계산
+      (칸마다 id/위도/경도/본 시각 배열을 만들어 두고, 그 칸이 바뀔 때만 다시 만든다)
+    - add(records): 이 워커에서 upsert 한 가게는 바로 반영
+    - 다른 워커가 넣은 가게는 LOCAL_INDEX_REFRESH_SEC 마다 백그라운드 재로딩으로 반영
     """
-    if not name:
-        return None
 
-    addr_val = address or ""
+    def __init__(self, cell_deg=0.01, refresh_sec=300):
+        self.cell_deg = cell_deg
+        self.refresh_sec = refresh_sec
+        self._lock = threading.Lock()
+        self._records = {}               # id -> dict
+        self._cells = defaultdict(set)   # (i, j) -> {id, ...}
+        self._columns = {}               # (i, j) -> (ids, lats, lons, last_seen_ts, 영업 구간) 배열 캐시
+        self._loaded_at = None           # time.monotonic()
+        self._loading = False
+        self._stats = defaultdict(int)
+
+    def _cell(self, lat, lon):
+        return (math.floor(lat / self.cell_deg), math.floor(lon / self.cell_deg))
+
+    def _put(self, rec):
+        old = self._records.get(rec["id"])
+        if old is not None:
+            old_key = self._cell(old["lat"], old["lon"])
+            self._cells[old_key].discard(rec["id"])
+            self._columns.pop(old_key, None)
+        key = self._cell(rec["lat"], rec["lon"])
+        self._records[rec["id"]] = rec
+        self._cells[key].add(rec["id"])
+        self._columns.pop(key, None)
+
+    def _cell_columns(self, key):
+        cols = self._columns.get(key)
+        if cols is None:
+            recs = [self._records[rid] for rid in self._cells.get(key, ())]
+            cols = (
+                np.array([r["id"] for r in recs], dtype=np.int64),
+                np.array([r["lat"] for r in recs], dtype=float),
+                np.array([r["lon"] for r in recs], dtype=float),
+                np.array(
+                    [r["last_seen_ts"] if r.get("last_seen_ts") is not None else -np.inf for r in recs],
+                    dtype=float,
+                ),
+                flatten_opening_hours([r.get("opening_hours") for r in recs]),
+            )
+            self._columns[key] = cols
+        return cols
 
-    cur.execute(
+    # ── 로딩 ────────────────────────────────────────────────
+
+    def load(self):
+        """DB 의 restaurants 전체를 읽어서 인덱스를 새로 만든 뒤 교체"""
+        started = time.monotonic()
+        with get_conn() as conn:
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+            cur.execute(
+                """
+                SELECT id, name, category, address, lat, lon, rating, num_reviews,
+                       kakao_place_id, image_url, open_info, menu, summary, opening_hours,
+                       EXTRACT(EPOCH FROM NOW() - last_seen_at)::float8 AS seen_age_sec
+                FROM restaurants
+                WHERE lat IS NOT NULL AND lon IS NOT NULL
+                  AND kakao_place_id IS NOT NULL;
+                """
+            )
+            rows = cur.fetchall()
+            cur.close()
+
+        # DB 시각 대신 "몇 초 전에 봤는지"로 받아서 이 서버 시계 기준으로 환산
+        now = time.time()
+        fresh = RestaurantSpatialIndex(self.cell_deg, self.refresh_sec)
+        for row in rows:
+            rec = dict(row)
+            age = rec.pop("seen_age_sec")
+            rec["last_seen_ts"] = now - age if age is not None else None
+            fresh._put(rec)
+
+        with self._lock:
+            self._records = fresh._records
+            self._cells = fresh._cells
+            self._columns = {}
+            self._loaded_at = time.monotonic()
+            self._stats["loads"] += 1
+            self._stats["load_ms_last"] = int((time.monotonic() - started) * 1000)
+        return len(rows)
+
+    def _load_in_background(self):
+        try:
+            self.load()
+        except Exception as e:
+            log_event("LOCAL_INDEX_LOAD_ERR", logging.WARNING, error=e)
+        finally:
+            with self._lock:
+                self._loading = False
+
+    def ensure_fresh(self):
         """
-        INSERT INTO restaurants (name, category, address, lat, lon, rating, num_reviews)
-        VALUES (%s, %s, %s, %s, %s, %s, %s)
-        ON CONFLICT (name, address)
-        DO UPDATE SET
-            category    = EXCLUDED.category,
-            address     = EXCLUDED.address,
-            lat         = EXCLUDED.lat,
-            lon         = EXCLUDED.lon,
-            rating      = EXCLUDED.rating,
-            num_reviews = EXCLUDED.num_reviews
-        RETURNING id;
-        """,
-        (name, category, addr_val, lat, lon, rating, num_reviews),
-    )
-    row = cur.fetchone()
-    return row[0] if row else None
+        처음이거나 refresh_sec 이 지났으면 백그라운드로 재로딩 시작.
+        요청은 기다리지 않는다. 리턴값: 지금 인덱스를 쓸 수 있는지 여부.
+        """
+        with self._lock:
+            ready = self._loaded_at is not None
+            expired = not ready or time.monotonic() - self._loaded_at > self.refresh_sec
+            if expired and not self._loading:
+                self._loading = True
+                reco_context_executor.submit(self._load_in_background)
+        return ready
+
+    def add(self, records):
+        with self._lock:
+            for rec in records:
+                if rec.get("id") is None or rec.get("lat") is None or rec.get("lon") is None:
+                    continue
+                if not rec.get("kakao_place_id"):
+                    continue
+                self._put(rec)
+
+    # ── 조회 ────────────────────────────────────────────────
+
+    def query(self, lat, lon, radius_m, seen_after=None, open_at=None):
+        """
+        (lat, lon) 반경 radius_m 안의 가게를 가까운 순으로 [(record, distance_km), ...].
+        seen_after(unix time) 가 있으면 그 이후에 본 가게만.
+        open_at(주간 분) 이 있으면 그 시각에 영업 안 하는 게 확실한 가게는 제외.
+        """
+        radius_km = radius_m / 1000.0
+        dlat, dlon = bbox_deltas(lat, radius_km)
+        i0, j0 = self._cell(lat - dlat, lon - dlon)
+        i1, j1 = self._cell(lat + dlat, lon + dlon)
+
+        with self._lock:
+            parts = [
+                self._cell_columns((i, j))
+                for i in range(i0, i1 + 1)
+                for j in range(j0, j1 + 1)
+                if self._cells.get((i, j))
+            ]
+            records = self._records
+
+            if not parts:
+                return []
+            ids, lats, lons, seen = (np.concatenate(col) for col in list(zip(*parts))[:4])
+
+            keep = np.ones(len(ids), dtype=bool)
+            if seen_after is not None:
+                keep &= seen >= seen_after
+            if open_at is not None:
+                # 칸별 owner 인덱스를 이어 붙인 배열 기준으로 밀어서 합침
+                offsets = np.cumsum([0] + [len(part[0]) for part in parts[:-1]])
+                owner = np.concatenate([part[4][0] + off for part, off in zip(parts, offsets)])
+                starts = np.concatenate([part[4][1] for part in parts])
+                ends = np.concatenate([part[4][2] for part in parts])
+                known = np.concatenate([part[4][3] for part in parts])
+                keep &= open_mask(len(ids), owner, starts, ends, known, open_at)
+            ids, lats, lons = ids[keep], lats[keep], lons[keep]
+
+            idx, dist = points_within_radius(lat, lon, lats, lons, radius_km)
+            order = np.argsort(dist, kind="stable")
+            return [(records[rid], d) for rid, d in zip(ids[idx[order]].tolist(), dist[order].tolist())]
+
+    def count_hit(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+    def stats(self):
+        with self._lock:
+            data = dict(self._stats)
+            data["restaurants"] = len(self._records)
+            data["cells"] = sum(1 for ids in self._cells.values() if ids)
+            data["loaded_age_sec"] = (
+                round(time.monotonic() - self._loaded_at, 1) if self._loaded_at is not None else None
+            )
+        return data
+
+
+restaurant_index = RestaurantSpatialIndex(
+    cell_deg=LOCAL_INDEX_CELL_DEG,
+    refresh_sec=LOCAL_INDEX_REFRESH_SEC,
+)
+
+
+def local_reco_candidates(lat, lon, radius_m=1500):
+    """
+    로컬 인덱스만으로 추천 후보를 만들 수 있으면 (candidates, score_rows),
+    커버리지가 부족하면(가게 수 부족 / 오래됨 / 인덱스 로딩 전) None.
+    """
+    if RECO_LOCAL_MODE == "off":
+        return None
+    if not restaurant_index.ensure_fresh():
+        restaurant_index.count_hit("skipped_not_loaded")
+        return None
+
+    seen_after = time.time() - LOCAL_RECO_MAX_AGE_HOURS * 3600
+    # 라이브 경로와 같이 "1시간 뒤에도 영업 안 하는" 가게는 제외 (KST 기준)
+    open_at = week_minute(datetime.utcnow() + timedelta(hours=9)) + 60
+    hits = restaurant_index.query(lat, lon, radius_m, seen_after=seen_after, open_at=open_at)
+    if len(hits) < LOCAL_RECO_MIN_PLACES:
+        restaurant_index.count_hit("fallback_thin")
+        return None
+
+    restaurant_index.count_hit("local_hits")
+    candidates = []
+    score_rows = []
+    for rec, dist in hits[:LOCAL_RECO_MAX_CANDIDATES]:
+        distance_km = round(dist, 1)
+        name = rec["name"]
+        category = rec.get("category") or ""
+        rating = rec.get("rating")
+        image_url = rec.get("image_url")
+        score_rows.append((name, category, rating, rec.get("num_reviews") or 0, distance_km))
+        candidates.append(
+            {
+                "name": name,
+                "category": category,
+                "rating": rating,
+                "menu": rec.get("menu") or build_menu_text(name, category),
+                "summary": rec.get("summary") or build_summary_text(name, category, rating, distance_km),
+                "place_id": rec.get("kakao_place_id"),
+                "image_url": image_url,
+                "distance_km": distance_km,
+                "keywords": [],
+                "images": [image_url] if image_url else [],
+                "address": rec.get("address") or "",
+                "open_info": rec.get("open_info") or "",
+                "score": 0.0,
+                "restaurant_id": rec["id"],
+                "reason": "",
+                "is_preferred": False,
+                "is_ad": False,
+                "is_sponsored": False,
+            }
+        )
+    return candidates, score_rows
+
+
+# =========================
+# 위치 기반 추천 API (Google Places + Kakao)
+# =========================
+def upsert_restaurants_and_get_ids(cur, rows):
+    """
+    restaurants 테이블에 (name + address) 기준으로 여러 가게를 한 번에 upsert 하고,
+    rows 순서에 맞춘 id 리스트를 리턴한다. (last_seen_at 은 NOW() 로 갱신)
+
+    rows: [(name, category, address, lat, lon, rating, num_reviews,
+            kakao_place_id, image_url, open_info, menu, summary, opening_hours), ...]
+    - 이름 없는 행은 id = None
+    - 같은 (name, address) 가 여러 번 있으면 마지막 값으로 한 번만 upsert
+      (한 INSERT 안에서 같은 행을 두 번 UPDATE 할 수 없어서)
+    """
+    unique = {}
+    for row in rows:
+        name, address = row[0], row[2]
+        if not name:
+            continue
+        addr_val = address or ""
+        hours = row[12]
+        unique[(name, addr_val)] = (
+            (name, row[1], addr_val) + tuple(row[3:12])
+            + (Json(hours) if hours is not None else None,)
+        )
+
+    ids_by_key = {}
+    if unique:
+        returned = execute_values(
+            cur,
+            """
+            INSERT INTO restaurants
+                (name, category, address, lat, lon, rating, num_reviews,
+                 kakao_place_id, image_url, open_info, menu, summary, opening_hours)
+            VALUES %s
+            ON CONFLICT (name, address)
+            DO UPDATE SET
+                category       = EXCLUDED.category,
+                address        = EXCLUDED.address,
+                lat            = EXCLUDED.lat,
+                lon            = EXCLUDED.lon,
+                rating         = EXCLUDED.rating,
+                num_reviews    = EXCLUDED.num_reviews,
+                kakao_place_id = EXCLUDED.kakao_place_id,
+                image_url      = EXCLUDED.image_url,
+                open_info      = EXCLUDED.open_info,
+                menu           = EXCLUDED.menu,
+                summary        = EXCLUDED.summary,
+                opening_hours  = EXCLUDED.opening_hours,
+                last_seen_at   = NOW()
+            RETURNING id, name, address;
+            """,
+            list(unique.values()),
+            fetch=True,
+        )
+        ids_by_key = {(name, address): rid for rid, name, address in returned}
+
+    return [
+        ids_by_key.get((row[0], row[2] or "")) if row[0] else None
+        for row in rows
+    ]
+
+
+KAKAO_ENRICH_WORKERS = int(os.getenv("KAKAO_ENRICH_WORKERS", "8"))
+RECO_CONTEXT_WORKERS = int(os.getenv("RECO_CONTEXT_WORKERS", "4"))
+
+# 사용자 정보 로딩을 Google 호출과 동시에 돌리기 위한 스레드 풀
+reco_context_executor = ThreadPoolExecutor(
+    max_workers=RECO_CONTEXT_WORKERS,
+    thread_name_prefix="reco-context",
+)
+
+# 워커 프로세스 하나에서 공유하는 카카오 조회용 스레드 풀
+# (요청이 몰려도 카카오로 나가는 동시 호출 수는 이 값으로 묶인다)
+kakao_enrich_executor = ThreadPoolExecutor(
+    max_workers=KAKAO_ENRICH_WORKERS,
+    thread_name_prefix="kakao-enrich",
+)
+
+
+def enrich_place_with_kakao(p, cached_match=None):
+    """
+    Google 후보 1곳에 대해 카카오 매칭 + 상세 정보 조회를 한 번에 수행.
+    반환: (name_ko, kakao_place_id, kakao_addr, kakao_basic)
+
+    - cached_match 가 있으면(매칭 캐시 히트, miss 포함) 매칭 API 는 건너뜀
+    - 카카오에 없는 곳이면 place_id = None
+    - 1시간 뒤에도 영업 안 하는 곳(open_in_1h False)은 어차피 후보에서 빠지므로
+      상세 정보 조회는 생략 (매칭은 place_id 중복 제거 때문에 그대로 수행)
+    """
+    if cached_match is not None:
+        name_ko, kakao_place_id, kakao_addr = cached_match
+    else:
+        try:
+            with reco_stage("kakao_match"):
+                name_ko, kakao_place_id, kakao_addr, ok = _match_kakao_place(
+                    p.get("name"), p.get("lat"), p.get("lon")
+                )
+        except Exception as e:
+            log_event("KAKAO_MATCH_IN_RECO_ERR", logging.WARNING, error=e)
+            return None, None, None, None
+
+        # API 오류 없이 끝난 결과만 캐시 (못 찾은 것도 miss 로 저장)
+        if ok:
+            kakao_match_cache.put(p, name_ko, kakao_place_id, kakao_addr)
+
+    if not kakao_place_id or p.get("open_in_1h") is False:
+        return name_ko, kakao_place_id, kakao_addr, None
+
+    try:
+        with reco_stage("kakao_basic_info"):
+            kakao_basic = get_kakao_basic_info(kakao_place_id)
+    except Exception as e:
+        kakao_basic = None
+        log_event("KAKAO_BASIC_INFO_IN_RECO_ERR", logging.WARNING, error=e)
+
+    return name_ko, kakao_place_id, kakao_addr, kakao_basic
 
 
 @app.route("/api/reco", methods=["POST"])
 def api_reco():
     """
     위치 기반 맛집 추천 (Google Places + 카카오맵 매칭 버전)
+    ※ 주변에 최근 본 가게가 충분하면 restaurants 로컬 인덱스만으로 바로 추천 (RECO_LOCAL_MODE)
 
     주요 기능:
     1) Google Places로 주변 음식점 후보 수집
@@ -3044,7 +5866,7 @@ def api_reco():
     5) 최종 상위 10개 중 3곳 랜덤 노출
     6) restaurants 테이블에 upsert + recommendation_logs에 restaurant_id 저장
     7) 현재 영업 중이 아니고, 1시간 뒤에도 영업 중이 아닌 가게는 제외
-    8) 디버그용 로그로, 어떤 후보들이 수집/필터/최종 선정됐는지 확인
+    8) 요청당 요약 로그 1줄 (후보/선정 목록 덤프는 DEBUG 레벨이거나 샘플링된 요청만)
     """
     data = request.get_json() or {}
     phone = data.get("phone") or ""
@@ -3060,109 +5882,50 @@ def api_reco():
     except (TypeError, ValueError):
         return jsonify({"error": "위치 정보가 잘못되었습니다."}), 400
 
-    # 기본 요청 정보 로그
-    print(
-        f"[API_RECO_REQUEST] phone={phone}, time={time_of_day}, "
-        f"lat={lat}, lon={lon}"
-    )
+    # 기본 요청 정보 로그 (이후 이 요청의 로그에는 phone_hash / time_of_day 가 같이 붙음)
+    started = time.perf_counter()
+    bind_log_fields(phone=phone, time_of_day=time_of_day)
+    log_event("API_RECO_REQUEST", logging.DEBUG, lat=lat, lon=lon)
 
     # 2) DB에서 유저 선호/최근 추천 이력 가져오기
-    user_categories = []
-    category_prefs = {}
-    restaurant_prefs = {}
-    recent_ids_2d = set()
-    recent_names_2d = set()
-
-    conn = None
-    cur = None
+    #    (쿼리 1번짜리 로더를 백그라운드로 먼저 띄워서 Google 호출과 시간을 겹침)
+    context_future = None
     if phone:
-        try:
-            conn = get_conn()
-            cur = conn.cursor()
-
-            # 선호 카테고리 (회원 가입 시 선택한 것)
-            try:
-                cur.execute(
-                    "SELECT preferences_categories FROM users WHERE phone_number = %s;",
-                    (phone,),
-                )
-                row = cur.fetchone()
-                if row and row[0]:
-                    user_categories = [
-                        c.strip() for c in str(row[0]).split(",") if c.strip()
-                    ]
-            except Exception as e:
-                print("[API_RECO_USER_PREF_CATS_ERR]", e)
-                conn.rollback()
-
-            # 피드백 기반 (시간대별) 카테고리별 평균 점수
-            try:
-                category_prefs = get_user_prefs_by_time(phone, time_of_day, cur)
-            except Exception as e:
-                print("[API_RECO_CATEGORY_PREF_ERR]", e)
-                conn.rollback()
-                category_prefs = {}
-
-            # 피드백 기반 개별 가게별 평균 점수
-            try:
-                restaurant_prefs = get_user_restaurant_prefs(phone, cur)
-            except Exception as e:
-                print("[API_RECO_RESTAURANT_PREF_ERR]", e)
-                conn.rollback()
-                restaurant_prefs = {}
-
-            # 최근 2일간 이미 추천한 가게 목록 (restaurant_id 우선)
-            try:
-                cur.execute(
-                    """
-                    SELECT restaurant_name, restaurant_id
-                    FROM recommendation_logs
-                    WHERE phone_number = %s
-                      AND created_at >= NOW() - INTERVAL '2 days';
-                    """,
-                    (phone,),
-                )
-                recent_rows = cur.fetchall()
-                for name, rid in recent_rows:
-                    if rid is not None:
-                        recent_ids_2d.add(rid)
-                    if name:
-                        recent_names_2d.add(name)
-            except Exception as e:
-                print("[API_RECO_RECENT_ERR]", e)
-                conn.rollback()
-                recent_ids_2d = set()
-                recent_names_2d = set()
+        context_future = submit_in_context(
+            reco_context_executor, timed_stage, "user_context", load_user_context, phone, time_of_day
+        )
 
-        except Exception as e:
-            print("[API_RECO_DB_ERR]", e)
-            conn = None
-            cur = None
+    # 2-1) 주변에 최근 본 가게가 충분하면 Google/Kakao 없이 로컬 인덱스로 추천
+    with reco_stage("local_index"):
+        local = local_reco_candidates(lat, lon, radius_m=1500)
+    reco_path_total.inc(path="local" if local is not None else "live")
+    if local is not None:
+        candidates, score_rows = local
+        ctx = _await_user_context(context_future)
+        picked = pick_recommendations(candidates, score_rows, ctx, phone, time_of_day)
+        _log_reco_done("local", started, candidates, picked)
+        return jsonify(picked)
 
     # 3) Google Places에서 주변 음식점 검색
-    places = search_google_places(lat, lon, radius_m=1500, max_results=20)
+    with reco_stage("google_fetch"):
+        places = search_google_places(lat, lon, radius_m=1500, max_results=20)
 
-    # 🔍 Google 원본 결과 로그
-    print(f"[API_RECO_GOOGLE_RAW] count={len(places)}")
-    for p in places:
-        try:
-            print(
-                "  -",
-                p.get("name"),
-                "/",
-                p.get("shortFormattedAddress") or p.get("address"),
-                "/ rating=",
-                p.get("rating"),
-                "/ dist_km=",
-                p.get("distance_km"),
-            )
-        except Exception:
-            # 로그에서 에러 나도 추천 로직은 계속 진행
-            pass
+    ctx = _await_user_context(context_future)
+
+    # 🔍 Google 원본 결과 로그 (DEBUG 이거나 샘플링된 요청만)
+    if log_dump_enabled():
+        log_event("API_RECO_GOOGLE_RAW", count=len(places), places=[
+            {
+                "name": p.get("name"),
+                "address": p.get("shortFormattedAddress") or p.get("address"),
+                "rating": p.get("rating"),
+                "dist_km": p.get("distance_km"),
+            }
+            for p in places
+        ])
 
     if not places:
-        if conn:
-            conn.close()
+        _log_reco_done("live", started, [], [])
         return jsonify([])
 
     # 3-1) 동일한 가게(이름 + 주소 기준) 1차 중복 제거
@@ -3176,19 +5939,28 @@ def api_reco():
         unique_places.append(p)
 
     # 4) 카카오맵에 실제로 등록된 곳만 매칭 + 동일 place_id 재중복 제거
+    #    (카카오 조회는 워커 풀에서 동시에 돌리고, 결과는 원래 순서대로 소비)
     candidates = []
+    restaurant_rows = []
+    score_rows = []
     seen_kakao_ids = set()
 
-    for p in unique_places:
+    located_places = [
+        p for p in unique_places
+        if p.get("lat") is not None and p.get("lon") is not None
+    ]
+    cached_matches = kakao_match_cache.get_many(located_places)
+    futures = [
+        submit_in_context(kakao_enrich_executor, enrich_place_with_kakao, p, cached)
+        for p, cached in zip(located_places, cached_matches)
+    ]
+
+    for p, fut in zip(located_places, futures):
         plat = p.get("lat")
         plon = p.get("lon")
-        if plat is None or plon is None:
-            continue
 
         raw_name = p.get("name")
-        name_ko, kakao_place_id, kakao_addr = match_kakao_place_by_location(
-            raw_name, plat, plon
-        )
+        name_ko, kakao_place_id, kakao_addr, kakao_basic = fut.result()
         if not kakao_place_id:
             continue
 
@@ -3201,12 +5973,6 @@ def api_reco():
         kakao_open_info = ""
         is_open_now = None
 
-        try:
-            kakao_basic = get_kakao_basic_info(kakao_place_id)
-        except Exception as e:
-            kakao_basic = None
-            print("[KAKAO_BASIC_INFO_IN_RECO_ERR]", e)
-
         if kakao_basic:
             if kakao_basic.get("address"):
                 kakao_addr = kakao_basic.get("address")
@@ -3288,93 +6054,16 @@ def api_reco():
         else:
             menu = build_menu_text(name, category)
 
-        # 선호 여부/설명 태그
-        is_preferred = False
-        reasons = []
-
-        base_rating = rating if rating is not None else 3.0
-        base_dist = float(distance_km or 0.0)
-
-        # 리뷰 수에 따른 신뢰도 가중치
-        review_count = user_rating_count or 0
-        if review_count >= 50:
-            review_factor = 1.2
-        elif review_count >= 20:
-            review_factor = 1.1
-        elif review_count >= 5:
-            review_factor = 1.0
-        else:
-            review_factor = 0.9
-
-        score = base_rating * 10 * review_factor - base_dist
+        # 점수 계산은 후보를 다 모은 뒤 score_candidates 로 한 번에
+        score_rows.append((name, category, rating, user_rating_count, distance_km))
 
-        # 회원가입 시 선택한 선호 카테고리
-        if user_categories and category:
-            for uc in user_categories:
-                if uc and uc in category:
-                    score += 5
-                    is_preferred = True
-                    reasons.append("회원가입에서 선택한 선호 카테고리와 일치해요.")
-                    break
-
-        # 시간대별 카테고리 선호도
-        if category_prefs and category in category_prefs:
-            avg_cat = category_prefs[category]
-            if avg_cat >= 4.5:
-                score *= 1.3
-                is_preferred = True
-                reasons.append("이 시간대에 자주 높게 평가한 음식 종류예요.")
-            elif avg_cat >= 4.0:
-                score *= 1.15
-                reasons.append("이 시간대에 만족도가 높은 카테고리예요.")
-            elif avg_cat >= 3.0:
-                pass
-            elif avg_cat >= 2.0:
-                score *= 0.7
-                reasons.append("예전에 살짝 아쉬웠던 카테고리지만, 근처라 후보에 포함했어요.")
-            else:
-                score *= 0.4
-                reasons.append("평균 만족도가 낮았던 카테고리라 점수를 낮췄어요.")
-
-        # 개별 가게 선호도
-        if restaurant_prefs and name in restaurant_prefs:
-            avg_rest = restaurant_prefs[name]
-            if avg_rest >= 4.0:
-                score *= 1.3
-                is_preferred = True
-                reasons.append("이전에 이 가게에 높은 점수를 주신 적이 있어요.")
-            elif avg_rest <= 2.5:
-                score *= 0.2
-                reasons.append("예전에 별로라고 평가하신 가게라 점수를 크게 낮췄어요.")
-
-        reason_text = " ".join(dict.fromkeys(reasons)) if reasons else ""
-
-        keywords = build_keywords(
-            category,
-            rating,
-            distance_km,
-            preferred=is_preferred,
-            review_text=summary,
+        # restaurants upsert 는 후보를 다 모은 뒤 한 번에 (id 는 그때 채움)
+        restaurant_rows.append(
+            (name, category, address, plat, plon, rating, user_rating_count,
+             kakao_place_id, photo_url, open_info, menu, summary,
+             p.get("opening_hours"))
         )
 
-        # restaurants 테이블 upsert + id 획득
-        restaurant_id = None
-        if conn and cur:
-            try:
-                restaurant_id = upsert_restaurant_and_get_id(
-                    cur,
-                    name=name,
-                    category=category,
-                    address=address,
-                    lat=plat,
-                    lon=plon,
-                    rating=rating,
-                    num_reviews=user_rating_count,
-                )
-            except Exception as e:
-                print("[UPSERT_RESTAURANT_ERROR]", e)
-                conn.rollback()
-
         candidates.append(
             {
                 "name": name,
@@ -3385,14 +6074,14 @@ def api_reco():
                 "place_id": kakao_place_id,
                 "image_url": photo_url,
                 "distance_km": distance_km,
-                "keywords": keywords,
+                "keywords": [],
                 "images": photo_urls,
                 "address": address,
                 "open_info": open_info,
-                "score": score,
-                "restaurant_id": restaurant_id,
-                "reason": reason_text,
-                "is_preferred": is_preferred,
+                "score": 0.0,
+                "restaurant_id": None,
+                "reason": "",
+                "is_preferred": False,
                 "is_ad": False,
                 "is_sponsored": False,
             }
@@ -3402,29 +6091,117 @@ def api_reco():
         if len(candidates) >= 12:
             break
 
-    # 🔍 후보 리스트 요약 로그
-    print(f"[API_RECO_CANDIDATES] count={len(candidates)}")
-    for c in candidates:
+    # 상한에 도달해서 더 안 쓰는 조회는 아직 시작 전이면 취소
+    for fut in futures:
+        fut.cancel()
+
+    # 새로 매칭한 결과는 요청 경로 밖에서 DB 캐시에 반영
+    kakao_enrich_executor.submit(kakao_match_cache.flush)
+
+    # 5) restaurants 테이블 일괄 upsert + id 획득 (요청당 커밋 1번)
+    #    로컬 추천 모드가 쓸 수 있도록 전화번호 없는 요청도 저장
+    if candidates:
         try:
-            print(
-                "  -",
-                c["name"],
-                "/",
-                c.get("address"),
-                "/ rating=",
-                c.get("rating"),
-                "/ dist_km=",
-                c.get("distance_km"),
-                "/ rid=",
-                c.get("restaurant_id"),
+            with reco_stage("db_write"), get_conn() as conn:
+                cur = conn.cursor()
+                restaurant_ids = upsert_restaurants_and_get_ids(cur, restaurant_rows)
+                conn.commit()
+                cur.close()
+            for c, rid in zip(candidates, restaurant_ids):
+                c["restaurant_id"] = rid
+            now_ts = time.time()
+            restaurant_index.add(
+                {
+                    "id": rid,
+                    "name": row[0],
+                    "category": row[1],
+                    "address": row[2] or "",
+                    "lat": row[3],
+                    "lon": row[4],
+                    "rating": row[5],
+                    "num_reviews": row[6],
+                    "kakao_place_id": row[7],
+                    "image_url": row[8],
+                    "open_info": row[9],
+                    "menu": row[10],
+                    "summary": row[11],
+                    "opening_hours": row[12],
+                    "last_seen_ts": now_ts,
+                }
+                for rid, row in zip(restaurant_ids, restaurant_rows)
             )
-        except Exception:
-            pass
+        except Exception as e:
+            log_event("UPSERT_RESTAURANT_ERROR", logging.ERROR, error=e)
+
+    picked = pick_recommendations(candidates, score_rows, ctx, phone, time_of_day)
+    _log_reco_done("live", started, candidates, picked)
+    return jsonify(picked)
+
+
+def _log_reco_done(path, started, candidates, picked):
+    """api_reco 요청당 INFO 한 줄 요약"""
+    log_event(
+        "API_RECO_DONE",
+        path=path,
+        candidates=len(candidates),
+        picked=len(picked),
+        duration_ms=round((time.perf_counter() - started) * 1000, 1),
+    )
+
+
+def _await_user_context(context_future):
+    """load_user_context 백그라운드 결과 (실패/전화번호 없음이면 빈 UserContext)"""
+    if context_future is None:
+        return UserContext()
+    try:
+        return context_future.result()
+    except Exception as e:
+        log_event("API_RECO_DB_ERR", logging.ERROR, error=e)
+        return UserContext()
+
+
+def _reco_log_item(c):
+    return {
+        "name": c["name"],
+        "address": c.get("address"),
+        "rating": c.get("rating"),
+        "dist_km": c.get("distance_km"),
+        "rid": c.get("restaurant_id"),
+    }
+
+
+def pick_recommendations(candidates, score_rows, ctx, phone, time_of_day):
+    """
+    후보 점수 계산 → 최근 2일 추천 제외 → 상위 10개 중 랜덤 3개 → 추천 로그.
+    라이브(Google/Kakao) 경로와 로컬 인덱스 경로가 같이 쓴다.
+    """
+    recent_ids_2d = ctx.recent_ids_2d
+    recent_names_2d = ctx.recent_names_2d
+
+    # 점수 + 추천 이유 (후보 전체 한 번에)
+    if candidates:
+        with reco_stage("scoring"):
+            scores, reason_flags = score_candidates(build_candidate_features(score_rows), ctx)
+        for c, score, flags in zip(candidates, scores.tolist(), reason_flags.tolist()):
+            c["score"] = score
+            c["reason"], c["is_preferred"] = reasons_from_flags(flags)
+            c["keywords"] = build_keywords(
+                c["category"],
+                c["rating"],
+                c["distance_km"],
+                preferred=c["is_preferred"],
+                review_text=c["summary"],
+            )
+
+    # 🔍 후보 리스트 로그 (DEBUG 이거나 샘플링된 요청만)
+    dump = log_dump_enabled()
+    if dump:
+        log_event("API_RECO_CANDIDATES", count=len(candidates), candidates=[
+            _reco_log_item(c) for c in candidates
+        ])
 
     if not candidates:
-        if conn:
-            conn.close()
-        return jsonify([])
+        return []
 
     # 6) 최근 2일 내에 이미 추천한 가게 최대한 제외 (restaurant_id 우선)
     filtered_candidates = []
@@ -3471,52 +6248,19 @@ def api_reco():
         c.pop("score", None)
 
     # 🔍 최종 풀/선정 결과 로그
-    print(
-        f"[API_RECO_POOL] total={len(pool)}, "
-        f"top10={len(top_pool)}, picked3={len(picked)}"
-    )
-    for c in picked:
-        try:
-            print(
-                "  [PICKED]",
-                c["name"],
-                "/",
-                c.get("address"),
-                "/ rating=",
-                c.get("rating"),
-                "/ dist_km=",
-                c.get("distance_km"),
-                "/ rid=",
-                c.get("restaurant_id"),
-            )
-        except Exception:
-            pass
-
-    # 8) 추천 로그 기록 (restaurant_id 포함)
-    if phone and conn and cur:
-        try:
-            for c in picked:
-                try:
-                    cur.execute(
-                        """
-                        INSERT INTO recommendation_logs
-                            (phone_number, restaurant_name, time_of_day, restaurant_id)
-                        VALUES (%s, %s, %s, %s);
-                        """,
-                        (phone, c["name"], time_of_day, c.get("restaurant_id")),
-                    )
-                except Exception as e:
-                    print("[API_RECO_LOG_ONE_ERR]", e)
-                    conn.rollback()
-            conn.commit()
-        except Exception as e:
-            print("[API_RECO_LOG_ERR]", e)
-            conn.rollback()
+    if dump:
+        log_event(
+            "API_RECO_POOL",
+            total=len(pool),
+            top10=len(top_pool),
+            picked=[_reco_log_item(c) for c in picked],
+        )
 
-    if conn:
-        conn.close()
+    # 8) 추천 로그 기록 (restaurant_id 포함) – write-behind
+    if phone:
+        emit_recommendation_logs(phone, time_of_day, picked)
 
-    return jsonify(picked)
+    return picked
 
 
 
@@ -3528,19 +6272,20 @@ def api_reco():
 
 @app.route("/debug/restaurants")
 def debug_restaurants():
-    conn = get_conn()
-    cur = conn.cursor(cursor_factory=RealDictCursor)
-    cur.execute("SELECT * FROM restaurants LIMIT 50;")
-    rows = cur.fetchall()
-    cur.close()
-    conn.close()
+    with get_conn() as conn:
+        cur = conn.cursor(cursor_factory=RealDictCursor)
+        cur.execute("SELECT * FROM restaurants LIMIT 50;")
+        rows = cur.fetchall()
+        cur.close()
     return jsonify(rows)
 
 
 @app.route("/init-db")
 def init_db_route():
-    init_db()
-    return "DB initialized!"
+    applied = init_db()
+    if applied:
+        return f"DB initialized! (applied migrations: {', '.join(map(str, applied))})"
+    return "DB initialized! (already up to date)"
 
 
 @app.route("/go")
@@ -3554,35 +6299,9 @@ def go_kakao_map():
     time_of_day = request.args.get("time", "").strip()
     restaurant_id = request.args.get("rid")
 
-    # 클릭 로그 저장 (실패하더라도 이동 자체는 계속 진행)
+    # 클릭 로그는 버퍼에만 넣고 바로 이동 (DB 저장은 백그라운드 flush)
     if phone and (restaurant_id or name):
-        conn = None
-        cur = None
-        try:
-            conn = get_conn()
-            cur = conn.cursor()
-            cur.execute(
-                """
-                INSERT INTO click_logs (phone_number, restaurant_id, restaurant_name, time_of_day)
-                VALUES (%s, %s, %s, %s);
-                """,
-                (
-                    phone,
-                    restaurant_id,
-                    name,
-                    time_of_day or None,
-                ),
-            )
-            conn.commit()
-        except Exception as e:
-            print("[CLICK_LOG_ERROR]", e)
-            if conn:
-                conn.rollback()
-        finally:
-            if cur:
-                cur.close()
-            if conn:
-                conn.close()
+        emit_click_log(phone, _to_int_or_none(restaurant_id), name, time_of_day or None)
 
     # 1) place_id 있을 때 → 카카오맵 공식 장소 상세 URL
     if place_id:
@@ -3617,6 +6336,15 @@ def debug_aligo():
     }
 
 
+# 시작할 때 미리 압축해 둘 수 있는 응답 준비
+try:
+    precompress_static_files()
+    with app.app_context():
+        _render_signup_page()
+except Exception as e:
+    log_event("PRECOMPRESS_ERR", logging.WARNING, error=e)
+
+
 if __name__ == "__main__":
     init_db()
     app.run(host="0.0.0.0", port=5000, debug=True)
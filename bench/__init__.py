@@ -0,0 +1 @@
+"""로컬 벤치마크 도구 (가짜 외부 API 서버, DB 시드, 러너, 결과 비교). 사용법은 bench/run_bench.py 참고."""
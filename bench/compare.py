@@ -0,0 +1,85 @@
+"""
+벤치 결과 JSON 두 개 비교.
+
+    python -m bench.compare bench/results/new.json bench/baseline.json --tolerance 0.10
+
+시나리오 × 동시성별로 p50/p95/p99 와 처리량의 변화율을 표로 출력하고,
+p95 가 tolerance 이상 느려졌거나 처리량이 tolerance 이상 줄었으면 회귀로 표시 (종료 코드 1).
+"""
+
+import argparse
+import json
+import sys
+
+METRICS = ("p50_ms", "p95_ms", "p99_ms", "throughput_rps")
+
+
+def _pct(new, old):
+    if not old:
+        return None
+    return (new - old) / old
+
+
+def compare_results(current, baseline, tolerance=0.10):
+    """반환: [{"scenario", "concurrency", "metric", "current", "baseline", "change", "regression"}, ...]"""
+    rows = []
+    for scenario, levels in current.get("results", {}).items():
+        base_levels = baseline.get("results", {}).get(scenario, {})
+        for concurrency, stats in levels.items():
+            base = base_levels.get(concurrency)
+            if not base:
+                continue
+            for metric in METRICS:
+                new_v = stats.get(metric)
+                old_v = base.get(metric)
+                if new_v is None or old_v is None:
+                    continue
+                change = _pct(new_v, old_v)
+                if metric == "throughput_rps":
+                    regression = change is not None and change < -tolerance
+                else:
+                    regression = metric == "p95_ms" and change is not None and change > tolerance
+                rows.append({
+                    "scenario": scenario,
+                    "concurrency": concurrency,
+                    "metric": metric,
+                    "current": new_v,
+                    "baseline": old_v,
+                    "change": change,
+                    "regression": regression,
+                })
+    return rows
+
+
+def format_table(rows):
+    lines = [f"{'scenario':<16} {'conc':>4} {'metric':<15} {'baseline':>10} {'current':>10} {'change':>8}"]
+    for r in rows:
+        change = "n/a" if r["change"] is None else f"{r['change'] * 100:+.1f}%"
+        flag = "  << REGRESSION" if r["regression"] else ""
+        lines.append(
+            f"{r['scenario']:<16} {r['concurrency']:>4} {r['metric']:<15} "
+            f"{r['baseline']:>10.2f} {r['current']:>10.2f} {change:>8}{flag}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="벤치 결과를 기준(baseline)과 비교")
+    parser.add_argument("current")
+    parser.add_argument("baseline")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="허용 변화율 (0.10 = 10%%)")
+    args = parser.parse_args(argv)
+
+    with open(args.current, encoding="utf-8") as f:
+        current = json.load(f)
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+
+    rows = compare_results(current, baseline, args.tolerance)
+    print(format_table(rows))
+    if any(r["regression"] for r in rows):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
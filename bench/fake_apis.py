@@ -0,0 +1,331 @@
+"""
+Google Places / 카카오 로컬·장소 / 알리고 API 를 흉내 내는 로컬 가짜 서버.
+
+    python -m bench.fake_apis --port 18080 --seed 42 \
+        --profile google=150,600,0.01 --profile aligo_send=200,800
+
+app.py 를 이 서버로 보내려면 (run_bench 는 알아서 설정함):
+    GOOGLE_PLACES_BASE=http://127.0.0.1:18080
+    KAKAO_API_BASE=http://127.0.0.1:18080
+    KAKAO_PLACE_BASE=http://127.0.0.1:18080
+    ALIGO_API_BASE=http://127.0.0.1:18080
+
+엔드포인트 (응답 형식은 app.py 가 읽는 필드만 맞춤)
+  POST /v1/places:searchNearby                 google
+  GET  /v2/local/search/keyword.json           kakao_search
+  GET  /v2/local/search/category.json          kakao_search
+  GET  /main/v/<place_id>                      kakao_place
+  POST /akv10/token/create/<ttl>/i/            aligo_token
+  POST /akv10/alimtalk/send/                   aligo_send
+  GET  /__stats , POST /__reset                호출 수 / 오류 수 (벤치 러너용)
+
+응답 내용은 요청 값(좌표, 검색어, place_id)과 seed 로만 정해지고,
+지연 시간은 엔드포인트별 로그정규분포(중앙값, p99), 오류는 error_rate 확률로 503.
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import random
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+
+# 엔드포인트 그룹별 기본 지연 / 오류 (중앙값 ms, p99 ms, 오류 비율)
+DEFAULT_PROFILES = {
+    "google": (150.0, 600.0, 0.0),
+    "kakao_search": (40.0, 150.0, 0.0),
+    "kakao_place": (80.0, 300.0, 0.0),
+    "aligo_token": (100.0, 300.0, 0.0),
+    "aligo_send": (200.0, 800.0, 0.0),
+}
+
+KAKAO_MISS_RATE = 0.1       # 카카오 키워드 검색이 빈 결과를 주는 비율 (이름 해시 기준)
+
+_NAMES = [
+    "할매국밥", "원조칼국수", "소문난감자탕", "스시오마카세", "라멘야", "홍콩반점",
+    "마라공방", "버거하우스", "피자스튜디오", "파스타바", "돈카츠상회", "떡볶이연구소",
+    "순두부집", "제육백반", "쌀국수하노이", "카레하우스", "샐러드랩", "치킨마당",
+]
+_TYPES = [
+    "Korean Restaurant", "Japanese Restaurant", "Chinese Restaurant", "Ramen Restaurant",
+    "Hamburger Restaurant", "Pizza Restaurant", "Italian Restaurant", "Vietnamese Restaurant",
+    "Cafe", "Restaurant",
+]
+_REVIEWS = [
+    "김치찌개가 정말 맛있어요. 점심에 자주 옵니다.",
+    "국밥 국물이 진하고 양이 많아요.",
+    "초밥이 신선하고 가격도 괜찮아요.",
+    "짬뽕이 얼큰해서 해장으로 최고.",
+    "떡볶이랑 튀김 조합 추천합니다.",
+    "The ramen broth is rich and the noodles are great.",
+    "Great burger and fries, friendly staff.",
+    "파스타랑 피자 둘 다 맛있어요. 데이트 장소로 좋아요.",
+]
+_DAYS_EN = ["Sunday", "Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday"]
+
+
+def parse_profile(spec):
+    """'google=150,600,0.01' → ('google', (150.0, 600.0, 0.01))"""
+    name, _, values = spec.partition("=")
+    name = name.strip()
+    if name not in DEFAULT_PROFILES:
+        raise argparse.ArgumentTypeError(f"unknown endpoint group: {name}")
+    parts = [float(v) for v in values.split(",") if v.strip()]
+    median, p99, error_rate = DEFAULT_PROFILES[name]
+    if len(parts) > 0:
+        median = parts[0]
+    if len(parts) > 1:
+        p99 = parts[1]
+    if len(parts) > 2:
+        error_rate = parts[2]
+    return name, (median, max(p99, median), error_rate)
+
+
+def _stable_int(*parts):
+    h = hashlib.blake2b("|".join(map(str, parts)).encode("utf-8"), digest_size=8)
+    return int.from_bytes(h.digest(), "big")
+
+
+class FakeApiState:
+    """지연/오류 분포 + 호출 통계 (요청 스레드들이 공유)"""
+
+    def __init__(self, seed=42, profiles=None):
+        self.seed = seed
+        self.profiles = dict(DEFAULT_PROFILES)
+        self.profiles.update(profiles or {})
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._stats = defaultdict(int)
+
+    def draw(self, group):
+        """(지연 초, 오류 여부) – 로그정규분포: 중앙값 = median, 99% 지점 = p99"""
+        median, p99, error_rate = self.profiles[group]
+        with self._lock:
+            z = self._rng.gauss(0.0, 1.0)
+            fail = self._rng.random() < error_rate
+            self._stats[f"{group}.calls"] += 1
+            if fail:
+                self._stats[f"{group}.errors"] += 1
+        if median <= 0:
+            return 0.0, fail
+        sigma = math.log(p99 / median) / 2.326 if p99 > median else 0.0
+        return median * math.exp(sigma * z) / 1000.0, fail
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats)
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self._rng = random.Random(self.seed)
+
+    # ── 응답 생성 (요청 값 + seed 로만 결정) ─────────────────
+
+    def google_places(self, lat, lon, radius_m, count):
+        rng = random.Random(_stable_int(self.seed, round(lat, 3), round(lon, 3)))
+        places = []
+        for i in range(count):
+            # 반경 안의 임의 지점
+            r = radius_m * math.sqrt(rng.random())
+            theta = rng.random() * 2 * math.pi
+            plat = lat + (r * math.cos(theta)) / 111_320.0
+            plon = lon + (r * math.sin(theta)) / (111_320.0 * math.cos(math.radians(lat)))
+            name = f"{rng.choice(_NAMES)} {_stable_int(self.seed, round(plat, 5), round(plon, 5)) % 1000}호점"
+            open_h = rng.choice([7, 9, 10, 11, 11, 17])
+            close_h = rng.choice([21, 22, 23, 24])
+            closed_day = rng.choice([None, None, 0, 1])
+            periods = []
+            descriptions = []
+            for day in range(7):
+                if day == closed_day:
+                    descriptions.append(f"{_DAYS_EN[day]}: Closed")
+                    continue
+                periods.append({
+                    "open": {"day": day, "hour": open_h, "minute": 0},
+                    "close": {"day": (day + 1) % 7 if close_h == 24 else day, "hour": close_h % 24, "minute": 0},
+                })
+                descriptions.append(f"{_DAYS_EN[day]}: {open_h}:00 AM – {close_h % 12 or 12}:00 PM")
+            places.append({
+                "id": f"bench-g-{_stable_int(self.seed, name, round(plat, 5)):x}",
+                "displayName": {"text": name, "languageCode": "ko"},
+                "location": {"latitude": plat, "longitude": plon},
+                "rating": round(rng.uniform(3.0, 4.9), 1),
+                "userRatingCount": rng.randint(0, 800),
+                "shortFormattedAddress": f"서울 벤치구 가짜로 {rng.randint(1, 300)}",
+                "regularOpeningHours": {"periods": periods, "weekdayDescriptions": descriptions},
+                "primaryTypeDisplayName": {"text": rng.choice(_TYPES), "languageCode": "en"},
+                "photos": [{"name": f"places/bench/photos/{i}"}],
+                "reviews": [
+                    {"text": {"text": rng.choice(_REVIEWS), "languageCode": "ko"}}
+                    for _ in range(rng.randint(0, 3))
+                ],
+            })
+        return {"places": places}
+
+    def kakao_documents(self, query, x, y):
+        key = _stable_int(self.seed, query or "", round(x, 4), round(y, 4))
+        if query and (key % 1000) / 1000.0 < KAKAO_MISS_RATE:
+            return {"documents": [], "meta": {"total_count": 0}}
+        place_id = str(key % 10**9)
+        return {
+            "documents": [{
+                "id": place_id,
+                "place_name": query or f"카카오 가게 {place_id[-4:]}",
+                "road_address_name": f"서울 벤치구 가짜로 {key % 300 + 1}",
+                "address_name": f"서울 벤치구 가짜동 {key % 900 + 1}",
+                "x": str(x),
+                "y": str(y),
+            }],
+            "meta": {"total_count": 1},
+        }
+
+    def kakao_basic_info(self, place_id):
+        key = _stable_int(self.seed, place_id)
+        return {
+            "basicInfo": {
+                "address": {"newAddr": f"서울 벤치구 가짜로 {key % 300 + 1}"},
+                "openInfo": {"openInfo": "매일 11:00 ~ 22:00", "openFlag": "Y" if key % 5 else "N"},
+            }
+        }
+
+
+class FakeApiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"      # keep-alive (app 의 HttpClient 세션 재사용 확인용)
+    state = None                       # FakeApiServer 가 채움
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _respond(self, group, build):
+        delay, fail = self.state.draw(group)
+        if delay > 0:
+            time.sleep(delay)
+        if fail:
+            self._send_json(503, {"error": "fake upstream error"})
+            return
+        self._send_json(200, build())
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        qs = {k: v[-1] for k, v in parse_qs(parts.query).items()}
+        path = parts.path
+
+        if path == "/__stats":
+            self._send_json(200, self.state.stats())
+        elif path in ("/v2/local/search/keyword.json", "/v2/local/search/category.json"):
+            x = float(qs.get("x") or 0)
+            y = float(qs.get("y") or 0)
+            self._respond("kakao_search", lambda: self.state.kakao_documents(qs.get("query"), x, y))
+        elif path.startswith("/main/v/"):
+            place_id = path[len("/main/v/"):]
+            self._respond("kakao_place", lambda: self.state.kakao_basic_info(place_id))
+        else:
+            self._send_json(404, {"error": "not found", "path": path})
+
+    def do_POST(self):
+        path = urlsplit(self.path).path
+        raw = self._read_body()
+
+        if path == "/__reset":
+            self.state.reset()
+            self._send_json(200, {"result": "ok"})
+        elif path == "/v1/places:searchNearby":
+            body = json.loads(raw or b"{}")
+            circle = body.get("locationRestriction", {}).get("circle", {})
+            center = circle.get("center", {})
+            self._respond("google", lambda: self.state.google_places(
+                float(center.get("latitude") or 0),
+                float(center.get("longitude") or 0),
+                float(circle.get("radius") or 1500),
+                int(body.get("maxResultCount") or 20),
+            ))
+        elif path.startswith("/akv10/token/create/"):
+            self._respond("aligo_token", lambda: {
+                "code": 0,
+                "message": "정상적으로 생성하였습니다.",
+                "token": f"bench-token-{time.monotonic_ns()}",
+            })
+        elif path == "/akv10/alimtalk/send/":
+            form = parse_qs(raw.decode("utf-8"))
+            count = sum(1 for k in form if k.startswith("receiver_"))
+            self._respond("aligo_send", lambda: {
+                "code": 0,
+                "message": "성공적으로 전송요청 하였습니다.",
+                "info": {"type": "AT", "mid": _stable_int(raw) % 10**9, "scnt": count, "fcnt": 0},
+            })
+        else:
+            self._send_json(404, {"error": "not found", "path": path})
+
+
+class FakeApiServer:
+    """스레드에서 도는 가짜 API 서버 (with 블록 또는 start/stop)"""
+
+    def __init__(self, host="127.0.0.1", port=0, seed=42, profiles=None):
+        self.state = FakeApiState(seed=seed, profiles=profiles)
+        handler = type("BoundFakeApiHandler", (FakeApiHandler,), {"state": self.state})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="fake-apis", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Google / Kakao / Aligo 가짜 API 서버")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=18080)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument(
+        "--profile", action="append", type=parse_profile, default=[],
+        help="그룹=중앙값ms,p99ms,오류비율 (그룹: " + ", ".join(DEFAULT_PROFILES) + ")",
+    )
+    args = parser.parse_args(argv)
+
+    server = FakeApiServer(args.host, args.port, seed=args.seed, profiles=dict(args.profile))
+    print(f"fake APIs listening on {server.url}", flush=True)
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,439 @@
+"""
+벤치마크 러너: 가짜 외부 API + 시드된 로컬 Postgres 로 주요 엔드포인트의 지연/처리량 측정.
+
+    DB_HOST=127.0.0.1 DB_NAME=nyam_bench DB_USER=... DB_PASSWORD=... \
+    python -m bench.run_bench --concurrency 1,8,32 --requests 300 \
+        --profile google=150,600,0.01 --baseline bench/baseline.json
+
+하는 일
+  1) bench.fake_apis 를 별도 프로세스로 띄움 (Google / 카카오 / 알리고 흉내)
+  2) bench.seed 로 벤치 사용자/가게/피드백을 seed 기준으로 다시 만듦
+  3) app 을 별도 프로세스로 띄움 (gunicorn 이 있으면 gunicorn gthread, 없으면 werkzeug threaded)
+     외부 API 주소는 *_BASE 환경 변수로 가짜 서버를 가리키게 함
+  4) 시나리오 × 동시성마다 warmup 후 --requests 번 요청 (closed loop)
+     요청 i 의 파라미터는 (seed, 시나리오, i) 로만 정해지므로 스레드 배정과 무관하게 같은 요청 집합
+  5) p50/p95/p99/평균/최대(ms), 처리량(req/s), 오류 수, 가짜 API 호출 수를 JSON 으로 저장
+     --baseline 을 주면 bench.compare 로 비교해서 회귀가 있으면 종료 코드 1
+
+시나리오
+  api_reco        POST /api/reco          (벤치 사용자 80% / 비회원 20%, 좌표는 시드 지역 안 임의)
+  go              GET  /go                (클릭 로그 + 리다이렉트, 리다이렉트는 따라가지 않음)
+  quick_feedback  POST /api/quick-feedback
+  cron_send_reco  GET  /cron/send-reco    (잡 등록 → /cron/jobs/<id> 가 done 이 될 때까지, 동시성 무관)
+                                          처리량은 초당 발송 메시지 수
+
+Google 타일 / 카카오 매칭 캐시는 단계 사이에 유지되므로 첫 동시성 단계가 가장 차가운 상태.
+(--cold 로 시작 전 캐시 테이블을 비우면 매 실행이 같은 조건에서 시작)
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import requests
+
+from bench import compare, fake_apis, seed as bench_seed
+
+SCENARIOS = ("api_reco", "go", "quick_feedback", "cron_send_reco")
+ANONYMOUS_RATIO = 0.2
+
+# werkzeug 서버 (gunicorn 이 없을 때) – 요청마다 찍는 access 로그는 끔
+WERKZEUG_SERVER_CODE = """
+import logging, sys
+from werkzeug.serving import make_server
+import app
+logging.getLogger("werkzeug").setLevel(logging.WARNING)
+make_server(sys.argv[1], int(sys.argv[2]), app.app, threaded=True).serve_forever()
+"""
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_http(url, proc=None, timeout=60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc is not None and proc.poll() is not None:
+            raise RuntimeError(f"process exited early (code {proc.returncode}) while waiting for {url}")
+        try:
+            if requests.get(url, timeout=1.0).status_code < 500:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"timed out waiting for {url}")
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return None
+
+
+def summarize(latencies_ms, errors, wall_sec, completed):
+    lat = np.asarray(latencies_ms, dtype=np.float64)
+    stats = {
+        "requests": completed,
+        "errors": errors,
+        "error_rate": round(errors / completed, 4) if completed else 0.0,
+        "wall_sec": round(wall_sec, 3),
+        "throughput_rps": round(completed / wall_sec, 2) if wall_sec > 0 else 0.0,
+    }
+    if lat.size:
+        p50, p95, p99 = np.percentile(lat, [50, 95, 99])
+        stats.update({
+            "p50_ms": round(float(p50), 2),
+            "p95_ms": round(float(p95), 2),
+            "p99_ms": round(float(p99), 2),
+            "mean_ms": round(float(lat.mean()), 2),
+            "max_ms": round(float(lat.max()), 2),
+        })
+    return stats
+
+
+# ── 시나리오별 요청 1건 (status code 리턴) ─────────────────────
+
+def _pick_phone(rng, data):
+    if rng.random() < ANONYMOUS_RATIO:
+        return ""
+    return rng.choice(data["phones"])
+
+
+def req_api_reco(session, base_url, rng, data, args):
+    lat, lon = bench_seed.random_point(rng, bench_seed.DEFAULT_CENTER, args.spread_km)
+    resp = session.post(f"{base_url}/api/reco", json={
+        "lat": lat,
+        "lon": lon,
+        "phone": _pick_phone(rng, data),
+        "time": rng.choice(bench_seed.TIME_LABELS),
+    }, timeout=30)
+    return resp.status_code
+
+
+def req_go(session, base_url, rng, data, args):
+    rid, name, _ = rng.choice(data["restaurants"])
+    resp = session.get(f"{base_url}/go", params={
+        "phone": rng.choice(data["phones"]),
+        "rid": rid,
+        "name": name,
+        "pid": str(900000000 + rid),
+        "time": rng.choice(bench_seed.TIME_LABELS),
+    }, allow_redirects=False, timeout=30)
+    return resp.status_code
+
+
+def req_quick_feedback(session, base_url, rng, data, args):
+    rid, name, category = rng.choice(data["restaurants"])
+    resp = session.post(f"{base_url}/api/quick-feedback", json={
+        "phone": rng.choice(data["phones"]),
+        "name": name,
+        "category": category,
+        "like": rng.random() < 0.7,
+        "time_of_day": rng.choice(bench_seed.TIME_LABELS),
+        "restaurant_id": rid,
+    }, timeout=30)
+    return resp.status_code
+
+
+REQUESTS = {
+    "api_reco": req_api_reco,
+    "go": req_go,
+    "quick_feedback": req_quick_feedback,
+}
+
+
+def run_closed_loop(scenario, base_url, concurrency, total, seed, data, args, first_index=0):
+    """concurrency 개 스레드가 total 건을 나눠서 요청. 반환: (지연 목록 ms, 오류 수, 걸린 시간)"""
+    send = REQUESTS[scenario]
+    lock = threading.Lock()
+    state = {"next": 0}
+    latencies = []
+    errors = [0]
+
+    def worker():
+        session = requests.Session()
+        while True:
+            with lock:
+                i = state["next"]
+                state["next"] += 1
+            if i >= total:
+                return
+            rng = random.Random(f"{seed}:{scenario}:{first_index + i}")
+            started = time.perf_counter()
+            try:
+                ok = send(session, base_url, rng, data, args) < 400
+            except requests.RequestException:
+                ok = False
+            elapsed = (time.perf_counter() - started) * 1000
+            with lock:
+                if ok:
+                    latencies.append(elapsed)
+                else:
+                    errors[0] += 1
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+    wall_started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return latencies, errors[0], time.perf_counter() - wall_started
+
+
+def run_cron(base_url, runs, timeout=600.0):
+    """크론 발송 잡을 runs 번 (시간대를 돌려가며) 끝까지 돌리고 잡 단위 지연/메시지 처리량 측정"""
+    session = requests.Session()
+    durations = []
+    errors = 0
+    sent = 0
+    total_wall = 0.0
+    for n in range(runs):
+        label = bench_seed.TIME_LABELS[n % len(bench_seed.TIME_LABELS)]
+        started = time.perf_counter()
+        try:
+            resp = session.get(f"{base_url}/cron/send-reco", params={"time": label}, timeout=30)
+            job_id = resp.json()["job_id"]
+            while True:
+                job = session.get(f"{base_url}/cron/jobs/{job_id}", timeout=30).json()
+                if job.get("status") in ("done", "failed", "stale"):
+                    break
+                if time.perf_counter() - started > timeout:
+                    job = {"status": "timeout"}
+                    break
+                time.sleep(0.05)
+        except (requests.RequestException, ValueError, KeyError):
+            job = {"status": "error"}
+        elapsed = time.perf_counter() - started
+        total_wall += elapsed
+        if job.get("status") == "done":
+            durations.append(elapsed * 1000)
+            sent += job.get("sent_count") or 0
+        else:
+            errors += 1
+
+    stats = summarize(durations, errors, total_wall, runs)
+    stats["messages_sent"] = sent
+    stats["throughput_rps"] = round(sent / total_wall, 2) if total_wall > 0 else 0.0
+    stats["throughput_unit"] = "messages/s"
+    return stats
+
+
+def fake_stats(fake_url, reset=False):
+    try:
+        if reset:
+            requests.post(f"{fake_url}/__reset", timeout=5)
+            return None
+        return requests.get(f"{fake_url}/__stats", timeout=5).json()
+    except requests.RequestException:
+        return None
+
+
+def bench_env(args, fake_url):
+    """app 프로세스(와 시드용 import)에 줄 환경 변수"""
+    env = {
+        "GOOGLE_PLACES_BASE": fake_url,
+        "KAKAO_API_BASE": fake_url,
+        "KAKAO_PLACE_BASE": fake_url,
+        "ALIGO_API_BASE": fake_url,
+        "GOOGLE_PLACES_API_KEY": "bench",
+        "KAKAO_REST_API_KEY": "bench",
+        "ALIGO_API_KEY": "bench",
+        "ALIGO_USER_ID": "bench",
+        "ALIGO_SENDER_KEY": "bench",
+        "ALIGO_SENDER": "01000000000",
+        "ALIGO_TESTMODE": "Y",
+        "SERVER_BASE_URL": "http://bench.local",
+        "TRACE_FILE": "",
+        "LOG_LEVEL": args.app_log_level,
+        "RECO_LOCAL_MODE": args.reco_local_mode,
+    }
+    return env
+
+
+def start_app(args, env, port, log_file):
+    server = args.server
+    if server == "auto":
+        try:
+            import gunicorn  # noqa: F401
+            server = "gunicorn"
+        except ImportError:
+            server = "werkzeug"
+
+    if server == "gunicorn":
+        cmd = [
+            sys.executable, "-m", "gunicorn",
+            "-w", str(args.workers), "-k", "gthread", "--threads", str(args.threads),
+            "-b", f"127.0.0.1:{port}", "app:app",
+        ]
+    else:
+        cmd = [sys.executable, "-c", WERKZEUG_SERVER_CODE, "127.0.0.1", str(port)]
+
+    proc = subprocess.Popen(cmd, env=env, stdout=log_file, stderr=subprocess.STDOUT)
+    return proc, server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="nyam 벤치마크 (가짜 외부 API + 로컬 Postgres)")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--concurrency", default="1,8,32", help="쉼표로 구분한 동시성 단계")
+    parser.add_argument("--requests", type=int, default=200, help="동시성 단계별 측정 요청 수")
+    parser.add_argument("--warmup", type=int, default=20, help="단계별 측정 전 요청 수 (기록 안 함)")
+    parser.add_argument("--cron-runs", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--restaurants", type=int, default=300)
+    parser.add_argument("--spread-km", type=float, default=3.0)
+    parser.add_argument("--cold", action="store_true", help="시드 때 Google/카카오 캐시 테이블 비움")
+    parser.add_argument("--profile", action="append", type=fake_apis.parse_profile, default=[],
+                        help="가짜 API 지연/오류: 그룹=중앙값ms,p99ms,오류비율")
+    parser.add_argument("--server", choices=("auto", "gunicorn", "werkzeug"), default="auto")
+    parser.add_argument("--workers", type=int, default=2, help="gunicorn 워커 수")
+    parser.add_argument("--threads", type=int, default=8, help="gunicorn 워커당 스레드 수")
+    parser.add_argument("--reco-local-mode", default=os.getenv("RECO_LOCAL_MODE", "auto"))
+    parser.add_argument("--app-log-level", default="WARNING")
+    parser.add_argument("--out", default=None, help="결과 JSON 경로 (기본: bench/results/<시각>.json)")
+    parser.add_argument("--baseline", default=None)
+    parser.add_argument("--tolerance", type=float, default=0.10)
+    parser.add_argument("--allow-remote-db", action="store_true")
+    args = parser.parse_args(argv)
+
+    scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    levels = [int(c) for c in args.concurrency.split(",") if c.strip()]
+    profiles = dict(fake_apis.DEFAULT_PROFILES)
+    profiles.update(dict(args.profile))
+
+    bench_seed._check_local_db(args.allow_remote_db)
+
+    started_at = datetime.now(timezone.utc)
+    out = args.out or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "results", started_at.strftime("%Y%m%dT%H%M%SZ") + ".json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+
+    procs = []
+    log_path = os.path.splitext(out)[0] + ".server.log"
+    log_file = open(log_path, "w", encoding="utf-8")
+    try:
+        # 1) 가짜 외부 API
+        fake_port = free_port()
+        fake_url = f"http://127.0.0.1:{fake_port}"
+        fake_cmd = [sys.executable, "-m", "bench.fake_apis", "--port", str(fake_port), "--seed", str(args.seed)]
+        for name, (median, p99, error_rate) in profiles.items():
+            fake_cmd += ["--profile", f"{name}={median},{p99},{error_rate}"]
+        procs.append(subprocess.Popen(fake_cmd, stdout=log_file, stderr=subprocess.STDOUT))
+        wait_http(f"{fake_url}/__stats", procs[-1])
+
+        # 2) 시드 (이 프로세스에서 app 을 import 하므로 환경 변수 먼저)
+        env_overrides = bench_env(args, fake_url)
+        os.environ.update(env_overrides)
+        print(f"seeding users={args.users} restaurants={args.restaurants} seed={args.seed} ...", flush=True)
+        data = bench_seed.seed_database(
+            users=args.users,
+            restaurants=args.restaurants,
+            spread_km=args.spread_km,
+            seed=args.seed,
+            cold=args.cold,
+        )
+
+        # 3) app 서버
+        app_port = free_port()
+        base_url = f"http://127.0.0.1:{app_port}"
+        app_proc, server = start_app(args, dict(os.environ), app_port, log_file)
+        procs.append(app_proc)
+        wait_http(f"{base_url}/signup", app_proc)
+        print(f"app ({server}) on {base_url}, fake APIs on {fake_url}", flush=True)
+
+        # 4) 시나리오 × 동시성
+        results = {}
+        for scenario in scenarios:
+            results[scenario] = {}
+            if scenario == "cron_send_reco":
+                fake_stats(fake_url, reset=True)
+                stats = run_cron(base_url, args.cron_runs)
+                stats["upstream_calls"] = fake_stats(fake_url)
+                results[scenario]["1"] = stats
+                print(f"{scenario:<16} runs={args.cron_runs} "
+                      f"p50={stats.get('p50_ms', 0):.0f}ms {stats['throughput_rps']:.1f} msg/s", flush=True)
+                continue
+
+            for concurrency in levels:
+                if args.warmup:
+                    run_closed_loop(scenario, base_url, concurrency, args.warmup, args.seed, data, args,
+                                    first_index=-args.warmup)
+                fake_stats(fake_url, reset=True)
+                latencies, errors, wall = run_closed_loop(
+                    scenario, base_url, concurrency, args.requests, args.seed, data, args
+                )
+                stats = summarize(latencies, errors, wall, args.requests)
+                stats["upstream_calls"] = fake_stats(fake_url)
+                results[scenario][str(concurrency)] = stats
+                print(
+                    f"{scenario:<16} c={concurrency:<3} p50={stats.get('p50_ms', 0):7.1f}ms "
+                    f"p95={stats.get('p95_ms', 0):7.1f}ms p99={stats.get('p99_ms', 0):7.1f}ms "
+                    f"{stats['throughput_rps']:7.1f} req/s errors={errors}",
+                    flush=True,
+                )
+    finally:
+        for proc in reversed(procs):
+            proc.terminate()
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+        log_file.close()
+
+    report = {
+        "meta": {
+            "started_at": started_at.isoformat(),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "server": server,
+            "workers": args.workers if server == "gunicorn" else 1,
+            "threads": args.threads if server == "gunicorn" else None,
+            "seed": args.seed,
+            "users": args.users,
+            "restaurants": args.restaurants,
+            "spread_km": args.spread_km,
+            "cold": args.cold,
+            "requests": args.requests,
+            "warmup": args.warmup,
+            "concurrency": levels,
+            "reco_local_mode": args.reco_local_mode,
+            "profiles": {k: {"median_ms": v[0], "p99_ms": v[1], "error_rate": v[2]} for k, v in profiles.items()},
+        },
+        "results": results,
+    }
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"saved {out}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        rows = compare.compare_results(report, baseline, args.tolerance)
+        print(compare.format_table(rows))
+        if any(r["regression"] for r in rows):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
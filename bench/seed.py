@@ -0,0 +1,170 @@
+"""
+벤치마크용 로컬 Postgres 시드.
+
+    DB_HOST=127.0.0.1 DB_NAME=nyam_bench ... python -m bench.seed --users 500 --restaurants 300
+
+- app.init_db() 로 스키마를 최신으로 맞춘 뒤
+  벤치 전용 사용자(BENCH_PHONE_PREFIX…) / 가게(주소 BENCH_ADDRESS_PREFIX…) /
+  좋아요·별로예요 피드백을 seed 기준으로 똑같이 다시 만든다.
+- 이전 벤치 행만 지우고 다시 넣으므로 여러 번 돌려도 같은 상태가 됨.
+- --cold 면 Google 타일 / 카카오 매칭 캐시 테이블도 비움 (캐시 없는 첫 요청 측정용).
+- 실수로 운영 DB 를 건드리지 않도록 DB_HOST 가 로컬이 아니면 --allow-remote-db 없이는 거부.
+"""
+
+import argparse
+import math
+import os
+import random
+
+BENCH_PHONE_PREFIX = "01099"              # + 6자리 → 최대 100만 명
+BENCH_ADDRESS_PREFIX = "서울 벤치구"       # fake_apis 가 만드는 가게 주소도 같은 접두어
+DEFAULT_CENTER = (37.5665, 126.9780)      # 서울시청
+LOCAL_DB_HOSTS = ("localhost", "127.0.0.1", "::1", "")
+
+TIME_LABELS = ("아침", "점심", "저녁", "야식")
+ALERT_TIMES = ("아침,점심", "점심,저녁", "저녁,야식", "", "점심")
+SEED_CATEGORIES = ("한식", "일식", "중식", "양식", "분식", "카페")
+
+
+def bench_phone(i):
+    return f"{BENCH_PHONE_PREFIX}{i:06d}"
+
+
+def random_point(rng, center, spread_km):
+    """center 에서 spread_km 반경 안의 임의 좌표"""
+    lat0, lon0 = center
+    r = spread_km * math.sqrt(rng.random())
+    theta = rng.random() * 2 * math.pi
+    lat = lat0 + (r * math.cos(theta)) / 111.32
+    lon = lon0 + (r * math.sin(theta)) / (111.32 * math.cos(math.radians(lat0)))
+    return lat, lon
+
+
+def _check_local_db(allow_remote):
+    host = os.getenv("DB_HOST", "")
+    if host.startswith("/"):          # 유닉스 소켓
+        return
+    if host not in LOCAL_DB_HOSTS and not allow_remote:
+        raise SystemExit(
+            f"DB_HOST={host!r} 는 로컬이 아닙니다. 벤치 데이터를 넣으려면 --allow-remote-db 를 주세요."
+        )
+
+
+def seed_database(users=500, restaurants=300, feedback_per_user=4, center=DEFAULT_CENTER,
+                  spread_km=3.0, seed=42, cold=False):
+    """
+    벤치 데이터를 seed 기준으로 다시 만든다.
+    반환: {"phones": [...], "restaurants": [(id, name, category), ...]}
+    """
+    import app   # DB_* 환경 변수가 정해진 뒤에 import
+
+    rng = random.Random(seed)
+    app.init_db()
+
+    phones = [bench_phone(i) for i in range(users)]
+    with app.get_conn() as conn:
+        cur = conn.cursor()
+
+        # 1) 이전 벤치 데이터 정리 (FK 때문에 로그 → 가게 순서)
+        like_phone = BENCH_PHONE_PREFIX + "%"
+        like_addr = BENCH_ADDRESS_PREFIX + "%"
+        bench_rids = "SELECT id FROM restaurants WHERE address LIKE %s"
+        for table in ("click_logs", "user_feedback", "recommendation_logs"):
+            cur.execute(
+                f"DELETE FROM {table} WHERE phone_number LIKE %s OR restaurant_id IN ({bench_rids});",
+                (like_phone, like_addr),
+            )
+        for table in ("user_category_profile", "user_restaurant_profile", "users"):
+            cur.execute(f"DELETE FROM {table} WHERE phone_number LIKE %s;", (like_phone,))
+        cur.execute("DELETE FROM restaurants WHERE address LIKE %s;", (like_addr,))
+        # 끝나지 않은 크론 잡이 남아 있으면 /cron/send-reco 가 already_running 으로 응답하므로 정리
+        cur.execute("DELETE FROM cron_jobs WHERE status IN ('queued', 'running');")
+        if cold:
+            cur.execute("TRUNCATE kakao_place_matches, google_places_tiles;")
+
+        # 2) 사용자
+        user_rows = []
+        for phone in phones:
+            lat, lon = random_point(rng, center, spread_km)
+            prefs = ",".join(rng.sample(SEED_CATEGORIES, rng.randint(0, 3)))
+            user_rows.append((phone, prefs, lat, lon, rng.choice(ALERT_TIMES), True))
+        app.execute_values(
+            cur,
+            """
+            INSERT INTO users
+                (phone_number, preferences_categories, latitude, longitude, alert_times, is_active)
+            VALUES %s;
+            """,
+            user_rows,
+            page_size=1000,
+        )
+
+        # 3) 가게 (로컬 인덱스 추천 경로가 쓰도록 last_seen_at = NOW())
+        hours = app.compile_opening_hours([
+            {"open": {"day": d, "hour": 10, "minute": 0}, "close": {"day": d, "hour": 22, "minute": 0}}
+            for d in range(7)
+        ])
+        restaurant_rows = []
+        for i in range(restaurants):
+            lat, lon = random_point(rng, center, spread_km)
+            category = rng.choice(SEED_CATEGORIES)
+            restaurant_rows.append((
+                f"벤치식당 {i:05d}", category, f"{BENCH_ADDRESS_PREFIX} 시드로 {i}",
+                lat, lon, round(rng.uniform(3.0, 4.9), 1), rng.randint(0, 800),
+                str(900000000 + i), None, "매일 10:00 ~ 22:00", "", "", hours,
+            ))
+        ids = app.upsert_restaurants_and_get_ids(cur, restaurant_rows)
+        seeded = [(rid, row[0], row[1]) for rid, row in zip(ids, restaurant_rows)]
+
+        # 4) 피드백 이력 (취향 프로필 / 최근 이력 조회에 실제 행이 걸리도록)
+        feedback_rows = []
+        for phone in phones:
+            for _ in range(feedback_per_user):
+                rid, name, category = rng.choice(seeded)
+                feedback_rows.append((
+                    phone, name, category, rng.choice((1, 5, 5)), "bench",
+                    rng.choice(TIME_LABELS), rid,
+                ))
+        if feedback_rows:
+            app.execute_values(
+                cur,
+                """
+                INSERT INTO user_feedback
+                    (phone_number, restaurant_name, category, rating, source, time_of_day, restaurant_id)
+                VALUES %s;
+                """,
+                feedback_rows,
+                page_size=1000,
+            )
+        conn.commit()
+        cur.close()
+
+    app.rebuild_user_profiles()
+    return {"phones": phones, "restaurants": seeded}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="벤치마크용 로컬 DB 시드")
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--restaurants", type=int, default=300)
+    parser.add_argument("--feedback-per-user", type=int, default=4)
+    parser.add_argument("--spread-km", type=float, default=3.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--cold", action="store_true", help="Google/카카오 캐시 테이블도 비움")
+    parser.add_argument("--allow-remote-db", action="store_true")
+    args = parser.parse_args(argv)
+
+    _check_local_db(args.allow_remote_db)
+    data = seed_database(
+        users=args.users,
+        restaurants=args.restaurants,
+        feedback_per_user=args.feedback_per_user,
+        spread_km=args.spread_km,
+        seed=args.seed,
+        cold=args.cold,
+    )
+    print(f"seeded users={len(data['phones'])} restaurants={len(data['restaurants'])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,20 @@
 import os
-from celery import Celery
-from datetime import datetime
+import logging
+import time
+from celery import Celery, chord, group
+from datetime import datetime, timezone
+
+# app.py 의 "nyam" 로거(JSON lines, 비동기 핸들러) 아래에 붙어서 같은 형식으로 남습니다.
+log = logging.getLogger("nyam.celery")
+
+# ==== 알림 발송 fan-out 설정 ====
+ALERT_CHUNK_SIZE = int(os.getenv("ALERT_CHUNK_SIZE", "200"))                  # 청크 태스크 하나가 맡는 사용자 수
+ALERT_CHUNK_MAX_RETRIES = int(os.getenv("ALERT_CHUNK_MAX_RETRIES", "3"))      # 청크별 재시도 횟수
+ALERT_CHUNK_RETRY_DELAY = int(os.getenv("ALERT_CHUNK_RETRY_DELAY", "30"))     # 재시도 간격(초, 시도마다 2배)
+ALERT_CHUNK_RATE_LIMIT = os.getenv("ALERT_CHUNK_RATE_LIMIT") or None          # 워커당 청크 속도 제한 (예: "30/m")
+CELERY_WORKER_CONCURRENCY = int(os.getenv("CELERY_WORKER_CONCURRENCY", "4"))  # 워커 프로세스 수 (-c 로도 덮어씀)
 
 # Celery 앱 인스턴스를 생성합니다.
-# 이 설정은 app.py에서 다시 업데이트되지만, 인스턴스 자체는 여기서 정의됩니다.
 celery = Celery(
     'restaurant_alerts', 
     broker=os.getenv("CELERY_BROKER_URL"),
@@ -16,83 +27,148 @@ celery.conf.update(
     enable_utc=True,
     task_routes = {
         'restaurant.alert.*': {'queue': 'default_queue'}
-    }
+    },
+    # 청크 태스크는 끝난 뒤에 ack → 워커가 죽으면 그 청크만 다른 워커가 다시 처리
+    task_acks_late=True,
+    task_reject_on_worker_lost=True,
+    worker_prefetch_multiplier=1,
+    worker_concurrency=CELERY_WORKER_CONCURRENCY,
 )
 
+
+def chunked(items, size):
+    size = max(1, int(size))
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
 # Celery 작업 (Task) 정의
 @celery.task(bind=True, name='restaurant.alert.send')
-def send_recommendation_alert(self, time_of_day):
+def send_recommendation_alert(self, time_of_day, chunk_size=None):
     """
     사용자들에게 맞춤형 맛집 추천 알림톡을 발송하는 Celery 작업입니다.
-    """
-    # 순환 참조(Circular Import)를 해결하기 위해, 필요한 함수를 Task 내부에서 가져옵니다.
-    # 이렇게 하면 모듈이 로드되는 시점이 아닌, Task가 실제로 실행되는 시점에 임포트됩니다.
-    try:
-        from app import get_db_connection, recommend_restaurant 
-    except ImportError as e:
-        print(f"ERROR: app.py 함수 임포트 실패 (순환 참조 오류): {e}")
-        # 임포트 실패 시 Task를 실패로 표시하고 재시도
-        raise self.retry(exc=e, countdown=5, max_retries=3)
 
+    1) 알림 대상(활성 + alert_times 에 time_of_day 포함) 번호를 한 번에 조회
+    2) ALERT_CHUNK_SIZE 명씩 잘라서 send_alert_chunk 를 group 으로 동시에 보냄
+    3) 모든 청크가 끝나면 summarize_alert_chunks 가 합계를 남김 (chord)
+    반환: {"users": n, "chunks": m, "chord_id": ...}
+    """
+    # 순환 참조(Circular Import)를 피하기 위해 Task 실행 시점에 app 을 가져옵니다.
+    from app import get_reco_alert_phones
 
-    print(f"⏰ Task 시작: {time_of_day} 추천 알림 발송")
-    
-    # 1. DB 연결 (Task 실행마다 연결)
-    conn = None
     try:
-        conn = get_db_connection()
+        phones = list(dict.fromkeys(get_reco_alert_phones(time_of_day)))
     except Exception as e:
-        print(f"DB 연결 실패: {e}")
+        log.error("CELERY_ALERT_TARGETS_ERROR", extra={"fields": {"time_of_day": time_of_day, "error": str(e)}})
         raise self.retry(exc=e, countdown=10, max_retries=5)
-    
-    # 2. 알림을 받을 사용자 목록 조회
-    users = []
+
+    if not phones:
+        log.info("CELERY_ALERT_NO_USERS", extra={"fields": {"time_of_day": time_of_day}})
+        return {"users": 0, "chunks": 0, "chord_id": None}
+
+    chunks = chunked(phones, chunk_size or ALERT_CHUNK_SIZE)
+    started_at = time.time()
+    result = chord(
+        group(send_alert_chunk.s(chunk, time_of_day) for chunk in chunks),
+        summarize_alert_chunks.s(time_of_day, len(phones), started_at),
+    ).apply_async()
+
+    log.info("CELERY_ALERT_START", extra={"fields": {
+        "time_of_day": time_of_day, "users": len(phones), "chunks": len(chunks),
+    }})
+    return {"users": len(phones), "chunks": len(chunks), "chord_id": result.id}
+
+
+@celery.task(
+    bind=True,
+    name='restaurant.alert.chunk',
+    max_retries=ALERT_CHUNK_MAX_RETRIES,
+    rate_limit=ALERT_CHUNK_RATE_LIMIT,
+)
+def send_alert_chunk(self, phones, time_of_day, sent_before=0, unknown_before=0):
+    """
+    사용자 청크 하나 발송.
+
+    - 청크 전체를 알림톡 다건 발송으로 보냄 (알리고 요청 ≤ ALIGO_BATCH_MAX 명 단위)
+    - 성공한 번호는 UPDATE 한 번으로 last_alert_sent 갱신
+    - 실패한 번호만 남겨서 이 청크만 재시도 (이미 보낸 번호는 다시 안 보냄)
+    - 전달 여부를 모르는 번호(delivery="unknown")는 갱신도 재시도도 안 하고 개수만 셈
+    - 재시도를 다 써도 예외로 끝내지 않고 실패 수를 돌려줌 → chord 요약은 항상 실행
+    반환: {"sent": n, "failed": m, "unknown": u, "failed_sample": [...], "attempts": k}
+    """
+    from app import get_conn, send_reco_messages, phone_hash
+
+    attempt = self.request.retries + 1
     try:
-        cur = conn.cursor()
-        # is_active가 TRUE인 사용자만 조회
-        cur.execute("SELECT phone_number, latitude, longitude FROM users WHERE is_active = TRUE;")
-        users = cur.fetchall()
-        cur.close()
+        results = send_reco_messages(phones, time_of_day)
     except Exception as e:
-        print(f"사용자 조회 중 오류 발생: {e}")
-        conn.close()
-        return f"사용자 조회 실패: {e}"
-
-    if not users:
-        print("알림을 받을 활성 사용자가 없습니다. Task 종료.")
-        conn.close()
-        return "No active users to alert."
-
-    # 3. 각 사용자에게 추천 및 알림 발송 (시뮬레이션)
-    alert_count = 0
-    now = datetime.now()
-    
-    for phone_number, lat, lon in users:
+        results = {p: (False, {"msg": "EXCEPTION", "error": str(e)[:200]}) for p in phones}
+
+    sent, failed, unknown = [], [], []
+    for p in phones:
+        ok, res = results.get(p, (False, None))
+        if ok:
+            sent.append(p)
+        elif (res or {}).get("delivery") == "unknown":
+            # 알리고가 일부 실패라고만 알려주고 번호별 결과가 없는 경우 → 다시 보내면 중복일 수 있어 재시도 안 함
+            unknown.append(p)
+        else:
+            failed.append(p)
+
+    if sent:
         try:
-            # 3-1. 맛집 추천 로직 실행
-            # app.py의 recommend_restaurant 함수는 DB 연결 및 쿼리를 내부에서 처리합니다.
-            recommendation_message = recommend_restaurant(lat, lon, time_of_day)
-
-            # 3-2. 알림톡 발송 시뮬레이션
-            print(f"🔔 알림톡 발송 시뮬레이션 (수신자: {phone_number}, 위치: ({lat}, {lon})): {recommendation_message.splitlines()[0]}")
-
-            # 3-3. 마지막 알림 시간 업데이트 (중요: 중복 알림 방지)
-            cur = conn.cursor()
-            cur.execute(
-                "UPDATE users SET last_alert_sent = %s WHERE phone_number = %s",
-                (now, phone_number)
-            )
-            conn.commit()
-            cur.close()
-
-            alert_count += 1
-            
-        except Exception as user_e:
-            print(f"❌ 사용자 {phone_number} 알림 처리 중 오류 발생: {user_e}")
-            conn.rollback() 
-            continue
-            
-    conn.close()
-    print(f"✅ Task 완료: 총 {alert_count} 명의 사용자에게 {time_of_day} 추천 알림이 발송되었습니다.")
-    return f"Alerts sent to {alert_count} users successfully."
+            with get_conn() as conn:
+                cur = conn.cursor()
+                cur.execute(
+                    "UPDATE users SET last_alert_sent = NOW() WHERE phone_number = ANY(%s);",
+                    (sent,),
+                )
+                conn.commit()
+                cur.close()
+        except Exception as e:
+            # 발송은 이미 됐으므로 재시도하지 않음 (다시 보내면 중복 알림)
+            log.error("CELERY_ALERT_MARK_SENT_ERROR", extra={"fields": {"count": len(sent), "error": str(e)}})
+
+    sent_total = sent_before + len(sent)
+    unknown_total = unknown_before + len(unknown)
+    if failed and self.request.retries < self.max_retries:
+        log.warning("CELERY_ALERT_CHUNK_RETRY", extra={"fields": {
+            "time_of_day": time_of_day, "attempt": attempt, "sent": len(sent), "failed": len(failed),
+        }})
+        raise self.retry(
+            args=(failed, time_of_day),
+            kwargs={"sent_before": sent_total, "unknown_before": unknown_total},
+            countdown=ALERT_CHUNK_RETRY_DELAY * (2 ** self.request.retries),
+        )
+
+    if failed:
+        log.warning("CELERY_ALERT_CHUNK_GAVE_UP", extra={"fields": {
+            "time_of_day": time_of_day, "attempts": attempt, "failed": len(failed),
+        }})
+    return {
+        "sent": sent_total,
+        "failed": len(failed),
+        "unknown": unknown_total,
+        "failed_sample": [
+            {"phone_hash": phone_hash(p), "res": results.get(p, (False, None))[1]} for p in failed[:10]
+        ],
+        "attempts": attempt,
+    }
+
 
+@celery.task(name='restaurant.alert.summary')
+def summarize_alert_chunks(chunk_results, time_of_day, users, started_at):
+    """chord 콜백: 청크 결과 합계 로그 + 리턴"""
+    summary = {
+        "time_of_day": time_of_day,
+        "users": users,
+        "chunks": len(chunk_results),
+        "sent": sum(r.get("sent", 0) for r in chunk_results),
+        "failed": sum(r.get("failed", 0) for r in chunk_results),
+        "unknown": sum(r.get("unknown", 0) for r in chunk_results),
+        "chunks_with_failures": sum(1 for r in chunk_results if r.get("failed")),
+        "retried_chunks": sum(1 for r in chunk_results if r.get("attempts", 1) > 1),
+        "duration_sec": round(time.time() - started_at, 2),
+        "finished_at": datetime.now(timezone.utc).isoformat(),
+    }
+    log.info("CELERY_ALERT_DONE", extra={"fields": summary})
+    return summary
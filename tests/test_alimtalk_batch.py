@@ -0,0 +1,114 @@
+"""send_alimtalk_batch 가 알리고 응답을 번호별 결과로 제대로 나누는지."""
+
+import pytest
+
+import app
+
+
+class FakeResponse:
+    status_code = 200
+
+    def __init__(self, js):
+        self._js = js
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self._js
+
+
+@pytest.fixture
+def aligo(monkeypatch):
+    """url → 응답 dict (또는 예외) 를 정해두고 호출 기록을 남기는 가짜 aligo_http.post"""
+    responses = {}
+    calls = []
+
+    def post(url, data=None, **kwargs):
+        path = url[len(app.ALIGO_API_BASE):]
+        calls.append((path, data))
+        js = responses[path]
+        if isinstance(js, Exception):
+            raise js
+        return FakeResponse(js)
+
+    monkeypatch.setattr(app.aligo_http, "post", post)
+    monkeypatch.setattr(app.aligo_token_manager, "get", lambda: "token")
+    monkeypatch.setattr(app, "ALIGO_SENDER_KEY", "sender-key")
+    monkeypatch.setattr(app, "ALIGO_SENDER", "0212345678")
+    return responses, calls
+
+
+def _items(*phones):
+    return [app.alimtalk_item(p, "", "본문") for p in phones]
+
+
+def _send_response(scnt, fcnt, mid=777):
+    return {"code": 0, "message": "성공적으로 전송요청 하였습니다.",
+            "info": {"type": "AT", "mid": mid, "scnt": scnt, "fcnt": fcnt}}
+
+
+def test_all_sent_when_fcnt_zero(aligo):
+    responses, calls = aligo
+    responses["/akv10/alimtalk/send/"] = _send_response(2, 0)
+
+    results = app.send_alimtalk_batch("UD_8535", _items("01011112222", "01033334444"))
+
+    assert {p: ok for p, (ok, _) in results.items()} == {"01011112222": True, "01033334444": True}
+    assert [path for path, _ in calls] == ["/akv10/alimtalk/send/"]
+
+
+def test_partial_failure_maps_detail_by_phone(aligo):
+    responses, calls = aligo
+    responses["/akv10/alimtalk/send/"] = _send_response(2, 1)
+    responses["/akv10/history/detail/"] = {"code": 0, "list": [
+        {"phone": "010-1111-2222", "rslt": "0", "rslt_message": "성공"},
+        {"phone": "01033334444", "rslt": "K105", "rslt_message": "메시지 내용이 템플릿과 일치하지 않음"},
+    ]}
+
+    results = app.send_alimtalk_batch(
+        "UD_8535", _items("01011112222", "01033334444", "01055556666"))
+
+    assert results["01011112222"][0] is True
+    assert results["01033334444"][0] is False
+    assert results["01033334444"][1]["delivery"] == "failed"
+    assert results["01055556666"][0] is False
+    assert results["01055556666"][1]["delivery"] == "unknown"
+    assert calls[1][1]["mid"] == 777
+
+
+def test_partial_failure_without_detail_is_unknown_not_sent(aligo):
+    responses, _ = aligo
+    responses["/akv10/alimtalk/send/"] = _send_response(1, 1)
+    responses["/akv10/history/detail/"] = RuntimeError("timeout")
+
+    results = app.send_alimtalk_batch("UD_8535", _items("01011112222", "01033334444"))
+
+    for ok, res in results.values():
+        assert ok is False
+        assert res["delivery"] == "unknown"
+
+
+def test_rejected_token_is_invalidated_and_chunk_retried_once(aligo, monkeypatch):
+    responses, calls = aligo
+    tokens = iter(["old-token", "new-token"])
+    invalidated = []
+    monkeypatch.setattr(app.aligo_token_manager, "get", lambda: next(tokens))
+    monkeypatch.setattr(app.aligo_token_manager, "invalidate", lambda token=None: invalidated.append(token))
+
+    sends = iter([
+        {"code": -99, "message": "토큰이 유효하지 않습니다."},
+        _send_response(1, 0),
+    ])
+
+    def post(url, data=None, **kwargs):
+        calls.append(dict(data))
+        return FakeResponse(next(sends))
+
+    monkeypatch.setattr(app.aligo_http, "post", post)
+
+    results = app.send_alimtalk_batch("UD_8535", _items("01011112222"))
+
+    assert results["01011112222"][0] is True
+    assert invalidated == ["old-token"]
+    assert [c["token"] for c in calls] == ["old-token", "new-token"]
@@ -0,0 +1,99 @@
+"""EventPipeline flush 도중 DB 연결이 끊겼을 때 이미 커밋된 행을 다시 넣지 않는지."""
+
+import psycopg2
+import pytest
+
+import app
+
+
+class FakeCursor:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class FakeConn:
+    def __init__(self):
+        self.pending = []
+        self.committed = []
+
+    def cursor(self):
+        return FakeCursor()
+
+    def commit(self):
+        self.committed.extend(self.pending)
+        self.pending = []
+
+    def rollback(self):
+        self.pending = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+@pytest.fixture
+def conn(monkeypatch):
+    fake = FakeConn()
+    monkeypatch.setattr(app, "get_conn", lambda: fake)
+    return fake
+
+
+def _writer(conn, kind, fail):
+    def write(cur, rows):
+        for row in rows:
+            err = fail(row)
+            if err is not None:
+                raise err
+            conn.pending.append((kind, row))
+    return write
+
+
+def test_connection_drop_on_second_kind_does_not_rewrite_first(conn):
+    drops = {"left": 1}
+
+    def fail_once(row):
+        if drops["left"]:
+            drops["left"] -= 1
+            return psycopg2.OperationalError("server closed the connection")
+        return None
+
+    pipeline = app.EventPipeline(
+        {
+            "click": _writer(conn, "click", lambda row: None),
+            "feedback": _writer(conn, "feedback", fail_once),
+        },
+        retries=3,
+    )
+    batch = [("click", 1, 0), ("click", 2, 0), ("feedback", 10, 0), ("feedback", 11, 0)]
+
+    pipeline._stopping.set()    # 실패 후 interval 대기 생략
+    pipeline._flush(batch)
+    assert conn.committed == [("click", 1), ("click", 2)]
+    assert pipeline._retry_batch == [("feedback", 10, 1), ("feedback", 11, 1)]
+
+    pipeline._flush(pipeline._drain())
+    assert conn.committed == [("click", 1), ("click", 2), ("feedback", 10), ("feedback", 11)]
+    assert pipeline._retry_batch == []
+
+
+def test_connection_drop_in_row_fallback_keeps_only_remaining_rows(conn):
+    def fail(row):
+        if row == "bad":
+            return psycopg2.IntegrityError("fk violation")
+        if row == "lost":
+            return psycopg2.OperationalError("server closed the connection")
+        return None
+
+    pipeline = app.EventPipeline({"click": _writer(conn, "click", fail)}, retries=3)
+    batch = [("click", "a", 0), ("click", "bad", 0), ("click", "lost", 0), ("click", "b", 0)]
+
+    pipeline._stopping.set()
+    pipeline._flush(batch)
+    assert conn.committed == [("click", "a")]
+    assert pipeline._retry_batch == [("click", "lost", 1), ("click", "b", 1)]
+    assert pipeline.stats()["dropped_click"] == 1